@@ -21,19 +21,26 @@
 ################################################################################
 
 import gi
-import sys
 gi.require_version('Gst', '1.0')
 from gi.repository import GObject, Gst
+from common import constants
+from common.metrics import Metrics
+from common.common import Common
 def bus_call(bus, message, loop):
     t = message.type
+    if t in (Gst.MessageType.QOS, Gst.MessageType.WARNING, Gst.MessageType.ERROR):
+        Metrics.get_instance().inc(constants.METRIC_GST_MESSAGES, \
+            labels={"type": Gst.MessageType.get_name(t)})
     if t == Gst.MessageType.EOS:
-        sys.stdout.write("End-of-stream\n")
+        Common.post_message(constants.C_NAME_GST_BUS, "End-of-stream")
         loop.quit()
     elif t==Gst.MessageType.WARNING:
         err, debug = message.parse_warning()
-        sys.stderr.write("Warning: %s: %s\n" % (err, debug))
+        Common.post_message(constants.C_NAME_GST_BUS, "Warning: %s: %s" % (err, debug), \
+            constants.LOG_WARNING, key=("warning", str(err)))
     elif t == Gst.MessageType.ERROR:
         err, debug = message.parse_error()
-        sys.stderr.write("Error: %s: %s\n" % (err, debug))
+        Common.post_message(constants.C_NAME_GST_BUS, "Error: %s: %s" % (err, debug), \
+            constants.LOG_ERROR)
         loop.quit()
     return True
@@ -6,8 +6,9 @@
 # Add imports here
 import os
 import cv2
+import numpy as np
 from common import constants
-from plugins import birds_eye_converter
+from common.logger import Logger
 #pylint: disable=wrong-import-position
 
 # class Common
@@ -49,120 +50,186 @@ class Common:
             # Initialize class instance
             Common.__common = self
 
+    # function get_calibration_path
+    # Description: Function that returns the calibration file path of a source
+    # Parameter: cls, source_id
+    # Return value: path
+    @classmethod
+    def get_calibration_path(cls, source_id=0):
+        """ Returns the calibration file path """
+
+        # First source keeps the original calibration file
+        if source_id == 0:
+            return constants.CALIBRATION_DATA_PATH
+
+        # Return calibration file path of the source
+        return constants.CALIBRATION_DATA_PATH_FMT.format(source_id)
+
+
+    # function get_topic
+    # Description: Function that returns the MQTT topic of a source.
+    #              The first source keeps the original topic, other sources use a sub topic.
+    # Parameter: cls, topic, source_id
+    # Return value: topic
+    @classmethod
+    def get_topic(cls, topic, source_id=0):
+        """ Returns the source topic """
+
+        # First source keeps the original topic
+        if source_id == 0:
+            return topic
+
+        # Return source sub topic
+        return f"{topic}/{source_id}"
+
+
     # function get_calibrations
-    # Description: Function that extract the data from calibration file
-    # Parameter: self
-    # Return value: b_eye_calib_final, d_zone_calib_final
+    # Description: Function that extract the data from calibration file.
+    #              Line 1 is the Bird's Eye calibration, each following line a danger zone.
+    # Parameter: self, path
+    # Return value: b_eye_calib_final, d_zones ([(name, dwell time limit, points), ...])
     @classmethod
-    def get_calibrations(cls):
+    def get_calibrations(cls, path=constants.CALIBRATION_DATA_PATH):
         """ Read calibration file """
 
         calibrations = None       # functionault return value
 
         # Check if the file is existing
-        if os.path.isfile(constants.CALIBRATION_DATA_PATH):
+        if os.path.isfile(path):
 
             # Open the calibration file
-            with open(constants.CALIBRATION_DATA_PATH, \
+            with open(path, \
                 encoding=constants.FILE_ENCODING) as calibration_file:
 
-                # Read lines from file
-                calibration_lines = calibration_file.readlines()
+                # Read lines from file, without blank lines
+                calibration_lines = [line for line in calibration_file.readlines() \
+                    if line.strip()]
 
                 # Check if the number of lines is valid
-                if constants.CALIBRATION_COUNT == len(calibration_lines):
+                if constants.CALIBRATION_COUNT <= len(calibration_lines):
 
                     # Extract values
                     b_eye_calib_arr = calibration_lines[0].split(',')
-                    d_zone_calib_arr = calibration_lines[1].split(',')
 
                     # Check if value count for Bird's Eye calibration is valid
                     if len(b_eye_calib_arr) != constants.CALIBRATION_VALUE_COUNT:
 
-                        print(f"[{constants.CALIBRATION_DATA_PATH}]:" + \
-                            " Line 1 has incorrect value count!")
-
-                    # Check if value count for Danger Zone calibration is valid
-                    elif len(d_zone_calib_arr) != constants.CALIBRATION_VALUE_COUNT:
-
-                        print(f"[{constants.CALIBRATION_DATA_PATH}]:" + \
-                            " Line 2 has incorrect value count!")
+                        cls.post_message(constants.C_NAME_COMMON, f"[{path}]:" + \
+                            " Line 1 has incorrect value count!", constants.LOG_WARNING)
 
                     else:
 
-                        b_eye_calib_final = []     # Holds Bird's Eye calibration values
-                        d_zone_calib_final = []    # Holds Danger Zone calibration vlaues
-
                         try:
 
                             # Convert to int before appending each value
-                            for num in range(0, constants.CALIBRATION_VALUE_COUNT, 1):
-                                b_eye_calib_final.append(int(b_eye_calib_arr[num]))
-                                d_zone_calib_final.append(int(d_zone_calib_arr[num]))
+                            b_eye_calib_final = [int(value) for value in b_eye_calib_arr]
 
-                            # Set calibrations as result
-                            result = (b_eye_calib_final, d_zone_calib_final)
+                            # Danger zones
+                            d_zones = [cls.parse_d_zone(line, line_number, b_eye_calib_final) \
+                                for line_number, line in enumerate(calibration_lines[1:], 2)]
 
-                        # Error due to invalid literal for int
-                        except ValueError:
-
-                            print(f"[{constants.CALIBRATION_DATA_PATH}]" + \
-                                " has invalid literal for int!")
-                            result = None
+                            # Set calibrations as result
+                            calibrations = (b_eye_calib_final, d_zones)
 
-                        finally:
+                        # Error due to invalid literal or invalid danger zone
+                        except ValueError as error:
 
-                            # Set result
-                            calibrations = result
+                            cls.post_message(constants.C_NAME_COMMON, f"[{path}]" + \
+                                f" has invalid content! {error}", constants.LOG_WARNING)
 
                 # Error: Invalid line count
                 else:
 
-                    print(f"[{constants.CALIBRATION_DATA_PATH}] has incorrect content!")
+                    cls.post_message(constants.C_NAME_COMMON, \
+                        f"[{path}] has incorrect content!", constants.LOG_WARNING)
 
         # Error: File not found
         else:
 
-            print(f"[{constants.CALIBRATION_DATA_PATH}]: File not found!")
+            cls.post_message(constants.C_NAME_COMMON, f"[{path}]: File not found!", \
+                constants.LOG_WARNING)
 
         # Return calibrations. if not successful, return None
         return calibrations
 
 
-    # function write_b_eye_input_file
-    # Description: Function that write data in the input file for Bird's Eye Converter plugin
-    # Parameter: cls, b_eye_dimension, b_eye_calibration, centroids
-    # Return value: None
+    # function parse_d_zone
+    # Description: Function that parses a danger zone line of the calibration file:
+    #              "<name>;<dwell time limit>;x1,y1,x2,y2,x3,y3,..." or, for an unnamed
+    #              zone with the default dwell time limit, the 8 corner values only.
+    #              Like the screen calibration, a zone must lie inside the Bird's Eye area:
+    #              a point beyond it may transform far away, near the horizon.
+    # Parameter: cls, line, line_number, b_eye_calib (Bird's Eye calibration corners.
+    #            None: not checked)
+    # Return value: (name (None: unnamed), dwell time limit (None: D_ZONE_DTIME_LIMIT), points)
     @classmethod
-    def write_b_eye_input_file(cls, b_eye_dimension, b_eye_calibration, centroids):
-        """ Write data in the Bird's Eye Converter plugin input file """
+    def parse_d_zone(cls, line, line_number, b_eye_calib=None):
+        """ Parse danger zone line """
 
-        # Write data in the input file
-        with open(constants.B_EYE_INPUT_FILE, 'w', \
-            encoding=constants.FILE_ENCODING) as input_file:
-
-            # Write Bird's Eye dimension details
-            input_text = f"{b_eye_dimension[0]},{b_eye_dimension[1]}," + \
-                f"{b_eye_dimension[2]},{b_eye_dimension[3]}," + \
-                f"{b_eye_dimension[4]},{b_eye_dimension[5]}," + \
-                f"{b_eye_dimension[6]},{b_eye_dimension[7]}\n"
-            input_file.write(input_text)
-
-            # Write selected area for Bird's Eye View from Camera calibration
-            input_text = ""
-            b_eye_calib_len = len(b_eye_calibration)
-            for index in range(0, b_eye_calib_len, 1):
-                if index == 0:
-                    input_text = f"{b_eye_calibration[index]}"
-                else:
-                    input_text = f"{input_text},{b_eye_calibration[index]}"
-            input_text = f"{input_text}\n"
-            input_file.write(input_text)
+        fields = line.strip().split(constants.CALIBRATION_FIELD_SEPARATOR)
+
+        # Unnamed zone: corner values only
+        if len(fields) == 1:
+
+            name = None
+            dwell_limit = None
+            points = [int(value) for value in fields[0].split(',')]
+
+            if len(points) != constants.CALIBRATION_VALUE_COUNT:
+                raise ValueError(f"Line {line_number} has incorrect value count!")
+
+        else:
+
+            if len(fields) != 3:
+                raise ValueError(f"Line {line_number} has incorrect field count!")
+
+            name = fields[0].strip()
+            if not name or any(char in name for char in constants.D_ZONE_NAME_INVALID_CHARS):
+                raise ValueError(f"Line {line_number} has invalid zone name!")
+
+            dwell_limit = float(fields[1])
+            if not dwell_limit >= 0:
+                raise ValueError(f"Line {line_number} has invalid dwell time limit!")
+
+            points = [int(value) for value in fields[2].split(',')]
+            if len(points) % 2 != 0 or len(points) < constants.D_ZONE_MIN_POINTS * 2:
+                raise ValueError(f"Line {line_number} has incorrect value count!")
 
-            # Write the list of centroids to be converted to bird's eye view centroids
-            for centroid in centroids:
-                input_text = f"{centroid[0]},{centroid[1]}\n"
-                input_file.write(input_text)
+        # Check that the zone is inside the Bird's Eye area
+        if b_eye_calib is not None:
+
+            b_eye_area = np.asarray(b_eye_calib, dtype=np.int32).reshape(-1, 1, 2)
+            if any(cv2.pointPolygonTest(b_eye_area, (float(points[index]), \
+                float(points[index + 1])), False) < 0 for index in range(0, len(points), 2)):
+
+                raise ValueError(f"Line {line_number} is outside the Bird's Eye area!")
+
+        return (name, dwell_limit, points)
+
+
+    # function get_calibration_signature
+    # Description: Function that returns the signature of the calibration file.
+    #              The signature changes whenever the calibration file is rewritten.
+    # Parameter: cls, path
+    # Return value: signature
+    @classmethod
+    def get_calibration_signature(cls, path=constants.CALIBRATION_DATA_PATH):
+        """ Returns the calibration file signature """
+
+        signature = None        # Holds the signature: (modified time, size)
+
+        try:
+
+            # Get file status
+            stat = os.stat(path)
+            signature = (stat.st_mtime, stat.st_size)
+
+        # File not found
+        except OSError:
+            pass
+
+        # Return signature. If file not found, return None
+        return signature
 
 
     # function write_calibration_file
@@ -191,50 +258,6 @@ class Common:
                 f"{d_zone_calib[6]},{d_zone_calib[7]}\n"
             calib_file.write(input_text)
 
-    # function read_b_eye_output_file
-    # Description: Function that read the output file after Bird's Eye Converter plugin execution
-    # Parameter: cls
-    # Return value: trans_centroids
-    @classmethod
-    def read_b_eye_output_file(cls):
-        """ Read the Bird's Eye Converter plugin output file """
-
-        trans_centroids = []    # Holds the list of transformed centroid
-
-        # Check the file if existing
-        if os.path.isfile(constants.B_EYE_OUTPUT_FILE):
-
-            # Read the output file
-            with open(constants.B_EYE_OUTPUT_FILE, 'r', \
-                encoding=constants.FILE_ENCODING) as out_file:
-
-                # Read each line to get centroid
-                content = out_file.readlines()
-                for item in content:
-
-                    values = item.split(",")
-
-                    if len(values) != 2:
-                        continue
-
-                    centroid = (int(values[0]), int(values[1]))
-                    trans_centroids.append(centroid)
-
-        # Return the list of transformed centroids
-        return trans_centroids
-
-
-    # function run_b_eye_converter
-    # Description: Function that runs command to execute the
-    #              binary form of Bird's Eye Converter plugin
-    # Parameter: cls
-    # Return value: None
-    @classmethod
-    def run_b_eye_converter(cls):
-        """ Runs Bird's Eye converter """
-
-        birds_eye_converter.run()
-
 
     # function draw_corner
     # Description: Function that draws calibration corner
@@ -251,40 +274,42 @@ class Common:
 
 
     # function post_message
-    # Description: Function that posts message in terminal
-    # Parameter: cls
-    # Return value: cv2.rectangle
+    # Description: Function that posts message in terminal through the asynchronous logger.
+    #              Repeated messages of the same key are rate limited and summarized.
+    # Parameter: cls, class_name, message, level, key (rate limit key. None: the message)
+    # Return value: None
     @classmethod
-    def post_message(cls, class_name, message):
+    def post_message(cls, class_name, message, level=constants.LOG_INFO, key=None):
         """ Post message in the terminal """
 
-        print(f"[{class_name}]{message}")
+        Logger.get_instance().log(level, class_name, message, key)
 
 
     # function check_calibration_file
     # Description: Function that validates the calibration file
-    # Parameter: self
+    # Parameter: self, path
     # Return value: result
-    def check_calibration_file(self):
+    def check_calibration_file(self, path=constants.CALIBRATION_DATA_PATH):
         """ Check calibration file """
 
         result = constants.V_CALIB_DEFAULT        # Holds the calibration file check result
 
         # Check the file if existing
-        if os.path.isfile(constants.CALIBRATION_DATA_PATH):
+        if os.path.isfile(path):
 
             # Open the calibration file
-            with open(constants.CALIBRATION_DATA_PATH, \
+            with open(path, \
                 encoding=constants.FILE_ENCODING) as calibration_file:
 
-                # Read lines from file
-                calibration_lines = calibration_file.readlines()
+                # Read lines from file, without blank lines
+                calibration_lines = [line for line in calibration_file.readlines() \
+                    if line.strip()]
 
                 # Get content line count
                 line_cnt = len(calibration_lines)
 
-                # Calibration line count is 2
-                if line_cnt == constants.CALIBRATION_COUNT:
+                # Bird's Eye calibration and at least one danger zone
+                if line_cnt >= constants.CALIBRATION_COUNT:
 
                     # Validate calibration values
                     result = self.__validate_calibration_values(calibration_lines)
@@ -312,53 +337,33 @@ class Common:
 
 
     # function __validate_calibration_values
-    # Description: Function that validates calibration values
+    # Description: Function that validates calibration values: line 1 is the Bird's Eye
+    #              calibration, each following line a danger zone
     # Parameter: cls, calibration_lines
     # Return value: result
     @classmethod
     def __validate_calibration_values(cls, calibration_lines):
         """ Validates the calibration values """
 
-        result = constants.V_CALIB_DEFAULT  # Holds the validation result
-
-
-        # Check each line
-        for calib in calibration_lines:
-
-            # Split line into values
-            calib_values = calib.split(',')
+        result = constants.V_CALIB_OK       # Holds the validation result
 
-            # Value count is 8
-            if len(calib_values) == constants.CALIBRATION_VALUE_COUNT:
+        try:
 
-                # Check each value
-                for value in calib_values:
-
-                    try:
-
-                        # Check if value is a valid int literal
-                        int(value)
-
-                    # Value is an invalid int literal
-                    except ValueError:
-
-                        # Calibration file has invalid content
-                        result = constants.V_CALIB_NG_CONTENT
-
-                    # Value is a valid int literal
-                    else:
-
-                        # Calibration file has invalid content
-                        result = constants.V_CALIB_OK
+            # Bird's Eye calibration: value count is 8, each a valid int literal
+            b_eye_values = [int(value) for value in calibration_lines[0].split(',')]
+            if len(b_eye_values) != constants.CALIBRATION_VALUE_COUNT:
+                result = constants.V_CALIB_NG_CONTENT
 
-                    finally:
-                        pass
+            # Danger zones, inside the Bird's Eye area
+            for line_number, line in enumerate(calibration_lines[1:], 2):
+                cls.parse_d_zone(line, line_number, b_eye_values \
+                    if len(b_eye_values) == constants.CALIBRATION_VALUE_COUNT else None)
 
-            # Invalid value count
-            else:
+        # Invalid literal or invalid danger zone
+        except ValueError:
 
-                # Calibration file has invalid content
-                result = constants.V_CALIB_NG_CONTENT
+            # Calibration file has invalid content
+            result = constants.V_CALIB_NG_CONTENT
 
         # Return the validation result
         return result
@@ -3,6 +3,9 @@
 # scripts/deep_stream.py constants
 ###############################################################################################
 
+C_NAME_DEEP_STREAM = "DEEP-STREAM"                    # Class name for DeepStream
+C_NAME_GST_BUS = "GST-BUS"                            # Name of the GStreamer bus messages
+
 OBJ_CLASS_ID_PERSON = 2                               # Class id for object "Person"
 
 FRAME_WIDTH = 1000                                    # Pipeline - frame width
@@ -18,16 +21,41 @@ CALIB_STAT_DEFAULT = 1                                # Default: Not yet started
 CALIB_STAT_NORMAL = 0                                 # Normal: Calibration process is successful
 CALIB_STAT_ERROR = -1                                 # Error: Calibration process failed
 
+###############################################################################################
+# common/logger.py constants
+###############################################################################################
+
+C_NAME_LOGGER = "LOGGER"                      # Class name for Logger
+
+# Log levels
+LOG_DEBUG = 10                                # Debug details, e.g. per-frame messages
+LOG_INFO = 20                                 # Normal operation
+LOG_WARNING = 30                              # Recoverable problem. Written to stderr
+LOG_ERROR = 40                                # Failure. Written to stderr
+
+LOG_LEVEL = LOG_INFO                          # Messages below this level are not written
+LOG_QUEUE_SIZE = 1000                         # Queued lines before new lines are dropped
+LOG_RATE_INTERVAL = 10.0                      # Rate limit window per message key (seconds)
+LOG_RATE_BURST = 5                            # Messages written per key and window
+LOG_FLUSH_TIMEOUT = 2.0                       # Flush wait limit (seconds)
+
+
 ###############################################################################################
 # common/common.py constants
 ###############################################################################################
 
+C_NAME_COMMON = "COMMON"                      # Class name for Common
+
 CALIBRATION_DATA_PATH = "data/calibration.txt"  # Calibration file path
-CALIBRATION_COUNT = 2                              # Count: Bird's Eye and Danger zone calibrations
+CALIBRATION_DATA_PATH_FMT = "data/calibration_{}.txt" # Calibration file path of source 1 and later
+CALIBRATION_COUNT = 2                              # Minimum count: Bird's Eye and one Danger zone
 CALIBRATION_VALUE_COUNT = 8                        # Count of calibration points
 
-B_EYE_INPUT_FILE = "data/input_file.txt"        # Bird's Eye Converter - Input file path
-B_EYE_OUTPUT_FILE = "data/output_file.txt"      # Bird's Eye Converter - Output file path
+# Danger zone line: "<name>;<dwell time limit>;x1,y1,x2,y2,x3,y3,..." (camera view polygon).
+# A line of CALIBRATION_VALUE_COUNT values only is an unnamed zone with D_ZONE_DTIME_LIMIT.
+CALIBRATION_FIELD_SEPARATOR = ";"                  # Danger zone line field separator
+D_ZONE_MIN_POINTS = 3                              # Minimum polygon point count of a danger zone
+D_ZONE_NAME_INVALID_CHARS = "/;,+#"                # Characters not allowed in a danger zone name
 
 FILE_ENCODING = 'utf-8'
 
@@ -36,23 +64,39 @@ FILE_ENCODING = 'utf-8'
 ###############################################################################################
 
 UPDATE_TIMEOUT = 30                                # No update time out
-NO_INDEX = -1                                      # Not existing index
 
 ###############################################################################################
 # scripts/monitoring.py constants
 ###############################################################################################
 
-D_ZONE_RANGE = 50                                  # Danger Zone range
-D_ZONE_DTIME_LIMIT = 5                             # Danger Zone dwell time limit
+D_ZONE_DTIME_LIMIT = 5                             # Danger Zone dwell time limit (default)
+
+# Danger Zone raster: zone membership by one lookup in a precomputed zone bitmask image
+C_NAME_ZONE_RASTER = "ZONE-RASTER"                 # Class name for ZoneRaster
+D_ZONE_RASTER = True                               # Use the raster (False: polygon test per frame)
+D_ZONE_RASTER_CACHE_DIR = "data/zone_raster"       # Raster cache directory (None: no cache)
+D_ZONE_RASTER_VERSION = 2                          # Raster cache format version
+D_ZONE_RASTER_CACHE_SIZE = 16                      # Cached rasters kept (least recently used out)
+D_ZONE_RASTER_MAX_ZONES = 64                       # Zone count limit of the raster (one bit each)
 
-# Danger Zone dimension
-D_ZONE_DIM = (0, 0, D_ZONE_RANGE, 0, D_ZONE_RANGE, D_ZONE_RANGE, 0, D_ZONE_RANGE)
+# Danger Zone state per object
+D_ZONE_STATE_ENTER = 0                             # Entered the danger zone on this frame
+D_ZONE_STATE_DWELL = 1                             # Dwelling inside the danger zone
+D_ZONE_STATE_ALERT = 2                             # Dwell time limit reached: alert
+D_ZONE_STATE_EXIT = 3                              # Outside the danger zone
+
+# Proximity tier per object, from the distance to the nearest danger zone
+D_ZONE_APPROACH_DISTANCE = 15                      # Approaching distance (Bird's Eye View units)
+PROXIMITY_NONE = 0                                 # Farther than the approaching distance
+PROXIMITY_APPROACHING = 1                          # Within the approaching distance of a zone
+PROXIMITY_INSIDE = 2                               # Inside a danger zone
 
 ###########################################################
 # scripts/calibration_draw.py constants
 ###########################################################
 
 CAM_CHANNEL = '/dev/video0'              # Camera channel
+CAM_CHANNEL_PREFIX = '/dev/video'        # Stream path prefix of a live USB camera
 #CAM_CHANNEL = '0'              # Camera channel
 
 # Screen calibration status
@@ -94,6 +138,14 @@ GRID_COLOR = (255, 255, 255)             # [White] Bird's Eye View grid color
 GRID_D_ZONE_COLOR = (0, 10, 255)         # [Red] Bird's Eye View grid - danger zone color
 PTS_NORM_ZONE_COLOR = (180, 100, 0)      # [Blue] Centroid color - Normal
 PTS_ALRT_ZONE_COLOR = (0, 10, 255)       # [Red] Centroid color - Alert
+PTS_APPR_ZONE_COLOR = (0, 220, 255)      # [Yellow] Centroid color - Approaching a danger zone
+PTS_INSD_ZONE_COLOR = (0, 130, 255)      # [Orange] Centroid color - Inside a danger zone
+GRID_CENTROID_RADIUS = 7                 # Centroid radius in the grid
+
+ALERT_ROI_MARGIN = 40                    # Alert image - margin around the bounding boxes
+ALERT_THUMB_WIDTH = 240                  # Alert image - context thumbnail width
+ALERT_CACHE_SIZE = 8                     # Alert image - full resolution frames kept for request
+ALERT_DATA_SEPARATOR = ";"                # Alert data - separator of the alerts of a frame
 
 ###############################################################################################
 # scripts/host_updater.py constants
@@ -102,7 +154,6 @@ PTS_ALRT_ZONE_COLOR = (0, 10, 255)       # [Red] Centroid color - Alert
 MOBILE_HOST = "192.168.230.88"                # Mqtt server ip address
 MOBILE_PORT = 1883                            # Mqtt server port
 
-MAX_TRY = 2                                   # Alert sending max try
 RETURN_OK = 0                                 # Function return OK
 RETURN_NG = 1                                 # Function return NOT GOOD
 
@@ -111,13 +162,70 @@ OFF = 0                                       # OFF flag
 
 BUZZER_TIMEOUT = 5                            # Buzzer - alarm timeout
 BUZZ_PIN = 12                                 # Buzzer - gpio pin
+BUZZ_ON_WARNING = False                       # Buzzer - also alarm while approaching or inside
+C_NAME_BUZZER = "BUZZER"                      # Class name for Buzzer
 
 MSG_TOPIC_ALERT_DATA = "topic/msgData"        # Mqtt message topic for alert data
-MSG_TOPIC_ALERT_IMAGE = "topic/msgImage"      # Mqtt message topic for alert image
+MSG_TOPIC_ALERT_IMAGE = "topic/msgImage"      # Mqtt message topic for alert image (region of interest)
+MSG_TOPIC_ALERT_THUMB = "topic/msgThumb"      # Mqtt message topic for alert context thumbnail
+MSG_TOPIC_ALERT_REQUEST = "topic/msgRequest"  # Mqtt message topic for full image request (alert id)
+MSG_TOPIC_ALERT_FULL = "topic/msgFull"        # Mqtt message topic for full image: <topic>/<alert id>
 MSG_TOPIC_HOST_UPDATE = "topic/grid"          # Mqtt message topic for host update image
 
+HOST_UPDATE_QUANTUM = 5                       # Host update - centroid quantization (b_eye pixels)
+HOST_UPDATE_MAX_RATE = 5.0                    # Host update - maximum publish rate (per second)
+HOST_UPDATE_KEEPALIVE = 2.0                   # Host update - keep-alive interval (seconds)
+
+MSG_TOPIC_HOST_VECTOR = "topic/tracks"        # Mqtt message topic for host update track list
+
+HOST_UPDATE_JPEG = 1                          # Host update format: rendered grid JPEG image
+HOST_UPDATE_VECTOR = 2                        # Host update format: compact JSON keyframes/deltas
+HOST_UPDATE_FORMATS = HOST_UPDATE_JPEG | HOST_UPDATE_VECTOR   # Enabled host update formats
+
+VECTOR_KEYFRAME_INTERVAL = 2.0                # Host update - vector keyframe interval (seconds)
+
 C_NAME_ALERT_NOTIFY = "ALERT-NOTIFY"          # Class name for AlertNotify
 C_NAME_HOST_UPDATER = "HOST-UPDATER"          # Class name for HostUpdater
+C_NAME_MQTT_PUBLISHER = "MQTT-PUBLISHER"      # Class name for MqttPublisher
+
+C_NAME_HOST_WORKER = "HOST-WORKER"            # Class name for HostWorker
+
+DROP_OLDEST = 0                               # Drop policy: drop the oldest queued result
+DROP_NEWEST = 1                               # Drop policy: drop the incoming result
+
+HOST_WORKER_QUEUE_SIZE = 4                    # Host worker queue size (frame results)
+HOST_WORKER_DROP_POLICY = DROP_OLDEST         # Host worker drop policy when queue is full
+HOST_WORKER_THREADS = 2                       # Host worker annotation/encoding threads
+HOST_WORKER_ALERT_FRAMES = 8                  # Alert frames held (queued or annotating)
+
+MQTT_KEEPALIVE = 60                           # Mqtt keepalive interval (seconds)
+MQTT_QUEUE_SIZE = 100                         # Mqtt outbound queue size (messages)
+MQTT_RECONNECT_MIN = 1                        # Mqtt reconnect delay minimum (seconds)
+MQTT_RECONNECT_MAX = 30                       # Mqtt reconnect delay maximum (seconds)
+MQTT_DRAIN_BATCH = 10                         # Mqtt messages sent per sender cycle
+MQTT_BACKOFF_MIN = 0.5                        # Mqtt publish retry backoff - first delay (seconds)
+MQTT_BACKOFF_MAX = 30.0                       # Mqtt publish retry backoff - maximum delay (seconds)
+MQTT_MAX_RETRY = 8                            # Mqtt publish retries before the message is dropped
+
+RETRY_QUEUED = 0                              # Retry result: queued again after the backoff
+RETRY_DROPPED = 1                             # Retry result: retries or deadline exhausted
+RETRY_SUPERSEDED = 2                          # Retry result: replaced by a newer message
+
+# Mqtt message priority: smaller value is sent first
+MQTT_PRIORITY_ALERT_DATA = 0                  # Alert data
+MQTT_PRIORITY_ALERT_IMAGE = 1                 # Alert images
+MQTT_PRIORITY_HOST_UPDATE = 2                 # Bird's Eye View host updates
+
+MQTT_TTL_ALERT = 600.0                        # Alert message deadline after queueing (seconds)
+MQTT_TTL_HOST_UPDATE = 5.0                    # Host update deadline after queueing (seconds)
+
+ALERT_SPOOL_PATH = "data/alert_spool.db"      # Alert spool file path
+ALERT_SPOOL_MAX_BYTES = 64 * 1024 * 1024      # Alert spool size limit (bytes)
+ALERT_SPOOL_QOS = 1                           # Alert message QoS: spool waits for the broker ack
+ALERT_SPOOL_ACK_TIMEOUT = 30.0                # Unacknowledged alert message resend time (seconds)
+ALERT_SPOOL_IN_FLIGHT = 10                    # Alert messages sent and not yet acknowledged
+ALERT_SPOOL_DRAIN_RATE = 20.0                 # Alert spool drain rate limit (messages per second)
+ALERT_SPOOL_POLL_INTERVAL = 1.0               # Alert spool check interval while idle (seconds)
 
 USB_MODE = 0                                  # Camera USB mode
 RPI_MODE = 1                                  # Camera Raspi mode
@@ -129,7 +237,119 @@ V_CALIB_NO_FILE = 1                           # Calibration file does not exists
 V_CALIB_FILE_EMPTY = 2                        # Calibration file is empty
 V_CALIB_NG_CONTENT = 3                        # Calibration file has invalid content
 
-FRAME_SKIP = 0                                # Frame skip interval
+C_NAME_FRAME_SCHEDULER = "FRAME-SCHEDULER"    # Class name for FrameScheduler
+
+# Frame scheduler: frames skipped between inferred and processed frames
+SCHED_ACTIVE_INTERVAL = 0                     # Interval while someone is in or near a zone
+SCHED_PRESENT_INTERVAL = 0                    # Interval while persons are in view
+SCHED_IDLE_INTERVAL = 4                       # Interval while the scene is empty
+SCHED_MAX_INTERVAL = 8                        # Maximum interval under processing load
+SCHED_IDLE_FRAMES = 30                        # Empty processed frames before idle interval
+SCHED_HOLD_FRAMES = 30                        # Processed frames before stepping down a tier
+SCHED_FRAME_BUDGET = 1.0 / 30                 # Processing time budget per frame (seconds)
+SCHED_TIME_SMOOTHING = 0.1                    # Processing time smoothing factor
+
+
+###############################################################################################
+# scripts/frame_processor.py, scripts/meta_recorder.py constants
+###############################################################################################
+
+C_NAME_FRAME_PROCESSOR = "FRAME-PROCESSOR"    # Class name for FrameProcessor
+
+META_RECORD_PATH = None                       # Detection metadata recording file (None: disabled)
+META_FILE_MAGIC = b'HDZM'                     # Detection metadata file - magic number
+META_FILE_VERSION = 1                         # Detection metadata file - format version
+
+# Processing stages for the stage times
+STAGE_FRAME = "frame"                         # Whole post-inference process of a frame
+STAGE_TRACKER = "tracker"                     # Tracker add and update
+STAGE_MONITORING = "monitoring"               # Transform and danger zone monitoring
+STAGE_SUBMIT = "submit"                       # Frame results hand-off to the host worker
+STAGE_HOST_UPDATE = "host_update"             # Bird's Eye View drawing and sending
+STAGE_ANNOTATE = "annotate"                   # Alert frame annotation and encoding
+
+
+###############################################################################################
+# scripts/calibration_watcher.py constants
+###############################################################################################
+
+C_NAME_CALIBRATION_WATCHER = "CALIBRATION-WATCHER" # Class name for CalibrationWatcher
+
+CALIBRATION_WATCH_INTERVAL = 0.1              # Calibration file check interval (seconds)
+
+
+
+###############################################################################################
+# scripts/frame_tracer.py constants
+###############################################################################################
+
+TRACE_DUMP_PATH = None                        # Chrome trace file written at exit (None: disabled)
+TRACE_RING_SIZE = 65536                       # Spans kept in the trace ring buffer
+TRACE_CATEGORY = "hddzids"                    # Trace event category
+
+# Traced stages in addition to the processing stages
+STAGE_CAPTURE = "capture"                     # Buffer PTS to pad probe: decode and inference
+STAGE_OBJECT_WALK = "object_walk"             # Object metadata list walk
+STAGE_SURFACE_COPY = "surface_copy"           # Frame surface copy and color conversion
+STAGE_TRANSFORM = "transform"                 # Bird's Eye View centroid transform
+STAGE_MONITORING_RUN = "monitoring_run"       # Danger zone monitoring
+STAGE_ALERT_SPOOL = "alert_spool"             # Alert write into the alert spool
+STAGE_MQTT_PUBLISH = "mqtt_publish"           # Mqtt message queueing to publishing
+
+
+###############################################################################################
+# scripts/encode_pool.py constants
+###############################################################################################
+
+C_NAME_ENCODE_POOL = "ENCODE-POOL"            # Class name for EncodePool
+
+ENCODE_WORKERS = 2                            # Encode worker processes (0: encode in process)
+ENCODE_SLOTS = 4                              # Shared-memory frame slots
+ENCODE_SLOT_SIZE = FRAME_WIDTH * FRAME_HEIGHT * 4  # Frame slot size: BGRA frame (bytes)
+ENCODE_TIMEOUT = 2.0                          # Encode result wait limit (seconds)
+ENCODE_START_TIMEOUT = 10.0                   # Encode worker start wait limit (seconds)
+ENCODE_WATCH_INTERVAL = 1.0                   # Encode worker liveness check interval (seconds)
+
+# Frame slot state
+SLOT_FREE = 0                                 # Slot is free
+SLOT_RESERVED = 1                             # Slot is being filled
+SLOT_QUEUED = 2                               # Slot job is queued
+SLOT_BUSY = 3                                 # Slot job is being encoded by a worker
+
+
+###############################################################################################
+# common/metrics.py, scripts/metrics_server.py constants
+###############################################################################################
+
+C_NAME_METRICS_SERVER = "METRICS-SERVER"      # Class name for MetricsServer
+
+METRICS_HOST = "127.0.0.1"                    # Metrics endpoint address: local only.
+                                              #   Set "0.0.0.0" to expose it on all interfaces
+METRICS_PORT = 9108                           # Metrics endpoint port (None: disabled)
+METRICS_PATH = "/metrics"                     # Metrics endpoint path
+
+# Histogram buckets
+METRIC_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, \
+    1.0, 2.5)                                 # Latency buckets (seconds)
+METRIC_SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)  # Size buckets (bytes)
+METRIC_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)  # Count buckets
+
+# Metric names
+METRIC_FRAMES_PROCESSED = "hddzids_frames_processed_total"
+METRIC_FRAMES_SKIPPED = "hddzids_frames_skipped_total"
+METRIC_PERSONS = "hddzids_persons_per_frame"
+METRIC_ACTIVE_TRACKS = "hddzids_active_tracks"
+METRIC_ACTIVE_ALERTS = "hddzids_active_alerts"
+METRIC_STAGE_SECONDS = "hddzids_stage_seconds"
+METRIC_TRANSFORM_SECONDS = "hddzids_transform_seconds"
+METRIC_ENCODE_SECONDS = "hddzids_encode_seconds"
+METRIC_ENCODE_BYTES = "hddzids_encode_bytes"
+METRIC_ENCODE_DROPPED = "hddzids_encode_dropped_total"
+METRIC_MQTT_PUBLISH_SECONDS = "hddzids_mqtt_publish_seconds"
+METRIC_MQTT_FAILURES = "hddzids_mqtt_publish_failures_total"
+METRIC_MQTT_DROPPED = "hddzids_mqtt_dropped_total"
+METRIC_MQTT_QUEUE_DEPTH = "hddzids_mqtt_queue_depth"
+METRIC_GST_MESSAGES = "hddzids_gst_messages_total"
 
 
 # Result for checking if danger zone is valid
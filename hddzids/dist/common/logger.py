@@ -0,0 +1,243 @@
+""" Asynchronous Logger """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+from common import constants
+#pylint: disable=wrong-import-position
+
+# class Logger
+# Description: Class for a queue-backed logger. Messages are formatted and queued by the
+#              caller and written by a background thread, so the streaming thread never
+#              blocks on stdout. Each message key is rate limited: past LOG_RATE_BURST
+#              messages in LOG_RATE_INTERVAL seconds, messages are counted and summarized.
+# Parameter: None
+# Return value: None
+class Logger:
+    """ Asynchronous rate-limited logger """
+
+    __logger = None             # Logger class instance
+
+    __queue = None              # Queued lines: (level, line)
+    __condition = None          # Queue condition
+    __writer = None             # Writer thread
+    __running = False           # Writer running flag
+    __writing = False           # Writer is writing taken lines
+    __limits = None             # [window start, count, suppressed count, last line] per key
+    __dropped_cnt = 0           # Lines dropped while the queue was full
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __logger
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if Logger.__logger is None:
+
+            # Call the class constructor
+            Logger()
+
+        # Return the class instance
+        return Logger.__logger
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if Logger.__logger is None:
+
+            Logger.__logger = self              # Initialize Logger class instance
+
+            self.__queue = deque()
+            self.__condition = threading.Condition()
+            self.__limits = {}
+
+
+    # function log
+    # Description: Function that queues a message. Does not block.
+    # Parameter: self, level, name (class name), message,
+    #            key (rate limit key. None: the class name and the message)
+    # Return value: None
+    def log(self, level, name, message, key=None):
+        """ Queue log message """
+
+        # Below the log level
+        if level < constants.LOG_LEVEL:
+            return
+
+        line = f"[{name}]{message}"
+        if key is None:
+            key = line
+
+        now = time.monotonic()
+
+        with self.__condition:
+
+            # Start on first use
+            if not self.__running:
+                self.__start()
+
+            limit = self.__limits.get(key)
+
+            # Rate limit window has passed
+            if limit is not None and now - limit[0] >= constants.LOG_RATE_INTERVAL:
+                self.__summarize(level, limit)
+                limit = None
+
+            if limit is None:
+                limit = [now, 0, 0, line]
+                self.__limits[key] = limit
+
+            # Rate limit reached: count the message only
+            if limit[1] >= constants.LOG_RATE_BURST:
+                limit[2] += 1
+                limit[3] = line
+                return
+
+            limit[1] += 1
+            self.__put(level, line)
+
+
+    # function flush
+    # Description: Function that waits until the queued lines are written
+    # Parameter: self, timeout
+    # Return value: None
+    def flush(self, timeout=constants.LOG_FLUSH_TIMEOUT):
+        """ Flush queued lines """
+
+        end = time.monotonic() + timeout
+
+        with self.__condition:
+            while (self.__queue or self.__writing) and self.__running and \
+                time.monotonic() < end:
+                self.__condition.wait(end - time.monotonic())
+
+
+    # function stop
+    # Description: Function that writes the pending summaries and lines, then stops the writer
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop the writer """
+
+        with self.__condition:
+
+            # Not started
+            if not self.__running:
+                return
+
+            for limit in self.__limits.values():
+                self.__summarize(constants.LOG_INFO, limit)
+            self.__limits.clear()
+
+            self.__running = False
+            self.__condition.notify_all()
+
+        self.__writer.join()
+
+
+    # function __start
+    # Description: Function that starts the writer thread. Called with the queue lock held.
+    # Parameter: self
+    # Return value: None
+    def __start(self):
+        """ Start the writer """
+
+        self.__running = True
+        self.__writer = threading.Thread(target=self.__write_loop, \
+            name=constants.C_NAME_LOGGER, daemon=True)
+        self.__writer.start()
+
+        # Write the queued lines at exit
+        atexit.register(self.stop)
+
+
+    # function __put
+    # Description: Function that queues a line. Called with the queue lock held.
+    #              When the queue is full, the line is dropped and counted.
+    # Parameter: self, level, line
+    # Return value: None
+    def __put(self, level, line):
+        """ Queue line """
+
+        if len(self.__queue) >= constants.LOG_QUEUE_SIZE:
+            self.__dropped_cnt += 1
+            return
+
+        self.__queue.append((level, line))
+        self.__condition.notify_all()
+
+
+    # function __summarize
+    # Description: Function that queues the suppression summary of a rate limit window.
+    #              Called with the queue lock held.
+    # Parameter: self, level, limit
+    # Return value: None
+    def __summarize(self, level, limit):
+        """ Queue suppression summary """
+
+        if limit[2] > 0:
+            self.__put(level, f"{limit[3]} (repeated {limit[2]} times)")
+            limit[2] = 0
+
+
+    # function __write_loop
+    # Description: Function that writes the queued lines. Lines of level LOG_WARNING and
+    #              above go to stderr. Summaries of idle keys are written every interval.
+    # Parameter: self
+    # Return value: None
+    def __write_loop(self):
+        """ Writer thread """
+
+        running = True
+        while running:
+
+            with self.__condition:
+
+                # Wait for lines
+                if not self.__queue and self.__running:
+                    self.__condition.wait(constants.LOG_RATE_INTERVAL)
+
+                # Summaries of keys with no message since their window passed
+                now = time.monotonic()
+                for key, limit in list(self.__limits.items()):
+                    if now - limit[0] >= constants.LOG_RATE_INTERVAL:
+                        self.__summarize(constants.LOG_INFO, limit)
+                        del self.__limits[key]
+
+                lines = list(self.__queue)
+                self.__queue.clear()
+
+                if self.__dropped_cnt > 0:
+                    lines.append((constants.LOG_WARNING, f"[{constants.C_NAME_LOGGER}]" + \
+                        f"Log queue full. Dropped: {self.__dropped_cnt}"))
+                    self.__dropped_cnt = 0
+
+                running = self.__running
+                self.__writing = len(lines) > 0
+
+            for level, line in lines:
+                stream = sys.stderr if level >= constants.LOG_WARNING else sys.stdout
+                stream.write(line + "\n")
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            # Written: wake flush
+            with self.__condition:
+                self.__writing = False
+                self.__condition.notify_all()
@@ -0,0 +1,211 @@
+""" Metrics Registry """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import bisect
+import threading
+from common import constants
+#pylint: disable=wrong-import-position
+
+METRIC_COUNTER = "counter"
+METRIC_GAUGE = "gauge"
+METRIC_HISTOGRAM = "histogram"
+
+# Metric definitions: name: (type, help, histogram buckets)
+METRICS = {
+    constants.METRIC_FRAMES_PROCESSED: (METRIC_COUNTER, \
+        "Frames processed after inference", None),
+    constants.METRIC_FRAMES_SKIPPED: (METRIC_COUNTER, \
+        "Frames skipped by the frame scheduler", None),
+    constants.METRIC_PERSONS: (METRIC_HISTOGRAM, \
+        "Person detections per processed frame", constants.METRIC_COUNT_BUCKETS),
+    constants.METRIC_ACTIVE_TRACKS: (METRIC_GAUGE, \
+        "Tracks in the last processed frame", None),
+    constants.METRIC_ACTIVE_ALERTS: (METRIC_GAUGE, \
+        "Tracks in alert state in the last processed frame", None),
+    constants.METRIC_STAGE_SECONDS: (METRIC_HISTOGRAM, \
+        "Processing time per stage", constants.METRIC_LATENCY_BUCKETS),
+    constants.METRIC_TRANSFORM_SECONDS: (METRIC_HISTOGRAM, \
+        "Bird's Eye View centroid transform time", constants.METRIC_LATENCY_BUCKETS),
+    constants.METRIC_ENCODE_SECONDS: (METRIC_HISTOGRAM, \
+        "Image draw and encode time including the queue wait", constants.METRIC_LATENCY_BUCKETS),
+    constants.METRIC_ENCODE_BYTES: (METRIC_HISTOGRAM, \
+        "Encoded image size", constants.METRIC_SIZE_BUCKETS),
+    constants.METRIC_ENCODE_DROPPED: (METRIC_COUNTER, \
+        "Encode jobs dropped under load", None),
+    constants.METRIC_MQTT_PUBLISH_SECONDS: (METRIC_HISTOGRAM, \
+        "Mqtt message time from queueing to publishing", constants.METRIC_LATENCY_BUCKETS),
+    constants.METRIC_MQTT_FAILURES: (METRIC_COUNTER, \
+        "Mqtt publish failures", None),
+    constants.METRIC_MQTT_DROPPED: (METRIC_COUNTER, \
+        "Mqtt messages dropped: queue full, expired or retries exhausted", None),
+    constants.METRIC_MQTT_QUEUE_DEPTH: (METRIC_GAUGE, \
+        "Mqtt messages waiting in the outbound queue", None),
+    constants.METRIC_GST_MESSAGES: (METRIC_COUNTER, \
+        "GStreamer bus messages per type", None),
+}
+
+# class Metrics
+# Description: Class for the in-process metrics registry: counters, gauges and
+#              fixed-bucket histograms with optional labels, rendered in the
+#              Prometheus text format
+# Parameter: None
+# Return value: None
+class Metrics:
+    """ Metrics registry """
+
+    __metrics = None            # Metrics class instance
+
+    __lock = None               # Metric value lock
+    __values = None             # Value per metric name and label set
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __metrics
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if Metrics.__metrics is None:
+
+            # Call the class constructor
+            Metrics()
+
+        # Return the class instance
+        return Metrics.__metrics
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if Metrics.__metrics is None:
+
+            Metrics.__metrics = self            # Initialize Metrics class instance
+
+            self.__lock = threading.Lock()
+            self.__values = {name: {} for name in METRICS}
+
+
+    # function inc
+    # Description: Function that increments a counter
+    # Parameter: self, name, value, labels (dict of label values)
+    # Return value: None
+    def inc(self, name, value=1, labels=None):
+        """ Increment counter """
+
+        key = self.__get_key(labels)
+
+        with self.__lock:
+            values = self.__values[name]
+            values[key] = values.get(key, 0) + value
+
+
+    # function set
+    # Description: Function that sets a gauge
+    # Parameter: self, name, value, labels (dict of label values)
+    # Return value: None
+    def set(self, name, value, labels=None):
+        """ Set gauge """
+
+        key = self.__get_key(labels)
+
+        with self.__lock:
+            self.__values[name][key] = value
+
+
+    # function observe
+    # Description: Function that adds a value to a histogram
+    # Parameter: self, name, value, labels (dict of label values)
+    # Return value: None
+    def observe(self, name, value, labels=None):
+        """ Observe histogram value """
+
+        key = self.__get_key(labels)
+        buckets = METRICS[name][2]
+        index = bisect.bisect_left(buckets, value)
+
+        with self.__lock:
+
+            values = self.__values[name]
+            histogram = values.get(key)
+
+            # First value of the label set: [count per bucket..., +Inf count, sum]
+            if histogram is None:
+                histogram = [0] * (len(buckets) + 2)
+                values[key] = histogram
+
+            histogram[index] += 1
+            histogram[-1] += value
+
+
+    # function render
+    # Description: Function that returns all metrics in the Prometheus text format
+    # Parameter: self
+    # Return value: text
+    def render(self):
+        """ Render metrics """
+
+        lines = []
+
+        with self.__lock:
+
+            for name, (metric_type, help_text, buckets) in METRICS.items():
+
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+                for key, value in sorted(self.__values[name].items()):
+
+                    if metric_type != METRIC_HISTOGRAM:
+                        lines.append(f"{name}{self.__format_labels(key)} {value}")
+                        continue
+
+                    # Cumulative bucket counts
+                    count = 0
+                    for bound, bucket_count in zip(buckets + (float('inf'),), value[:-1]):
+                        count += bucket_count
+                        bucket_key = key + (("le", "+Inf" if bound == float('inf') \
+                            else repr(float(bound))),)
+                        lines.append(f"{name}_bucket{self.__format_labels(bucket_key)} {count}")
+
+                    lines.append(f"{name}_sum{self.__format_labels(key)} {value[-1]}")
+                    lines.append(f"{name}_count{self.__format_labels(key)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+    # function __get_key
+    # Description: Function that returns the key of a label set
+    # Parameter: cls, labels
+    # Return value: ((label name, label value), ...)
+    @classmethod
+    def __get_key(cls, labels):
+        """ Returns label set key """
+
+        if not labels:
+            return ()
+
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+    # function __format_labels
+    # Description: Function that formats a label set key
+    # Parameter: cls, key
+    # Return value: text
+    @classmethod
+    def __format_labels(cls, key):
+        """ Format label set """
+
+        if not key:
+            return ""
+
+        return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
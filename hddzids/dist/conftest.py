@@ -0,0 +1 @@
+""" Pytest configuration: the tests import the packages of this directory """
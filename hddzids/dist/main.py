@@ -34,19 +34,16 @@ from scripts.deep_stream import DeepStream
 def main(args):
     """ System main """
 
-    # Check input arguments
-    args_len = len(args)
-
-    if args_len < 2:
-        live_camera = True
-        stream_path = constants.CAM_CHANNEL
-    elif args_len >= 2:
-
-        live_camera = False
-        stream_path = args[1]
+    # Check input arguments. Each argument is one source:
+    # a camera device (/dev/videoN) or an h264 stream file
+    if len(args) < 2:
+        sources = [(True, constants.CAM_CHANNEL)]
+    else:
+        sources = [(stream_path.startswith(constants.CAM_CHANNEL_PREFIX), stream_path) \
+            for stream_path in args[1:]]
 
     deepstream = DeepStream.get_instance()
-    deepstream.run(live_camera, stream_path)
+    deepstream.run(sources)
 
 
 if __name__ == '__main__':
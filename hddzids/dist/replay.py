@@ -0,0 +1,286 @@
+""" HDDZIDS Metadata Replay """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+from common import constants
+from common.logger import Logger
+from scripts.tracker import BBox
+from scripts.lazy_frame import LazyFrame
+from scripts.meta_recorder import MetaRecorder, read_meta
+from scripts.frame_processor import FrameProcessor
+from scripts.calibration_watcher import CalibrationWatcher
+from scripts.stage_times import StageTimes
+from scripts.host_worker import HostWorker
+from scripts.mqtt_publisher import MqttPublisher
+from scripts.alert_notify import AlertNotify
+from scripts.stub_broker import StubBroker
+from scripts.encode_pool import EncodePool
+from scripts.metrics_server import MetricsServer
+from scripts.frame_tracer import FrameTracer
+#pylint: disable=wrong-import-position
+
+# Calibration used for synthetic metadata when no calibration file is given
+SYNTHETIC_B_EYE_CALIB = (100, 100, 900, 100, 950, 580, 50, 580)
+SYNTHETIC_D_ZONE_CALIB = (400, 300, 600, 300, 620, 450, 380, 450)
+SYNTHETIC_NAMED_D_ZONE = "press;2.0;150,150,300,130,340,260,220,330,120,250"
+
+PERSON_WIDTH = 60                   # Synthetic person bounding box width
+PERSON_HEIGHT = 150                 # Synthetic person bounding box height
+PERSON_SPEED = 8.0                  # Synthetic person maximum speed (pixels per frame)
+PERSON_LIFETIME = 300               # Synthetic person mean lifetime (frames)
+
+DRAIN_TIMEOUT = 10                  # Wait limit for the queued messages after replay (seconds)
+
+
+# function synthetic_meta
+# Description: Generator of synthetic detection metadata: persons walking across the frame
+# Parameter: frame_cnt, person_cnt, source_cnt, seed
+# Return value: (frame_number, source_id, pts, objects) per frame
+def synthetic_meta(frame_cnt, person_cnt, source_cnt, seed):
+    """ Synthetic metadata """
+
+    rand = random.Random(seed)
+    next_id = 0
+    persons = []            # [object id, x, y, dx, dy, remaining frames] per person and source
+
+    for source_id in range(source_cnt):
+        persons.append([])
+        for _ in range(person_cnt):
+            persons[source_id].append(new_person(rand, next_id))
+            next_id += 1
+
+    for frame_number in range(frame_cnt):
+
+        for source_id in range(source_cnt):
+
+            objects = []
+            for index, person in enumerate(persons[source_id]):
+
+                # Person left the scene: a new track id enters
+                person[5] -= 1
+                if person[5] <= 0:
+                    person = new_person(rand, next_id)
+                    persons[source_id][index] = person
+                    next_id += 1
+
+                # Walk and bounce at the frame edges
+                person[1] += person[3]
+                person[2] += person[4]
+                if not 0 <= person[1] <= constants.FRAME_WIDTH - PERSON_WIDTH:
+                    person[3] = -person[3]
+                if not 0 <= person[2] <= constants.FRAME_HEIGHT - PERSON_HEIGHT:
+                    person[4] = -person[4]
+
+                objects.append((person[0], constants.OBJ_CLASS_ID_PERSON, \
+                    BBox(person[1], person[2], PERSON_WIDTH, PERSON_HEIGHT)))
+
+            yield frame_number, source_id, int(frame_number * 1e9 / 30), objects
+
+
+# function new_person
+# Description: Function that creates a synthetic person at a random position
+# Parameter: rand, object_id
+# Return value: [object id, x, y, dx, dy, remaining frames]
+def new_person(rand, object_id):
+    """ New synthetic person """
+
+    return [object_id, \
+        rand.uniform(0, constants.FRAME_WIDTH - PERSON_WIDTH), \
+        rand.uniform(0, constants.FRAME_HEIGHT - PERSON_HEIGHT), \
+        rand.uniform(-PERSON_SPEED, PERSON_SPEED), \
+        rand.uniform(-PERSON_SPEED, PERSON_SPEED), \
+        int(rand.expovariate(1.0 / PERSON_LIFETIME)) + 1]
+
+
+# function write_synthetic_calibration
+# Description: Function that writes the synthetic calibration into a temporary file
+# Parameter: None
+# Return value: path
+def write_synthetic_calibration():
+    """ Write synthetic calibration """
+
+    calib_fd, path = tempfile.mkstemp(prefix="calibration_", suffix=".txt")
+    with os.fdopen(calib_fd, 'w', encoding=constants.FILE_ENCODING) as calib_file:
+        calib_file.write(",".join(str(value) for value in SYNTHETIC_B_EYE_CALIB) + "\n")
+        calib_file.write(",".join(str(value) for value in SYNTHETIC_D_ZONE_CALIB) + "\n")
+        calib_file.write(SYNTHETIC_NAMED_D_ZONE + "\n")
+
+    return path
+
+
+# function print_report
+# Description: Function that prints the per-stage latency and the throughput
+# Parameter: frame_cnt, processed_cnt, elapsed, broker
+# Return value: None
+def print_report(frame_cnt, processed_cnt, elapsed, broker):
+    """ Print replay report """
+
+    print(f"\nFrames: {frame_cnt}  Processed: {processed_cnt}  Elapsed: {elapsed:.3f} s  " + \
+        f"Throughput: {frame_cnt / elapsed if elapsed > 0 else 0:.1f} fps")
+
+    print(f"\n{'Stage':<14}{'Count':>8}{'Mean (ms)':>12}{'Max (ms)':>12}{'Total (s)':>12}")
+    for stage, (count, total, maximum) in sorted(StageTimes.get_instance().get().items()):
+        print(f"{stage:<14}{count:>8}{total / count * 1000:>12.3f}" + \
+            f"{maximum * 1000:>12.3f}{total:>12.3f}")
+
+    print(f"\nHost worker dropped results: {HostWorker.get_instance().get_dropped_count()}")
+    print(f"Alerts sent without image: {HostWorker.get_instance().get_stripped_count()}")
+    print(f"Encode pool dropped jobs: {EncodePool.get_instance().get_dropped_count()}")
+    print(f"MQTT queued messages left: {MqttPublisher.get_instance().get_queue_size()}")
+    print(f"Alert messages left in the spool: {AlertNotify.get_instance().get_spool_size()}")
+
+    if broker is not None:
+        print(f"\n{'Topic':<24}{'Messages':>10}{'Bytes':>14}")
+        for topic, (count, size) in sorted(broker.get_messages().items()):
+            print(f"{topic:<24}{count:>10}{size:>14}")
+
+
+# function main
+# Description: Function that replays detection metadata through the post-inference process
+# Parameter: args
+# Return value: None
+def main(args):
+    """ Replay main """
+
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic detection" + \
+        " metadata through the post-inference process without DeepStream.")
+    parser.add_argument('meta', nargs='?', help="recorded metadata file (default: synthetic)")
+    parser.add_argument('--frames', type=int, default=1000, help="synthetic frame count")
+    parser.add_argument('--persons', type=int, default=5, help="synthetic persons per source")
+    parser.add_argument('--sources', type=int, default=1, help="synthetic source count")
+    parser.add_argument('--seed', type=int, default=0, help="synthetic random seed")
+    parser.add_argument('--calibration', help="calibration file used for all sources")
+    parser.add_argument('--fps', type=float, default=0, help="replay rate (0: no pacing)")
+    parser.add_argument('--dwell-limit', type=float, help="danger zone dwell time limit (s)")
+    parser.add_argument('--record', help="save the replayed metadata into this file")
+    parser.add_argument('--encode-workers', type=int, default=constants.ENCODE_WORKERS, \
+        help="encode worker processes (0: encode in process)")
+    parser.add_argument('--spool', help="alert spool file (default: temporary file)")
+    parser.add_argument('--trace', help="write the per-frame stage trace (Chrome JSON)")
+    parser.add_argument('--metrics-port', type=int, \
+        help="serve the metrics on this port during the replay")
+    parser.add_argument('--host', help="MQTT host (default: local stub broker)")
+    parser.add_argument('--port', type=int, default=constants.MOBILE_PORT, help="MQTT port")
+    options = parser.parse_args(args[1:])
+
+    if options.dwell_limit is not None:
+        constants.D_ZONE_DTIME_LIMIT = options.dwell_limit
+
+    # Metadata source
+    if options.meta is not None:
+        frames = list(read_meta(options.meta))
+        source_ids = sorted({frame[1] for frame in frames})
+    else:
+        frames = list(synthetic_meta(options.frames, options.persons, options.sources, \
+            options.seed))
+        source_ids = list(range(options.sources))
+
+    # Calibration of all sources
+    calibration_path = options.calibration
+    if calibration_path is None and options.meta is None:
+        calibration_path = write_synthetic_calibration()
+
+    frame_processor = FrameProcessor.get_instance()
+    for source_id in source_ids:
+        frame_processor.add_source(source_id, calibration_path)
+
+    # Local broker in place of the mobile host
+    broker = None
+    host = options.host
+    port = options.port
+    if host is None:
+        broker = StubBroker()
+        host = '127.0.0.1'
+        port = broker.start()
+
+    metrics_server = None
+    if options.metrics_port is not None:
+        metrics_server = MetricsServer(port=options.metrics_port)
+        metrics_server.start()
+
+    EncodePool.get_instance().start(options.encode_workers)
+    MqttPublisher.get_instance().start(host, port)
+
+    # Keep the replayed alerts out of the alert spool of the device
+    spool_path = options.spool
+    if spool_path is None:
+        spool_fd, spool_path = tempfile.mkstemp(prefix="alert_spool_", suffix=".db")
+        os.close(spool_fd)
+    AlertNotify.get_instance().start(spool_path)
+
+    HostWorker.get_instance().start(use_buzzer=False)
+
+    # Rewriting the calibration file during the replay swaps it in
+    CalibrationWatcher.get_instance().start()
+
+    # Blank frame image for alert annotation
+    blank_frame = np.zeros((constants.FRAME_HEIGHT, constants.FRAME_WIDTH, 4), np.uint8)
+
+    recorder = MetaRecorder(options.record) if options.record is not None else None
+
+    if options.trace is not None:
+        FrameTracer.get_instance().start()
+
+    processed_cnt = 0
+    replay_start = time.perf_counter()
+    for frame_number, source_id, pts, objects in frames:
+
+        # Pace the replay
+        if options.fps > 0:
+            delay = replay_start + frame_number / options.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        if recorder is not None:
+            recorder.record(frame_number, source_id, pts, objects)
+
+        if frame_processor.process(source_id, objects, \
+            LazyFrame(lambda: blank_frame, source_id, pts), pts):
+            processed_cnt += 1
+
+    # Finish the queued host work and messages
+    CalibrationWatcher.get_instance().stop()
+    HostWorker.get_instance().stop()
+    drain_end = time.perf_counter() + DRAIN_TIMEOUT
+    while (MqttPublisher.get_instance().get_queue_size() > 0 or \
+        AlertNotify.get_instance().get_spool_size() > 0) and time.perf_counter() < drain_end:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - replay_start
+
+    # Keep the report after the pipeline messages
+    Logger.get_instance().flush()
+    print_report(len(frames), processed_cnt, elapsed, broker)
+
+    if options.trace is not None:
+        FrameTracer.get_instance().stop()
+        print(f"\nTrace spans written: {FrameTracer.get_instance().dump(options.trace)}" + \
+            f" [{options.trace}]")
+
+    AlertNotify.get_instance().stop()
+    MqttPublisher.get_instance().stop()
+    EncodePool.get_instance().stop()
+    if broker is not None:
+        broker.stop()
+    if metrics_server is not None:
+        metrics_server.stop()
+    if recorder is not None:
+        recorder.close()
+    if calibration_path is not None and calibration_path != options.calibration:
+        os.remove(calibration_path)
+    if spool_path != options.spool:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(spool_path + suffix):
+                os.remove(spool_path + suffix)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -4,10 +4,15 @@
 # Add license here
 
 # Add imports here
-import socket
-import paho.mqtt.client as mqtt
+import threading
+import time
+import sqlite3
 from common import constants
 from common.common import Common
+from scripts.mqtt_publisher import MqttPublisher
+from scripts.annotator import Annotator
+from scripts.alert_spool import AlertSpool
+from scripts.frame_tracer import FrameTracer
 #pylint: disable=wrong-import-position
 
 
@@ -20,11 +25,13 @@ class AlertNotify:
 
     __alarm_notify = None   # AlertNotify class instance
     __common = None         # Common class instance
+    __publisher = None      # MqttPublisher class instance
 
-    # Alert pool
-    __alert_topics = []     # Holds alert topic
-    __alert_messages = []   # Holds alert messages
-    __alert_try = []        # Holds alert try counter
+    __spool = None          # AlertSpool instance
+    __traces = None         # (source id, pts) per spooled message id while tracing
+    __condition = None      # Drainer condition
+    __drainer = None        # Spool drainer thread
+    __running = False       # Drainer running flag
 
     # function get_instance
     # Description: Functon to return the class instance
@@ -56,155 +63,265 @@ class AlertNotify:
 
             AlertNotify.__alarm_notify = self            # Initialize AlertNotify class instance
             self.__common = Common.get_instance()        # Initialize Common class instance
+            self.__publisher = MqttPublisher.get_instance() # Initialize MqttPublisher class instance
             self.name = constants.C_NAME_ALERT_NOTIFY    # Set class name
 
+            self.__condition = threading.Condition()
+            self.__traces = {}
 
-    # function __send_alert_to_host
-    # Description: Function that publish alert data and image
-    # Paremeter: self, topic, message
-    # Return value: result
-    def __send_alert_to_host(self, topic, message):
-        """ Send alert message to mobile host """
+            # Full resolution image requests of all sources
+            self.__publisher.subscribe(constants.MSG_TOPIC_ALERT_REQUEST, self.__on_request)
+            self.__publisher.subscribe(constants.MSG_TOPIC_ALERT_REQUEST + "/+", \
+                self.__on_request)
 
 
-        client = mqtt.Client()    # Get mqtt client instance
+    # function start
+    # Description: Function that opens the alert spool and starts the drainer thread.
+    #              Alerts left in the spool by the last run are sent again.
+    # Parameter: self, path
+    # Return value: None
+    def start(self, path=constants.ALERT_SPOOL_PATH):
+        """ Start the spool drainer """
 
-        try:
+        with self.__condition:
 
-            # Connect mqtt client
-            client.connect(constants.MOBILE_HOST, constants.MOBILE_PORT, 60)
+            # Already started
+            if self.__running:
+                return
 
-            # Publish message
-            client.publish(topic, message)
+            self.__spool = AlertSpool(path)
 
-        # This error occurred when:
-        # - The MQTT service is off
-        # - The Host and Port of MQTT service and Edge PC did not matched
-        except ConnectionRefusedError:
+            backlog = len(self.__spool)
+            if backlog > 0:
+                self.__common.post_message(self.name, \
+                    f"Alert messages left in the spool: {backlog}")
 
-            self.__common.post_message(self.name, \
-                "[ConnectionRefusedError] Unable to connect to MQTT service!")
-            result = constants.RETURN_NG
+            self.__running = True
+            self.__drainer = threading.Thread(target=self.__drain_loop, name=self.name, \
+                daemon=True)
+            self.__drainer.start()
 
-        # This error occurred when the IP string is not valid
-        except socket.gaierror:
 
-            self.__common.post_message(self.name, \
-                "[socket.gaierror] Invalid MQTT host!")
-            result = constants.RETURN_NG
+    # function stop
+    # Description: Function that stops the drainer thread and closes the alert spool.
+    #              Alerts not yet acknowledged stay in the spool.
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop the spool drainer """
 
-        # This error occurred when:
-        # - The Host is set with integer
-        # - The Port is set with string
-        except TypeError:
+        # Not started
+        if not self.__running:
+            return
 
-            self.__common.post_message(self.name, \
-                "[TypeError] Host IP should be in string form. Port should be in int form.")
-            result = constants.RETURN_NG
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+        self.__drainer.join()
 
-        # Published successfully
-        else:
+        self.__spool.close()
 
-            # Notification when the message sent is alert data
-            if constants.MSG_TOPIC_ALERT_DATA == topic:
 
-                self.__common.post_message(self.name, \
-                    f"Alert data was sent: [TOPIC:{topic}][MSG:{message}].")
+    # function get_spool_size
+    # Description: Function that returns the number of alert messages not yet acknowledged
+    # Parameter: self
+    # Return value: spooled message count
+    def get_spool_size(self):
+        """ Returns the spool size """
+
+        return len(self.__spool) if self.__running else 0
 
-            # Notification when the message sent is alert image
-            elif constants.MSG_TOPIC_ALERT_IMAGE == topic:
 
-                self.__common.post_message(self.name, "Alert image was sent.")
+    # function add_alert
+    # Description: Function that writes the alerts of a frame into the alert spool
+    #              as one batched alert. The alert data lists every alert as
+    #              "<object id>/<alert time>", joined by ALERT_DATA_SEPARATOR. Only the
+    #              alerts of a named zone append "/<zone name>", so the alert data of
+    #              a calibration without zone names keeps the original format.
+    #              The image and thumbnail are shared by the alerts.
+    # Paremeter: self, alerts ([(object id, alert time, zone name (None: unnamed)), ...]),
+    #            image (region of interest),
+    #            source_id, thumbnail, pts (buffer PTS of the alert frame for the trace)
+    # Return value: None
+    def add_alert(self, alerts, image, source_id=0, thumbnail=None, pts=None):
+        """ Add new alerts into the alert spool """
+
+        # Start on first use
+        self.start()
 
-            # Result is successful
-            result = constants.RETURN_OK
+        # Add alert message
+        topic = self.__common.get_topic(constants.MSG_TOPIC_ALERT_DATA, source_id)
+        message = constants.ALERT_DATA_SEPARATOR.join(self.get_alert_id(*alert) \
+            for alert in alerts)
+        message_ids = [self.__spool.put(topic, message, constants.MQTT_PRIORITY_ALERT_DATA)]
+        self.__common.post_message(self.name, \
+            f"Alert data was spooled: [TOPIC:{topic}][MSG:{message}].")
+
+        # Add alert thumbnail
+        if thumbnail is not None:
+            message_ids.append(self.__spool.put( \
+                self.__common.get_topic(constants.MSG_TOPIC_ALERT_THUMB, source_id), \
+                thumbnail, constants.MQTT_PRIORITY_ALERT_IMAGE))
 
-        finally:
+        # Add alert image
+        if image is not None:
+            message_ids.append(self.__spool.put( \
+                self.__common.get_topic(constants.MSG_TOPIC_ALERT_IMAGE, source_id), \
+                image, constants.MQTT_PRIORITY_ALERT_IMAGE))
 
-            # Disconnect client
-            client.disconnect()
+        # Frame of the messages for the trace
+        if FrameTracer.get_instance().is_enabled():
+            for message_id in message_ids:
+                if message_id is not None:
+                    self.__traces[message_id] = (source_id, pts)
 
-        # Return process result
-        return result
+        # Wake the drainer
+        with self.__condition:
+            self.__condition.notify()
 
 
-    # function add_alert
-    # Description: Function that adds alert details into the alert pool
-    # Paremeter: self, object_id, alert_time, image
-    # Return value: None
-    def add_alert(self, object_id, alert_time, image):
-        """ Add new alert into the alert pool """
+    # function get_alert_id
+    # Description: Function that returns the id of an alert: its alert data entry.
+    #              The host requests the full resolution image of an alert by this id.
+    # Parameter: cls, object_id, alert_time, zone_name (None: unnamed zone)
+    # Return value: alert id
+    @classmethod
+    def get_alert_id(cls, object_id, alert_time, zone_name=None):
+        """ Returns the alert id """
 
-        # Add alert message
-        self.__alert_topics.append(constants.MSG_TOPIC_ALERT_DATA)
-        message = f"{object_id}/{alert_time}"
-        self.__alert_messages.append(message)
-        self.__alert_try.append(0)
+        alert_id = f"{object_id}/{alert_time}"
 
-        # Add alert image
-        self.__alert_topics.append(constants.MSG_TOPIC_ALERT_IMAGE)
-        message = image
-        self.__alert_messages.append(image)
-        self.__alert_try.append(0)
+        # Named zone
+        if zone_name is not None:
+            alert_id += f"/{zone_name}"
 
+        return alert_id
 
-    # function send_alert
-    # Description: Function that monitors the send try counter after sending an alert
-    # Paremeter: self
+
+    # function __drain_loop
+    # Description: Function that sends the spooled alerts while connected, at most
+    #              ALERT_SPOOL_DRAIN_RATE messages per second and ALERT_SPOOL_IN_FLIGHT
+    #              messages waiting for the acknowledgement
+    # Parameter: self
     # Return value: None
-    def send_alert(self):
-        """ Send alert while max try counter is not yet reached """
+    def __drain_loop(self):
+        """ Spool drainer thread """
+
+        while self.__running:
+
+            now = time.monotonic()
+            sent_cnt = 0
+
+            if self.__publisher.is_connected():
+
+                try:
+                    room = constants.ALERT_SPOOL_IN_FLIGHT - self.__spool.get_in_flight_count(now)
+                    pending = self.__spool.get_pending(now, room) if room > 0 else []
 
-        # Check if the alert list has alert left
-        if len(self.__alert_topics) > 0:
+                # Keep the drainer alive on a spool error
+                except sqlite3.Error as error:
+                    self.__common.post_message(self.name, f"Alert spool error! [{error}]")
+                    pending = []
 
-            index = 0              # First index
+                for message_id, topic, payload, priority in pending:
 
-            # check if max retry is not yet reached
-            if constants.MAX_TRY > self.__alert_try[index]:
+                    self.__send_alert_to_host(message_id, topic, payload, priority)
+                    sent_cnt += 1
 
-                self.__common.post_message(self.name, f"Send count: {self.__alert_try[index]}")
+            with self.__condition:
 
-                # Send alert message to mobile host
-                result = self.__send_alert_to_host(
-                    self.__alert_topics[index],
-                    self.__alert_messages[index]
-                )
+                # Keep the drain rate
+                next_time = now + sent_cnt / constants.ALERT_SPOOL_DRAIN_RATE
+                while self.__running and time.monotonic() < next_time:
+                    self.__condition.wait(next_time - time.monotonic())
 
-                # Check if send result is not good
-                if constants.RETURN_NG == result:
+                # Wait for new alerts or acknowledgements
+                if self.__running and sent_cnt == 0:
+                    self.__condition.wait(constants.ALERT_SPOOL_POLL_INTERVAL)
 
-                    # Add try count
-                    self.__alert_try[index] += 1
 
-                    # Check if max try has been reached
-                    if constants.MAX_TRY == self.__alert_try[index]:
+    # function __send_alert_to_host
+    # Description: Function that queues a spooled alert message for publishing.
+    #              The message is deleted from the spool when acknowledged by the broker.
+    #              If not acknowledged within ALERT_SPOOL_ACK_TIMEOUT, it is sent again.
+    # Paremeter: self, message_id, topic, message, priority
+    # Return value: result
+    def __send_alert_to_host(self, message_id, topic, message, priority):
+        """ Send alert message to mobile host """
 
-                        # Delete alert
-                        self.__pop_alert()
+        # function ack
+        # Description: Callback that deletes the acknowledged message from the spool
+        # Parameter: None
+        # Return value: None
+        def ack():
+            """ Acknowledge spooled message """
 
-                # Successfull sending
-                else:
+            try:
+                self.__spool.ack(message_id)
 
-                    # Delete alert
-                    self.__pop_alert()
+            # Sent again after the acknowledgement timeout
+            except sqlite3.Error as error:
+                self.__common.post_message(self.name, f"Alert spool error! [{error}]")
 
-            # Try counter reached limit
-            else:
+            # Wake the drainer: in-flight room
+            with self.__condition:
+                self.__condition.notify()
 
-                # Delete alert
-                self.__pop_alert()
+            # Notification when the message sent is alert data
+            if topic.startswith(constants.MSG_TOPIC_ALERT_DATA):
+
+                self.__common.post_message(self.name, \
+                    f"Alert data was sent: [TOPIC:{topic}]" + \
+                    f"[MSG:{message.decode(constants.FILE_ENCODING)}].")
 
+        # Queue message on the shared publisher. Stale copies expire when sent again
+        return self.__publisher.publish(topic, message, constants.ALERT_SPOOL_QOS, \
+            priority=priority, ttl=constants.ALERT_SPOOL_ACK_TIMEOUT, on_sent=ack, \
+            trace=self.__traces.pop(message_id, None))
 
-    # function __pop_alert
-    # Description: Function that pops the first element from alert pool
-    # Paremeter: self
+
+    # function __on_request
+    # Description: Callback when the host requests the full resolution image of an alert.
+    #              Payload is the alert id: the alert data entry of the alert.
+    #              The image is published on MSG_TOPIC_ALERT_FULL/<alert id>.
+    # Paremeter: self, topic, payload
     # Return value: None
-    def __pop_alert(self):
-        """ Pops alert from alert pool """
-
-        # Delete alert
-        index = 0
-        del self.__alert_topics[index]
-        del self.__alert_messages[index]
-        del self.__alert_try[index]
+    def __on_request(self, topic, payload):
+        """ Full resolution image request """
+
+        # Source id is the last topic level, except for source 0
+        levels = topic.split('/')
+        source_id = int(levels[-1]) if topic != constants.MSG_TOPIC_ALERT_REQUEST else 0
+
+        # Alert id: "<object id>/<alert time>[/<zone name>]"
+        try:
+            alert_id = payload.decode(constants.FILE_ENCODING).strip()
+            int(alert_id.split('/')[0])
+        except ValueError:
+            self.__common.post_message(self.name, f"Invalid image request: [{payload}]")
+            return
+
+        future = Annotator.get_instance().get_full_image((source_id, alert_id))
+
+        # Frame is no longer cached
+        if future is None:
+            self.__common.post_message(self.name, \
+                f"Requested image is not available: [SOURCE:{source_id}][ID:{alert_id}]")
+            return
+
+        full_topic = self.__common.get_topic(constants.MSG_TOPIC_ALERT_FULL, source_id) + \
+            f"/{alert_id}"
+
+        # function publish_full_image
+        # Description: Callback that publishes the encoded image
+        # Parameter: done
+        # Return value: None
+        def publish_full_image(done):
+            """ Publish full resolution image """
+
+            if done.result() is not None:
+                self.__publisher.publish(full_topic, done.result(), 1, \
+                    priority=constants.MQTT_PRIORITY_ALERT_IMAGE, ttl=constants.MQTT_TTL_ALERT)
+
+        # Publish when encoded
+        future.add_done_callback(publish_full_image)
@@ -0,0 +1,187 @@
+""" Alert Spool """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import os
+import sqlite3
+import threading
+from common import constants
+#pylint: disable=wrong-import-position
+
+# class AlertSpool
+# Description: Class for a size-capped on-disk spool of alert messages.
+#              Alert messages are written before sending and deleted once acknowledged,
+#              so they survive broker outages and restarts. Backed by SQLite in WAL mode.
+# Parameter: path, max_bytes
+# Return value: None
+class AlertSpool:
+    """ Crash-safe alert message spool """
+
+    # function __init__
+    # Description: Class constructor. Messages sent before a restart are sent again.
+    # Parameter: self, path, max_bytes
+    # Return value: None
+    def __init__(self, path=constants.ALERT_SPOOL_PATH, \
+        max_bytes=constants.ALERT_SPOOL_MAX_BYTES):
+        """ Open the spool """
+
+        self.__max_bytes = max_bytes    # Spool size limit (payload bytes)
+        self.__lock = threading.Lock()  # Connection lock: shared by the alert and MQTT threads
+        self.__dropped_cnt = 0          # Dropped message count: spool full
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=FULL")
+        self.__connection.execute( \
+            "CREATE TABLE IF NOT EXISTS spool (" \
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, " \
+            "topic TEXT NOT NULL, " \
+            "payload BLOB NOT NULL, " \
+            "priority INTEGER NOT NULL, " \
+            "sent REAL NOT NULL DEFAULT 0)")
+
+        # Nothing is in flight after a restart. Sent time 0: not sent
+        with self.__connection:
+            self.__connection.execute("UPDATE spool SET sent = 0")
+
+        self.__size = self.__connection.execute( \
+            "SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM spool").fetchone()[0]
+
+
+    # function __len__
+    # Description: Function that returns the spooled message count
+    # Parameter: self
+    # Return value: message count
+    def __len__(self):
+        """ Returns the spooled message count """
+
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+
+    # function put
+    # Description: Function that writes a message into the spool. When the spool is full,
+    #              the oldest images are dropped, and a new image is refused if no older
+    #              image is left. Alert data is never dropped: it may exceed the size limit.
+    # Parameter: self, topic, payload (str or bytes), priority
+    # Return value: message id or None if the message was refused
+    def put(self, topic, payload, priority):
+        """ Spool message """
+
+        if isinstance(payload, str):
+            payload = payload.encode(constants.FILE_ENCODING)
+
+        with self.__lock, self.__connection:
+
+            cursor = self.__connection.execute( \
+                "INSERT INTO spool (topic, payload, priority) VALUES (?, ?, ?)", \
+                (topic, sqlite3.Binary(payload), priority))
+            self.__size += len(payload)
+
+            message_id = cursor.lastrowid
+
+            # Spool is full
+            while self.__size > self.__max_bytes:
+
+                # Oldest image, never alert data
+                row = self.__connection.execute( \
+                    "SELECT id, LENGTH(payload) FROM spool WHERE id != ? AND priority > ? " \
+                    "ORDER BY priority DESC, id LIMIT 1", \
+                    (message_id, constants.MQTT_PRIORITY_ALERT_DATA)).fetchone()
+
+                # No image left: refuse the new image, keep new alert data
+                if row is None:
+
+                    if priority > constants.MQTT_PRIORITY_ALERT_DATA:
+                        row = (message_id, len(payload))
+                        message_id = None
+                    else:
+                        break
+
+                self.__connection.execute("DELETE FROM spool WHERE id = ?", (row[0],))
+                self.__size -= row[1]
+                self.__dropped_cnt += 1
+
+        return message_id
+
+
+    # function get_pending
+    # Description: Function that returns the messages to be sent, in priority and spool order,
+    #              and marks them as sent. Messages not acknowledged within
+    #              ALERT_SPOOL_ACK_TIMEOUT are returned again.
+    # Parameter: self, now, limit
+    # Return value: [(message id, topic, payload, priority), ...]
+    def get_pending(self, now, limit):
+        """ Take messages to be sent """
+
+        with self.__lock, self.__connection:
+
+            rows = self.__connection.execute( \
+                "SELECT id, topic, payload, priority FROM spool WHERE sent = 0 OR sent <= ? " \
+                "ORDER BY priority, id LIMIT ?", \
+                (now - constants.ALERT_SPOOL_ACK_TIMEOUT, limit)).fetchall()
+
+            self.__connection.executemany("UPDATE spool SET sent = ? WHERE id = ?", \
+                [(now, row[0]) for row in rows])
+
+        return [(row[0], row[1], bytes(row[2]), row[3]) for row in rows]
+
+
+    # function get_in_flight_count
+    # Description: Function that returns the count of messages sent and not yet acknowledged
+    # Parameter: self, now
+    # Return value: message count
+    def get_in_flight_count(self, now):
+        """ Returns the in-flight count """
+
+        with self.__lock:
+            return self.__connection.execute( \
+                "SELECT COUNT(*) FROM spool WHERE sent != 0 AND sent > ?", \
+                (now - constants.ALERT_SPOOL_ACK_TIMEOUT,)).fetchone()[0]
+
+
+    # function ack
+    # Description: Function that deletes an acknowledged message
+    # Parameter: self, message_id
+    # Return value: None
+    def ack(self, message_id):
+        """ Acknowledge message """
+
+        with self.__lock, self.__connection:
+
+            row = self.__connection.execute( \
+                "SELECT LENGTH(payload) FROM spool WHERE id = ?", (message_id,)).fetchone()
+
+            # Already acknowledged or dropped
+            if row is None:
+                return
+
+            self.__connection.execute("DELETE FROM spool WHERE id = ?", (message_id,))
+            self.__size -= row[0]
+
+
+    # function get_dropped_count
+    # Description: Function that returns the dropped message count
+    # Parameter: self
+    # Return value: __dropped_cnt
+    def get_dropped_count(self):
+        """ Returns the dropped count """
+
+        return self.__dropped_cnt
+
+
+    # function close
+    # Description: Function that closes the spool
+    # Parameter: self
+    # Return value: None
+    def close(self):
+        """ Close the spool """
+
+        with self.__lock:
+            self.__connection.close()
@@ -4,8 +4,12 @@
 # Add license here
 
 # Add imports here
+import threading
+import concurrent.futures
+from collections import OrderedDict
 import cv2
 from common import constants
+from scripts.encode_pool import EncodePool
 #pylint: disable=wrong-import-position
 
 # class Annotator
@@ -16,7 +20,8 @@ class Annotator:
     """ Frame annotator """
 
     __annotator = None  # Class instance
-    __frame = None      # Frame image
+    __cache = None      # Full resolution alert frames: {key: [frame, draw_ops, encoded image]}
+    __cache_lock = None # Alert frame cache lock
 
     # function get_instance
     # Description: Functon to return the class instance
@@ -49,25 +54,129 @@ class Annotator:
             # Initialize class instance
             Annotator.__annotator = self
 
+            self.__cache = OrderedDict()
+            self.__cache_lock = threading.Lock()
 
-    # function set_frame
-    # Description: Function to set frame image
-    # Parameter: self, frame
+
+    # function annotate
+    # Description: Function to annotate the frame. Returns a crop around the bounding boxes
+    #              and a downscaled context thumbnail. The full resolution frame is kept
+    #              in a bounded cache until requested.
+    # Parameter: self, annotator_data, frame,
+    #            cache_keys (keys of the full resolution frame in the cache)
+    # Return value: roi_img, thumb_img
+    def annotate(self, annotator_data, frame, cache_keys=()):
+        """ Annotate the frame """
+
+        encode_pool = EncodePool.get_instance()
+
+        # Region of interest: union of the bounding boxes with margin
+        x_1, y_1, x_2, y_2 = self.__get_roi(annotator_data, frame.shape)
+        roi = frame[y_1:y_2, x_1:x_2]
+        roi_ops = self.__get_draw_ops(annotator_data, (x_1, y_1))
+        roi_future = encode_pool.submit(roi, roi_ops)
+
+        # Context thumbnail
+        scale = constants.ALERT_THUMB_WIDTH / frame.shape[1]
+        thumb = cv2.resize(frame, (constants.ALERT_THUMB_WIDTH, \
+            max(int(frame.shape[0] * scale), 1)), interpolation=cv2.INTER_AREA)
+        thumb_ops = self.__get_draw_ops(annotator_data, (0, 0), scale)
+        thumb_future = encode_pool.submit(thumb, thumb_ops)
+
+        # Keep the full resolution frame. Encoded on request only.
+        # The entry is shared by the keys, so the frame is encoded once
+        if len(cache_keys) > 0:
+            entry = [frame, self.__get_draw_ops(annotator_data), None]
+            with self.__cache_lock:
+                for cache_key in cache_keys:
+                    self.__cache[cache_key] = entry
+                while len(self.__cache) > constants.ALERT_CACHE_SIZE:
+                    self.__cache.popitem(last=False)
+
+        # Return the annotated frame images. Alert images are never dropped:
+        # encoded in this thread if a worker does not answer
+        return encode_pool.wait(roi_future, roi, roi_ops), \
+            encode_pool.wait(thumb_future, thumb, thumb_ops)
+
+
+    # function get_full_image
+    # Description: Function that returns the full resolution annotated frame of an alert.
+    #              The frame is encoded on first request and the bytes are kept in the cache.
+    # Parameter: self, cache_key
+    # Return value: future (result: byte_img) or None if the frame is no longer cached
+    def get_full_image(self, cache_key):
+        """ Returns the full resolution image """
+
+        with self.__cache_lock:
+
+            entry = self.__cache.get(cache_key)
+
+            # Not cached
+            if entry is None:
+                return None
+
+            self.__cache.move_to_end(cache_key)
+
+            # Already encoded
+            if entry[2] is not None:
+                future = concurrent.futures.Future()
+                future.set_result(entry[2])
+                return future
+
+            frame, draw_ops, _ = entry
+
+        future = EncodePool.get_instance().submit(frame, draw_ops)
+        future.add_done_callback(lambda done: self.__set_full_image(cache_key, done.result()))
+
+        return future
+
+
+    # function __set_full_image
+    # Description: Function that keeps the encoded full resolution image in the cache
+    # Parameter: self, cache_key, byte_img
     # Return value: None
-    def set_frame(self, frame):
-        """ Set frame image """
+    def __set_full_image(self, cache_key, byte_img):
+        """ Set encoded full resolution image """
 
-        self.__frame = frame
+        with self.__cache_lock:
 
+            entry = self.__cache.get(cache_key)
+
+            # Encoded bytes replace the frame
+            if entry is not None and byte_img is not None:
+                entry[0] = None
+                entry[2] = byte_img
 
-    # function annotate
-    # Description: Function to annotate the frame
-    # Parameter: self, annotator_data
-    # Return value: frame
-    def annotate(self, annotator_data):
-        """ Annotate the frame """
 
-        frame = self.__frame.copy()    # Set frame image
+    # function __get_roi
+    # Description: Function that returns the union of the bounding boxes with margin,
+    #              clipped to the frame
+    # Parameter: cls, annotator_data, shape
+    # Return value: x1, y1, x2, y2
+    @classmethod
+    def __get_roi(cls, annotator_data, shape):
+        """ Returns the region of interest """
+
+        margin = constants.ALERT_ROI_MARGIN
+
+        x_1 = min(int(bbox.left) for bbox, _ in annotator_data) - margin
+        y_1 = min(int(bbox.top) for bbox, _ in annotator_data) - margin
+        x_2 = max(int(bbox.left + bbox.width) for bbox, _ in annotator_data) + margin
+        y_2 = max(int(bbox.top + bbox.height) for bbox, _ in annotator_data) + margin
+
+        return max(x_1, 0), max(y_1, 0), min(max(x_2, x_1 + 1), shape[1]), \
+            min(max(y_2, y_1 + 1), shape[0])
+
+
+    # function __get_draw_ops
+    # Description: Function that returns the drawing operations of the alert annotation
+    # Parameter: cls, annotator_data, offset (top-left of the drawn image), scale
+    # Return value: draw_ops
+    @classmethod
+    def __get_draw_ops(cls, annotator_data, offset=(0, 0), scale=1.0):
+        """ Returns annotation drawing """
+
+        draw_ops = []
 
         for data in annotator_data:
 
@@ -81,14 +190,15 @@ class Annotator:
             height = int(bbox.height)      # Set bounding box height
 
             # Draw bounding box
-            cv2.rectangle(frame, (bbox_x, bbox_y), (bbox_x + width, bbox_y + height), \
-                constants.PTS_ALRT_ZONE_COLOR, 1)
+            draw_ops.append(("rectangle", \
+                (int((bbox_x - offset[0]) * scale), int((bbox_y - offset[1]) * scale)), \
+                (int((bbox_x + width - offset[0]) * scale), \
+                    int((bbox_y + height - offset[1]) * scale)), \
+                constants.PTS_ALRT_ZONE_COLOR, 1))
 
             # Draw centroid
-            cv2.circle(frame, centroid, 7, constants.PTS_ALRT_ZONE_COLOR, -1)
-
-        __, img = cv2.imencode(".jpg", frame)
-        byte_img = img.tobytes()
+            draw_ops.append(("circle", \
+                (int((centroid[0] - offset[0]) * scale), int((centroid[1] - offset[1]) * scale)), \
+                max(int(7 * scale), 1), constants.PTS_ALRT_ZONE_COLOR, -1))
 
-        # Return the annotated frame image
-        return byte_img
+        return draw_ops
@@ -0,0 +1,79 @@
+""" Bird's Eye Transform """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import cv2
+import numpy as np
+#pylint: disable=wrong-import-position
+
+# class BirdsEyeTransform
+# Description: Class for in-memory perspective transformation of points.
+#              Replaces the input/output file round trip of the Bird's Eye Converter plugin.
+# Parameter: src_corners, dst_corners
+# Return value: None
+class BirdsEyeTransform:
+    """ Perspective transform between two 4-corner areas """
+
+    __matrix = None         # Holds the 3x3 perspective matrix
+
+    # function __init__
+    # Description: Class constructor. Computes the perspective matrix once.
+    # Parameter: self, src_corners, dst_corners
+    #            (flat lists of 8 values: x1, y1, x2, y2, x3, y3, x4, y4)
+    # Return value: None
+    def __init__(self, src_corners, dst_corners):
+        """ Compute the perspective matrix """
+
+        # Set source and destination corner points
+        src_pts = self.to_points(src_corners).astype(np.float32)
+        dst_pts = self.to_points(dst_corners).astype(np.float32)
+
+        # Compute perspective matrix
+        self.__matrix = cv2.getPerspectiveTransform(src_pts, dst_pts)
+
+
+    # function to_points
+    # Description: Function that converts a flat corner list into an (N, 2) array
+    # Parameter: cls, corners
+    # Return value: points
+    @classmethod
+    def to_points(cls, corners):
+        """ Convert flat corner list into (N, 2) array """
+
+        return np.asarray(corners, dtype=np.float64).reshape(-1, 2)
+
+
+    # function transform
+    # Description: Function that maps points with the perspective matrix in one vectorized call
+    # Parameter: self, points (list of (x, y) or (N, 2) array)
+    # Return value: trans_points ((N, 2) int array)
+    def transform(self, points):
+        """ Transform points """
+
+        # Set points as (N, 2) array
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+        # Nothing to transform
+        if points.shape[0] == 0:
+            return np.empty((0, 2), dtype=np.int32)
+
+        # Apply matrix on homogeneous coordinates
+        trans = points.dot(self.__matrix[:, :2].T) + self.__matrix[:, 2]
+
+        # Normalize by w
+        trans_points = trans[:, :2] / trans[:, 2:3]
+
+        # Return transformed points as int
+        return np.rint(trans_points).astype(np.int32)
+
+
+    # function transform_corners
+    # Description: Function that transforms corner points and returns them as flat list
+    # Parameter: self, corners
+    # Return value: trans_corners
+    def transform_corners(self, corners):
+        """ Transform flat corner list """
+
+        return self.transform(self.to_points(corners)).reshape(-1).tolist()
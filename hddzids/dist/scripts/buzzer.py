@@ -6,6 +6,7 @@
 # Add imports here
 import time
 from common import constants
+from common.common import Common
 from RPi import GPIO
 
 #pylint: disable=wrong-import-position
@@ -71,7 +72,8 @@ class Buzzer:
             if not GPIO.input(constants.BUZZ_PIN):
 
                 # Activate buzzer alarm
-                print(f"Outputting {GPIO.HIGH} to pin {constants.BUZZ_PIN}")
+                Common.post_message(constants.C_NAME_BUZZER, \
+                    f"Outputting {GPIO.HIGH} to pin {constants.BUZZ_PIN}")
                 GPIO.output(constants.BUZZ_PIN, GPIO.HIGH)
 
         except KeyboardInterrupt:
@@ -92,7 +94,8 @@ class Buzzer:
             if GPIO.input(constants.BUZZ_PIN):
 
                 # Deactivate buzzer alarm
-                print(f"Outputting {GPIO.LOW} to pin {constants.BUZZ_PIN}")
+                Common.post_message(constants.C_NAME_BUZZER, \
+                    f"Outputting {GPIO.LOW} to pin {constants.BUZZ_PIN}")
                 GPIO.output(constants.BUZZ_PIN, GPIO.LOW)
 
         except KeyboardInterrupt:
@@ -0,0 +1,154 @@
+""" Calibration Watcher """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import threading
+from common import constants
+from common.common import Common
+from scripts.frame_processor import FrameProcessor
+#pylint: disable=wrong-import-position
+
+# class CalibrationWatcher
+# Description: Class that watches the calibration files of the processed sources.
+#              A rewritten file is validated and parsed in the watcher thread, then
+#              handed to the frame processor, which swaps it in before the next frame.
+#              An invalid file is ignored and the current calibration is kept.
+# Parameter: None
+# Return value: None
+class CalibrationWatcher:
+    """ Calibration file watcher """
+
+    __calibration_watcher = None  # CalibrationWatcher class instance
+    __common = None               # Common class instance
+
+    __signatures = None           # Last seen signature per calibration file path
+    __stop_event = None           # Watcher stop event
+    __watcher = None              # Watcher thread
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __calibration_watcher
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if CalibrationWatcher.__calibration_watcher is None:
+
+            # Call the class constructor
+            CalibrationWatcher()
+
+        # Return the class instance
+        return CalibrationWatcher.__calibration_watcher
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if CalibrationWatcher.__calibration_watcher is None:
+
+            CalibrationWatcher.__calibration_watcher = self # Set CalibrationWatcher instance
+            self.__common = Common.get_instance()           # Set Common class instance
+            self.name = constants.C_NAME_CALIBRATION_WATCHER # Set class name
+
+            self.__signatures = {}
+            self.__stop_event = threading.Event()
+
+
+    # function start
+    # Description: Function that starts watching the calibration files of the added sources.
+    #              The files as they are now are read by the first frame of each source.
+    # Parameter: self
+    # Return value: None
+    def start(self):
+        """ Start watching """
+
+        # Already started
+        if self.__watcher is not None:
+            return
+
+        for path in set(FrameProcessor.get_instance().get_calibration_paths().values()):
+            self.__signatures[path] = self.__common.get_calibration_signature(path)
+
+        self.__stop_event.clear()
+        self.__watcher = threading.Thread(target=self.__watch_loop, name=self.name, \
+            daemon=True)
+        self.__watcher.start()
+
+
+    # function stop
+    # Description: Function that stops watching
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop watching """
+
+        # Not started
+        if self.__watcher is None:
+            return
+
+        self.__stop_event.set()
+        self.__watcher.join()
+        self.__watcher = None
+
+
+    # function check
+    # Description: Function that checks the calibration files once and hands the
+    #              changed valid calibrations to the frame processor
+    # Parameter: self
+    # Return value: None
+    def check(self):
+        """ Check calibration files """
+
+        frame_processor = FrameProcessor.get_instance()
+
+        # Sources may share a calibration file
+        sources = {}
+        for source_id, path in frame_processor.get_calibration_paths().items():
+            sources.setdefault(path, []).append(source_id)
+
+        for path, source_ids in sources.items():
+
+            # Unchanged file
+            signature = self.__common.get_calibration_signature(path)
+            if signature == self.__signatures.get(path):
+                continue
+
+            self.__signatures[path] = signature
+
+            # File removed: keep the current calibration
+            if signature is None:
+                continue
+
+            # Invalid file: keep the current calibration.
+            # A partially written file is read again when its writing completes.
+            if self.__common.check_calibration_file(path) != constants.V_CALIB_OK:
+                self.__common.post_message(self.name, f"[{path}] is not valid." + \
+                    " The current calibration is kept.", constants.LOG_WARNING)
+                continue
+
+            calibrations = self.__common.get_calibrations(path)
+            if calibrations is None:
+                continue
+
+            for source_id in source_ids:
+                frame_processor.set_calibrations(source_id, calibrations)
+
+
+    # function __watch_loop
+    # Description: Function that checks the calibration files every CALIBRATION_WATCH_INTERVAL
+    # Parameter: self
+    # Return value: None
+    def __watch_loop(self):
+        """ Watcher thread """
+
+        while not self.__stop_event.wait(constants.CALIBRATION_WATCH_INTERVAL):
+            self.check()
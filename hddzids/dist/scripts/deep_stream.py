@@ -23,10 +23,8 @@
 # DEALINGS IN THE SOFTWARE.
 ################################################################################
 
-import sys
 import math
-import cv2
-import numpy as np
+import time
 import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import GObject, Gst
@@ -36,12 +34,17 @@ from common.bus_call import bus_call
 from common.common import Common
 from common import constants
 from plugins.screen_calibration import ScreenCalibration
-from scripts.tracker import Tracker
-from scripts.monitoring import Monitoring
-from scripts.host_updater import HostUpdater
-from scripts.annotator import Annotator
+from scripts.lazy_frame import LazyFrame
+from scripts.host_worker import HostWorker
+from scripts.mqtt_publisher import MqttPublisher
 from scripts.alert_notify import AlertNotify
-from scripts.buzzer import Buzzer
+from scripts.frame_scheduler import FrameScheduler
+from scripts.frame_processor import FrameProcessor
+from scripts.calibration_watcher import CalibrationWatcher
+from scripts.meta_recorder import MetaRecorder
+from scripts.encode_pool import EncodePool
+from scripts.metrics_server import MetricsServer
+from scripts.frame_tracer import FrameTracer
 import pyds
 #pylint: disable=wrong-import-position
 
@@ -53,21 +56,13 @@ class DeepStream:
     """ DeepStream main processes """
 
     __deep_stream = None                                # DeepStream Class instance
-    __is_first_frame = True                             # Holds the first frame flag
-    __calibrations = None                               # Holds calibration result:
-                                                        #      [0] - Bird's Eye View Calibration
-                                                        #      [1] - Danger Zone Calibration
-    __calibration_stat = constants.CALIB_STAT_DEFAULT   # Holds the calibration status
+    __recorder = None                                   # Detection metadata recorder
+    __pipeline = None                                   # Running pipeline
 
     __calibration_mode = constants.OFF
 
-    __has_image = False
-
     __frame_number = 0
 
-    __skip_frame_cnt = 0
-    __skipped_cnt = 0
-
     # function get_instance
     # Description: Functon to return the class instance
     # Parameter: None
@@ -105,10 +100,12 @@ class DeepStream:
     def __metadata_process(self, _pad, info, _u_data):
         """ Metadata process """
 
+        probe_time = time.perf_counter()
+
         # Get buffer from gst
         gst_buffer = info.get_buffer()
         if not gst_buffer:
-            print("Unable to get GstBuffer ")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, "Unable to get GstBuffer")
             result = None
         else:
 
@@ -121,10 +118,6 @@ class DeepStream:
             # Check each frame from list
             while l_frame is not None:
 
-                # Do not proceed if the calibration process failed
-                if self.__calibration_stat == constants.CALIB_STAT_ERROR:
-                    break
-
                 try:
                     # Get frame metadata
                     frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
@@ -132,74 +125,8 @@ class DeepStream:
                 except StopIteration:
                     break
 
-                # Getting Image data using nvbufsurface
-                # the input should be address of buffer and batch_id
-                n_frame = pyds.get_nvds_buf_surface(hash(gst_buffer), 0)
-
-                #convert python array into numpy array format.
-                cam_view_img = np.array(n_frame, copy=True, order='C')
-
-                #covert the array into cv2 default color format
-                cam_view_img = cv2.cvtColor(cam_view_img, cv2.COLOR_RGBA2BGRA)
-
-                # Ongoing calibration
-                if self.__calibration_mode == constants.ON:
-
-                    # Set frame image for screen calibration
-                    ScreenCalibration.get_instance().set_frame(cam_view_img)
-
-                    try:
-                        l_frame = l_frame.next
-                    except StopIteration:
-                        break
-                    else:
-                        continue
-
-                else:
-
-                    # Set frame image in our annotator
-                    Annotator.get_instance().set_frame(cam_view_img)
-
-                    # Got frame image
-                    self.__has_image = True
-
-                # Increase and display the frame number
-                self.__frame_number += 1
-
-                print(f"Frame number: {self.__frame_number}")
-
-                self.__skip_frame_cnt += 1
-                if self.__skip_frame_cnt % 2 == 0:
-
-                    self.__skip_frame_cnt = 0
-
-                    self.__skipped_cnt += 1
-                    if self.__skipped_cnt > constants.FRAME_SKIP:
-                        self.__skipped_cnt = 0
-                        self.__skip_frame_cnt = 0
-                    else:
-                        self.__skip_frame_cnt -= 1
-
-                        try:
-                            l_frame = l_frame.next
-                        except StopIteration:
-                            break
-                        else:
-                            continue
-
-                # Get object list
-                l_obj = frame_meta.obj_meta_list
-                # Check object list and get object count
-                obj_count = self.__process_object_list(l_obj)
-
-                # Call tracker update. To check and remove unused tracker
-                Tracker.get_instance().update()
-
-                # First frame process
-                self.__process_first_frame()
-
-                # Main process
-                self.__process_main(obj_count)
+                # Process the frame of its source
+                self.__process_frame(gst_buffer, frame_meta, probe_time)
 
                 try:
                     l_frame = l_frame.next
@@ -213,305 +140,350 @@ class DeepStream:
         return result
 
 
-    # function __process_object_list
-    # Description: Function to process object list
-    # Parameter: cls, l_obj
-    # Return value: obj_count
-    @classmethod
-    def __process_object_list(cls, l_obj):
-        """ Proces object list """
-
-        obj_count = 0      # Holds detection count
-
-        # Check each object from list
-        while l_obj is not None:
-
-            try:
-                # Get the detected object metadata
-                obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
-
-                # Check if the detected object is "Person"
-                if obj_meta.class_id == constants.OBJ_CLASS_ID_PERSON:
-
-                    # Add tracker info: track id, bounding box details
-                    Tracker.get_instance().add(obj_meta.object_id, obj_meta.rect_params)
+    # function __process_frame
+    # Description: Function to process one frame of the batch
+    # Parameter: self, gst_buffer, frame_meta, probe_time
+    # Return value: None
+    def __process_frame(self, gst_buffer, frame_meta, probe_time):
+        """ Frame process """
 
-                    # Add object count
-                    obj_count += 1
+        source_id = frame_meta.pad_index
+        pts = frame_meta.buf_pts
+        frame_processor = FrameProcessor.get_instance()
 
-                l_obj = l_obj.next
+        # Do not proceed for an unknown source or if its calibration process failed
+        if not frame_processor.is_active(source_id):
+            return
 
-            except StopIteration as stop_iteration:
-                raise StopIteration from stop_iteration
+        tracer = FrameTracer.get_instance()
 
-        return obj_count
+        # Time from the buffer PTS to the pad probe: decode, batching and inference
+        if tracer.is_enabled():
+            tracer.add(constants.STAGE_CAPTURE, source_id, pts, \
+                probe_time - self.__get_buffer_age(pts), probe_time)
 
+        # Keep a reference to the frame surface. The image data is copied
+        # from nvbufsurface only when a frame image is actually requested.
+        # the input should be address of buffer and batch_id
+        lazy_frame = LazyFrame(lambda batch_id=frame_meta.batch_id: \
+            pyds.get_nvds_buf_surface(hash(gst_buffer), batch_id), source_id, pts)
 
-    # function __process_first_frame
-    # Description: Function that handles the first frame process
-    # Parameter: self
-    # Return value: None
-    def __process_first_frame(self):
-        """ First frame process """
+        # Ongoing calibration
+        if self.__calibration_mode == constants.ON:
 
-        # Check if first frame
-        if self.__is_first_frame:
-            self.__is_first_frame = False
+            # Set frame image of the first source for screen calibration
+            if source_id == 0:
+                ScreenCalibration.get_instance().set_frame(lazy_frame.get())
 
-            # Extract calibrations from calibration file
-            self.__calibration_stat = self.__extract_calibrations()
+            return
 
-            # Calibrations are extracted successfully
-            if self.__calibration_stat is not None:
+        # Increase and display the frame number
+        self.__frame_number += 1
 
-                # Initialize danger zone transformation
-                Monitoring.get_instance().initialize_d_zone(constants.B_EYE_VIEW_DIM, \
-                    self.__calibrations[constants.B_EYE_CALIB_INDEX], \
-                    self.__calibrations[constants.D_ZONE_CALIB_INDEX])
+        Common.post_message(constants.C_NAME_DEEP_STREAM, \
+            f"Frame number: {self.__frame_number} [Source: {source_id}]", \
+            key=f"frame-number-{source_id}")
 
+        # Get the detections: object id, class id and bounding box
+        walk_start = time.perf_counter()
+        objects = self.__get_objects(frame_meta.obj_meta_list)
+        tracer.add(constants.STAGE_OBJECT_WALK, source_id, pts, walk_start, time.perf_counter())
 
-    # function __process_main
-    # Description: Function that handles the main process
-    # Parameter: self, obj_count
-    # Return value: None
-    def __process_main(self, obj_count):
-        """ Main process """
+        # Record the detection metadata for offline replay
+        if self.__recorder is not None:
+            self.__recorder.record(self.__frame_number, source_id, pts, objects)
 
-        # Get new detection objects: ids and centroids
-        new_ids, new_centroids = Tracker.get_instance().get_new_list()
+        # Post-inference process: tracking, monitoring and host worker hand-off
+        frame_processor.process(source_id, objects, lazy_frame, pts, frame_meta.bInferDone)
 
-        # Get the list of transformed centroid
-        trans_centroid_list = self.__get_b_eye_centroids(new_centroids)
 
-        # Get transformed Danger zone corner points
-        trans_d_zone = Monitoring.get_instance().get_trans_d_zone()
+    # function __get_buffer_age
+    # Description: Function that returns the time since the buffer PTS in the pipeline
+    #              running time, i.e. since capture for a live source
+    # Parameter: self, pts
+    # Return value: seconds (0 if the pipeline clock is not available)
+    def __get_buffer_age(self, pts):
+        """ Returns the buffer age """
 
-        # Bird's Eye View - Update sending
-        HostUpdater.get_instance().run(new_ids, trans_centroid_list, trans_d_zone)
+        clock = self.__pipeline.get_clock() if self.__pipeline is not None else None
 
-        # detected person is not none and the calibrations are extracted
-        if obj_count > 0 and self.__calibration_stat is not None and self.__has_image:
+        # Not playing yet
+        if clock is None:
+            return 0.0
 
-            # Danger zone monitoring
-            Monitoring.get_instance().run(new_ids, trans_centroid_list)
+        running_time = clock.get_time() - self.__pipeline.get_base_time()
 
-            # Get alerts
-            alerts = Monitoring.get_instance().get_alerts()
+        return max(running_time - pts, 0) / Gst.SECOND
 
-            alerts_count = len(alerts)
 
-            # If alerts is not empty, it means there are persons which
-            # having dwell time inside the Danger zone that exceeded the allowable time.
-            if alerts_count > 0:
+    # function __get_objects
+    # Description: Function to get the detections from the object list
+    # Parameter: cls, l_obj
+    # Return value: objects (list of (object id, class id, bounding box))
+    @classmethod
+    def __get_objects(cls, l_obj):
+        """ Get detections """
 
-                # Alert details: Object id, Dwell time, Alert flag, Alert time
-                # Get list of bbox and centroid of all alert
-                annotator_data = Tracker.get_instance().get_annotator_data(alerts)
+        objects = []
 
-                if len(annotator_data) > 0:
+        # Check each object from list
+        while l_obj is not None:
 
-                    # Annotate frame
-                    frame = Annotator.get_instance().annotate(annotator_data)
+            try:
+                # Get the detected object metadata
+                obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
 
-                    # Add alert
-                    AlertNotify.get_instance().add_alert(alerts[alerts_count - 1][0], \
-                        alerts[alerts_count - 1][3], frame)
+                objects.append((obj_meta.object_id, obj_meta.class_id, obj_meta.rect_params))
 
-                    # Alarm buzzer
-                    Buzzer.get_instance().alarm_buzz()
+                l_obj = l_obj.next
 
-        # Send alert
-        AlertNotify.get_instance().send_alert()
+            except StopIteration as stop_iteration:
+                raise StopIteration from stop_iteration
 
-        # Check if there is alert
-        if not Monitoring.get_instance().has_alert():
+        return objects
 
-            # Turn off buzzer alarm
-            Buzzer.get_instance().alarm_off()
 
+    # function __create_source
+    # Description: Function that creates, adds and links the elements of one source
+    #              and returns the pad to be linked to nvstreammux
+    # Parameter: cls, pipeline, index, live_camera, stream_path
+    # Return value: srcpad
+    @classmethod
+    def __create_source(cls, pipeline, index, live_camera, stream_path):
+        """ Create source elements """
 
+        has_element_err = False
 
-    # function __extract_calibrations
-    # Description: Function to extract calibrations from file
-    # Parameter: self
-    # Return value: calibration_stat
-    def __extract_calibrations(self):
-        """ Extract calibrations from file """
+        if live_camera:
+            if constants.RPI_MODE == constants.CAM_MODE:
+                Common.post_message(constants.C_NAME_DEEP_STREAM, f"Creating Source {index}")
+                source = Gst.ElementFactory.make("nvarguscamerasrc", f"src-elem-{index}")
+                if not source:
+                    Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                        "Unable to create Source", constants.LOG_ERROR)
+                    has_element_err = True
+            else:
+                Common.post_message(constants.C_NAME_DEEP_STREAM, f"Creating Source {index}")
+                source = Gst.ElementFactory.make("v4l2src", f"usb-cam-source-{index}")
+                if not source:
+                    Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                        "Unable to create Source", constants.LOG_ERROR)
+                    has_element_err = True
 
-        # Get calibration details
-        self.__calibrations = Common.get_instance().get_calibrations()
+                caps_v4l2src = Gst.ElementFactory.make("capsfilter", f"v4l2src_caps_{index}")
+                if not caps_v4l2src:
+                    Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                        "Unable to create v4l2src capsfilter", constants.LOG_ERROR)
+                    has_element_err = True
+                Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating Video Converter")
+                # videoconvert to make sure a superset of raw formats are supported
+                vidconvsrc = Gst.ElementFactory.make("videoconvert", f"convertor_src1_{index}")
+                if not vidconvsrc:
+                    Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                        "Unable to create videoconvert", constants.LOG_ERROR)
+                    has_element_err = True
+            # nvvideoconvert to convert incoming raw buffers to NVMM Mem (NvBufSurface API)
+            nvvidconvsrc = Gst.ElementFactory.make("nvvideoconvert", f"convertor_src2_{index}")
+            if not nvvidconvsrc:
+                Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                    "Unable to create Nvvideoconvert", constants.LOG_ERROR)
+                has_element_err = True
+            caps_vidconvsrc = Gst.ElementFactory.make("capsfilter", f"nvmm_caps_{index}")
+            if not caps_vidconvsrc:
+                Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                    "Unable to create capsfilter", constants.LOG_ERROR)
+                has_element_err = True
+        else:
+            # Source element for reading from the file
+            Common.post_message(constants.C_NAME_DEEP_STREAM, f"Creating Source {index}")
+            source = Gst.ElementFactory.make("filesrc", f"file-source-{index}")
+            if not source:
+                Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                    "Unable to create Source", constants.LOG_ERROR)
+                has_element_err = True
+            # Since the data format in the input file is elementary h264 stream,
+            # we need a h264parser
+            Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating H264Parser")
+            h264parser = Gst.ElementFactory.make("h264parse", f"h264-parser-{index}")
+            if not h264parser:
+                Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                    "Unable to create h264 parser", constants.LOG_ERROR)
+                has_element_err = True
+            # Use nvdec_h264 for hardware accelerated decode on GPU
+            Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating Decoder")
+            decoder = Gst.ElementFactory.make("nvv4l2decoder", f"nvv4l2-decoder-{index}")
+            if not decoder:
+                Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                    "Unable to create Nvv4l2 Decoder", constants.LOG_ERROR)
+                has_element_err = True
+        Common.post_message(constants.C_NAME_DEEP_STREAM, f"Playing file {stream_path}")
 
-        # Calibration process failed
-        if self.__calibrations is None:
+        if has_element_err:
+            return None
 
-            print("[INFO] Calibration is not yet done successfully. Unable to proceed.")
+        if live_camera:
+            if constants.RPI_MODE == constants.CAM_MODE:
+                source.set_property('bufapi-version', True)
+                source.set_property('sensor-id', index)
+            else:
+                source.set_property('device', stream_path)
+                caps_v4l2src.set_property('caps', \
+                    Gst.Caps.from_string("video/x-raw, framerate=30/1"))
+            caps_vidconvsrc.set_property('caps', \
+                Gst.Caps.from_string("video/x-raw(memory:NVMM)"))
+        else:
+            source.set_property('location', stream_path)
 
-            # Set calibration status to error
-            calibration_stat = constants.CALIB_STAT_ERROR
+        pipeline.add(source)
+        if live_camera:
+            if constants.RPI_MODE != constants.CAM_MODE:
+                pipeline.add(caps_v4l2src)
+                pipeline.add(vidconvsrc)
+            pipeline.add(nvvidconvsrc)
+            pipeline.add(caps_vidconvsrc)
+        else:
+            pipeline.add(h264parser)
+            pipeline.add(decoder)
 
-        # Calibration process is successful
+        # file-source -> h264-parser -> nvh264-decoder -> (nvstreammux)
+        if live_camera:
+            if constants.RPI_MODE == constants.CAM_MODE:
+                source.link(nvvidconvsrc)
+            else:
+                source.link(caps_v4l2src)
+                caps_v4l2src.link(vidconvsrc)
+                vidconvsrc.link(nvvidconvsrc)
+            nvvidconvsrc.link(caps_vidconvsrc)
+            srcpad = caps_vidconvsrc.get_static_pad("src")
         else:
+            source.link(h264parser)
+            h264parser.link(decoder)
+            srcpad = decoder.get_static_pad("src")
 
-            print("[INFO] Calibration is extracted successfully.")
+        if not srcpad:
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to get source pad of decoder", constants.LOG_ERROR)
 
-            # Set calibration status to normal
-            calibration_stat = constants.CALIB_STAT_NORMAL
+        return srcpad
 
-        # Return the calibration process status
-        return calibration_stat
 
+    # function __start_metrics_server
+    # Description: Function that starts the metrics endpoint, if enabled
+    # Parameter: cls
+    # Return value: metrics_server or None
+    @classmethod
+    def __start_metrics_server(cls):
+        """ Start metrics endpoint """
 
-    # function __get_b_eye_centroids
-    # Description: Function to get the bird's eye centroids
-    # Parameter: self, new_centroids
-    # Return value: trans_centroid_list
-    def __get_b_eye_centroids(self, new_centroids):
-        """ Get the Bird's eye centroids """
+        # Disabled
+        if constants.METRICS_PORT is None:
+            return None
 
-        # Write details in the input file.
-        # This input file will be read by Bird's Eye Converter plugin when executed
-        Common.get_instance().write_b_eye_input_file(constants.B_EYE_VIEW_DIM, \
-           self.__calibrations[constants.B_EYE_CALIB_INDEX], \
-           new_centroids)
+        try:
+            metrics_server = MetricsServer()
 
-        # Run the Bird's Eye Converter plugin
-        Common.get_instance().run_b_eye_converter()
+        # The pipeline runs without metrics if the port is not available
+        except OSError as error:
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                f"Unable to start the metrics endpoint: {error}", constants.LOG_WARNING)
+            return None
 
-        # Get the list of transformed centroid
-        trans_centroid_list = Common.get_instance().read_b_eye_output_file()
+        port = metrics_server.start()
+        Common.post_message(constants.C_NAME_DEEP_STREAM, \
+            f"Metrics endpoint: http://{constants.METRICS_HOST}:{port}{constants.METRICS_PATH}")
 
-        # Return the transformed centroid list
-        return trans_centroid_list
+        # Exposed beyond the device: opt-in only
+        if constants.METRICS_HOST not in ("127.0.0.1", "localhost", "::1"):
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Metrics endpoint is reachable from the network.", constants.LOG_WARNING)
+
+        return metrics_server
 
 
     # function run
     # Description: Function that process the deepstream pipeline
-    # Parameter: self, live_camera, stream_path
+    # Parameter: self, sources (list of (live_camera, stream_path) per source)
     # Return value: process_result
-    def run(self, live_camera, stream_path):
+    def run(self, sources):
         """Deepstream function for detection and tracking"""
 
         has_element_err = False
 
-        number_sources = 1
+        number_sources = len(sources)
         # Standard GStreamer initialization
         GObject.threads_init()
         Gst.init(None)
         # Create gstreamer elements
         # Create Pipeline element that will form a connection of other elements
-        print("Creating Pipeline \n ")
+        Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating Pipeline")
         pipeline = Gst.Pipeline()
 
         if not pipeline:
-            sys.stderr.write(" Unable to create Pipeline \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create Pipeline", constants.LOG_ERROR)
             has_element_err = True
-        if live_camera:
-            if constants.RPI_MODE == constants.CAM_MODE:
-                print("Creating Source \n ")
-                source = Gst.ElementFactory.make("nvarguscamerasrc", "src-elem")
-                if not source:
-                    sys.stderr.write(" Unable to create Source \n")
-                    has_element_err = True
-            else:
-                print("Creating Source \n ")
-                source = Gst.ElementFactory.make("v4l2src", "usb-cam-source")
-                if not source:
-                    sys.stderr.write(" Unable to create Source \n")
-                    has_element_err = True
-
-                caps_v4l2src = Gst.ElementFactory.make("capsfilter", "v4l2src_caps")
-                if not caps_v4l2src:
-                    sys.stderr.write(" Unable to create v4l2src capsfilter \n")
-                    has_element_err = True
-                print("Creating Video Converter \n")
-                # videoconvert to make sure a superset of raw formats are supported
-                vidconvsrc = Gst.ElementFactory.make("videoconvert", "convertor_src1")
-                if not vidconvsrc:
-                    sys.stderr.write(" Unable to create videoconvert \n")
-                    has_element_err = True
-            # nvvideoconvert to convert incoming raw buffers to NVMM Mem (NvBufSurface API)
-            nvvidconvsrc = Gst.ElementFactory.make("nvvideoconvert", "convertor_src2")
-            if not nvvidconvsrc:
-                sys.stderr.write(" Unable to create Nvvideoconvert \n")
-                has_element_err = True
-            caps_vidconvsrc = Gst.ElementFactory.make("capsfilter", "nvmm_caps")
-            if not caps_vidconvsrc:
-                sys.stderr.write(" Unable to create capsfilter \n")
-                has_element_err = True
-        else:
-            # Source element for reading from the file
-            print("Creating Source \n ")
-            source = Gst.ElementFactory.make("filesrc", "file-source")
-            if not source:
-                sys.stderr.write(" Unable to create Source \n")
-                has_element_err = True
-            # Since the data format in the input file is elementary h264 stream,
-            # we need a h264parser
-            print("Creating H264Parser \n")
-            h264parser = Gst.ElementFactory.make("h264parse", "h264-parser")
-            if not h264parser:
-                sys.stderr.write(" Unable to create h264 parser \n")
-                has_element_err = True
-            # Use nvdec_h264 for hardware accelerated decode on GPU
-            print("Creating Decoder \n")
-            decoder = Gst.ElementFactory.make("nvv4l2decoder", "nvv4l2-decoder")
-            if not decoder:
-                sys.stderr.write(" Unable to create Nvv4l2 Decoder \n")
-                has_element_err = True
         # Create nvstreammux instance to form batches from one or more sources.
         streammux = Gst.ElementFactory.make("nvstreammux", "Stream-muxer")
         if not streammux:
-            sys.stderr.write(" Unable to create NvStreamMux \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create NvStreamMux", constants.LOG_ERROR)
             has_element_err = True
         # Use nvinfer to run inferencing on decoder's output,
         # behaviour of inferencing is set through config file
         pgie = Gst.ElementFactory.make("nvinfer", "primary-inference")
         if not pgie:
-            sys.stderr.write(" Unable to create pgie \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create pgie", constants.LOG_ERROR)
             has_element_err = True
 
         # Use nv-tracker to keep track of the detected objects
         tracker = Gst.ElementFactory.make("nvtracker", "NV-Tracker")
         if not tracker:
-            sys.stderr.write(" Unable to create tracker \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create tracker", constants.LOG_ERROR)
             has_element_err = True
 
         # Add nvvidconv1 and filter1 to convert the frames to RGBA
         # which is easier to work with in Python.
-        print("Creating nvvidconv1 \n ")
+        Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating nvvidconv1")
         nvvidconv1 = Gst.ElementFactory.make("nvvideoconvert", "convertor1")
         if not nvvidconv1:
-            sys.stderr.write(" Unable to create nvvidconv1 \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create nvvidconv1", constants.LOG_ERROR)
             has_element_err = True
-        print("Creating filter1 \n ")
+        Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating filter1")
         caps1 = Gst.Caps.from_string("video/x-raw(memory:NVMM), format=RGBA")
         filter1 = Gst.ElementFactory.make("capsfilter", "filter1")
         if not filter1:
-            sys.stderr.write(" Unable to get the caps filter1 \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to get the caps filter1", constants.LOG_ERROR)
             has_element_err = True
         #filter1.set_property("caps", caps1)
-        print("Creating tiler \n ")
+        Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating tiler")
         tiler = Gst.ElementFactory.make("nvmultistreamtiler", "nvtiler")
         if not tiler:
-            sys.stderr.write(" Unable to create tiler \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create tiler", constants.LOG_ERROR)
             has_element_err = True
-        print("Creating nvvidconv \n ")
+        Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating nvvidconv")
         nvvidconv = Gst.ElementFactory.make("nvvideoconvert", "convertor")
         if not nvvidconv:
-            sys.stderr.write(" Unable to create nvvidconv \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create nvvidconv", constants.LOG_ERROR)
             has_element_err = True
-        print("Creating nvosd \n ")
+        Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating nvosd")
         nvosd = Gst.ElementFactory.make("nvdsosd", "onscreendisplay")
         if not nvosd:
-            sys.stderr.write(" Unable to create nvosd \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create nvosd", constants.LOG_ERROR)
             has_element_err = True
-        print("Creating Fake sink \n")
+        Common.post_message(constants.C_NAME_DEEP_STREAM, "Creating Fake sink")
         # sink = Gst.ElementFactory.make("nveglglessink", "nvvideo-renderer")
         sink = Gst.ElementFactory.make("fakesink", "fakesink")
         if not sink:
-            sys.stderr.write(" Unable to create fake sink \n")
+            Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                "Unable to create fake sink", constants.LOG_ERROR)
             has_element_err = True
-        print("Playing file %s " %stream_path)
 
 
         if has_element_err:
@@ -520,21 +492,9 @@ class DeepStream:
 
         else:
 
-            if live_camera:
-                if constants.RPI_MODE == constants.CAM_MODE:
-                    source.set_property('bufapi-version', True)
-                else:
-                    source.set_property('device', stream_path)
-                    caps_v4l2src.set_property('caps', \
-                        Gst.Caps.from_string("video/x-raw, framerate=30/1"))
-                caps_vidconvsrc.set_property('caps', \
-                    Gst.Caps.from_string("video/x-raw(memory:NVMM)"))
-            else:
-                source.set_property('location', stream_path)
-
-            streammux.set_property('width', 1920)
-            streammux.set_property('height', 1080)
-            streammux.set_property('batch-size', 1)
+            streammux.set_property('width', constants.FRAME_WIDTH)
+            streammux.set_property('height', constants.FRAME_HEIGHT)
+            streammux.set_property('batch-size', number_sources)
             streammux.set_property('batched-push-timeout', 4000000)
 
             tiler_rows = int(math.sqrt(number_sources))
@@ -561,6 +521,10 @@ class DeepStream:
 
             #Set properties of pgie
             pgie.set_property('config-file-path', "dstest1_pgie_config.txt")
+            pgie.set_property('batch-size', number_sources)
+
+            # Inference interval is set by the frame scheduler
+            FrameScheduler.get_instance().set_inference_element(pgie)
 
             #Set nv-tracker properties
             tracker.set_property('ll-lib-file', \
@@ -571,17 +535,7 @@ class DeepStream:
             tracker.set_property('enable-batch-process', 1)
             tracker.set_property('ll-config-file', 'config/tracker_config.yml')
 
-            print("Adding elements to Pipeline \n")
-            pipeline.add(source)
-            if live_camera:
-                if constants.RPI_MODE != constants.CAM_MODE:
-                    pipeline.add(caps_v4l2src)
-                    pipeline.add(vidconvsrc)
-                pipeline.add(nvvidconvsrc)
-                pipeline.add(caps_vidconvsrc)
-            else:
-                pipeline.add(h264parser)
-                pipeline.add(decoder)
+            Common.post_message(constants.C_NAME_DEEP_STREAM, "Adding elements to Pipeline")
             pipeline.add(streammux)
             pipeline.add(pgie)
             pipeline.add(tracker)
@@ -593,31 +547,22 @@ class DeepStream:
             pipeline.add(sink)
 
             # we link the elements together
-            # file-source -> h264-parser -> nvh264-decoder ->
-            # nvinfer -> nvvidconv -> nvosd -> video-renderer
-            print("Linking elements in the Pipeline \n")
-            if live_camera:
-                if constants.RPI_MODE == constants.CAM_MODE:
-                    source.link(nvvidconvsrc)
-                else:
-                    source.link(caps_v4l2src)
-                    caps_v4l2src.link(vidconvsrc)
-                    vidconvsrc.link(nvvidconvsrc)
-                nvvidconvsrc.link(caps_vidconvsrc)
-            else:
-                source.link(h264parser)
-                h264parser.link(decoder)
-
-            sinkpad = streammux.get_request_pad("sink_0")
-            if not sinkpad:
-                sys.stderr.write(" Unable to get the sink pad of streammux \n")
-            if live_camera:
-                srcpad = caps_vidconvsrc.get_static_pad("src")
-            else:
-                srcpad = decoder.get_static_pad("src")
-            if not srcpad:
-                sys.stderr.write(" Unable to get source pad of decoder \n")
-            srcpad.link(sinkpad)
+            # sources -> nvstreammux -> nvinfer -> nvtracker -> nvvidconv1 -> filter1 ->
+            # tiler -> nvvidconv -> nvosd -> video-renderer
+            Common.post_message(constants.C_NAME_DEEP_STREAM, "Linking elements in the Pipeline")
+            FrameProcessor.get_instance().clear_sources()
+            for index, (live_camera, stream_path) in enumerate(sources):
+
+                srcpad = self.__create_source(pipeline, index, live_camera, stream_path)
+                sinkpad = streammux.get_request_pad(f"sink_{index}")
+                if not sinkpad:
+                    Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                        "Unable to get the sink pad of streammux", constants.LOG_ERROR)
+                if srcpad and sinkpad:
+                    srcpad.link(sinkpad)
+
+                FrameProcessor.get_instance().add_source(index)
+
             streammux.link(pgie)
             pgie.link(tracker)
             tracker.link(nvvidconv1)
@@ -635,25 +580,60 @@ class DeepStream:
             bus.connect("message", bus_call, loop)
 
             # Lets add probe to get informed of the meta data generated, we add probe to
-            # the sink pad of the osd element, since by that time, the buffer would have
-            # had got all the metadata.
-            tiler_sink_pad = nvvidconv.get_static_pad("sink")
+            # the sink pad of the tiler element, since by that time, the buffer would have
+            # had got all the metadata and the frames are not yet composited.
+            tiler_sink_pad = tiler.get_static_pad("sink")
             if not tiler_sink_pad:
-                sys.stderr.write(" Unable to get src pad \n")
+                Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                    "Unable to get src pad", constants.LOG_ERROR)
             else:
                 tiler_sink_pad.add_probe(Gst.PadProbeType.BUFFER, self.__metadata_process, 0)
 
-            print("Starting pipeline \n")
+            # Record the detection metadata when enabled
+            if constants.META_RECORD_PATH is not None:
+                self.__recorder = MetaRecorder(constants.META_RECORD_PATH)
+
+            # Trace the stages of each frame when enabled
+            if constants.TRACE_DUMP_PATH is not None:
+                FrameTracer.get_instance().start()
+            self.__pipeline = pipeline
+
+            # Connect to the mobile host, send the spooled alerts
+            # and start the host worker before the first frame
+            metrics_server = self.__start_metrics_server()
+            EncodePool.get_instance().start()
+            MqttPublisher.get_instance().start()
+            AlertNotify.get_instance().start()
+            HostWorker.get_instance().start()
+
+            # Swap in rewritten calibration files without restarting the pipeline
+            CalibrationWatcher.get_instance().start()
+
+            Common.post_message(constants.C_NAME_DEEP_STREAM, "Starting pipeline")
             # start play back and listed to events
             pipeline.set_state(Gst.State.PLAYING)
 
-            calib_result = Common.get_instance().check_calibration_file()
+            # Screen calibration runs for the first source only.
+            # Other sources use their prepared calibration files.
+            common = Common.get_instance()
+            for index in range(number_sources):
+
+                calib_result = common.check_calibration_file(common.get_calibration_path(index))
 
-            if calib_result != constants.V_CALIB_OK:
+                if calib_result == constants.V_CALIB_OK:
+                    continue
+
+                if index == 0:
+
+                    self.__calibration_mode = constants.ON
+                    ScreenCalibration.get_instance().run()
+                    self.__calibration_mode = constants.OFF
+
+                else:
 
-                self.__calibration_mode = constants.ON
-                ScreenCalibration.get_instance().run()
-                self.__calibration_mode = constants.OFF
+                    Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                        f"Calibration file of source {index} is not valid." + \
+                        " The source is not monitored.", constants.LOG_WARNING)
 
             # start play back and listed to events
             try:
@@ -663,6 +643,22 @@ class DeepStream:
 
             # cleanup
             pipeline.set_state(Gst.State.NULL)
+            self.__pipeline = None
+            CalibrationWatcher.get_instance().stop()
+            HostWorker.get_instance().stop()
+            AlertNotify.get_instance().stop()
+            MqttPublisher.get_instance().stop()
+            EncodePool.get_instance().stop()
+            if metrics_server is not None:
+                metrics_server.stop()
+            if self.__recorder is not None:
+                self.__recorder.close()
+                self.__recorder = None
+            if FrameTracer.get_instance().is_enabled():
+                FrameTracer.get_instance().stop()
+                span_cnt = FrameTracer.get_instance().dump(constants.TRACE_DUMP_PATH)
+                Common.post_message(constants.C_NAME_DEEP_STREAM, \
+                    f"Trace spans written: {span_cnt} [{constants.TRACE_DUMP_PATH}]")
 
             process_result = True
 
@@ -0,0 +1,501 @@
+""" Encode Worker Pool """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import threading
+import time
+import multiprocessing
+from multiprocessing.connection import wait as wait_connections
+from collections import OrderedDict
+from functools import partial
+import concurrent.futures
+import cv2
+import numpy as np
+from common import constants
+from common.common import Common
+from common.metrics import Metrics
+#pylint: disable=wrong-import-position
+
+# function draw_and_encode
+# Description: Function that runs the draw operations on the image and encodes it
+# Parameter: frame, draw_ops (list of (cv2 drawing function name, arguments...)), ext
+# Return value: byte_img or None if encoding failed
+def draw_and_encode(frame, draw_ops, ext):
+    """ Draw and encode image """
+
+    # Draw operations, e.g. ("circle", center, radius, color, thickness)
+    for draw_op in draw_ops:
+        getattr(cv2, draw_op[0])(frame, *draw_op[1:])
+
+    result, img = cv2.imencode(ext, frame)
+
+    # Return encoded image. If not successful, return None
+    return img.tobytes() if result else None
+
+
+# function encode_worker
+# Description: Worker process that draws and encodes the images in the shared frame slots.
+#              Each worker has its own pipe, so a dead worker holds no lock of the others.
+# Parameter: raw_slots, slot_size, states, generations, lock, connection, ready
+# Return value: None
+def encode_worker(raw_slots, slot_size, states, generations, lock, connection, ready):
+    """ Encode worker process """
+
+    slots = np.frombuffer(raw_slots, np.uint8)
+
+    # Worker is ready for jobs
+    ready.release()
+
+    while True:
+
+        job = connection.recv()
+
+        # Stop request
+        if job is None:
+            break
+
+        job_id, slot, generation, shape, draw_ops, ext = job
+
+        # Claim the slot. Skip the job if it was dropped while queued
+        with lock:
+            if generations[slot] != generation or states[slot] != constants.SLOT_QUEUED:
+                continue
+            states[slot] = constants.SLOT_BUSY
+
+        offset = slot * slot_size
+        frame = slots[offset:offset + int(np.prod(shape))].reshape(shape)
+
+        try:
+            byte_img = draw_and_encode(frame, draw_ops, ext)
+        except cv2.error:
+            byte_img = None
+
+        # Release the slot
+        with lock:
+            states[slot] = constants.SLOT_FREE
+
+        connection.send((job_id, byte_img))
+
+
+# class EncodePool
+# Description: Class for a pool of worker processes that draw and encode images.
+#              Images are copied into a shared-memory ring of frame slots,
+#              so the pixel data is not pickled and encoding runs outside the GIL.
+#              When no slot is free, the oldest droppable queued job is dropped.
+#              A dead worker is replaced and the jobs sent to it are failed.
+# Parameter: None
+# Return value: None
+class EncodePool:
+    """ Out-of-process image encoder """
+
+    __encode_pool = None        # EncodePool class instance
+    __common = None             # Common class instance
+    __metrics = None            # Metrics class instance
+
+    __workers = None            # Worker processes
+    __connections = None        # Job and result pipe per worker
+    __send_lock = None          # Pipe send lock
+    __slot_count = 0            # Frame slot count
+    __slot_size = 0             # Frame slot size (bytes)
+    __slots = None              # Frame slots view
+    __states = None             # Shared slot state per slot
+    __generations = None        # Shared slot generation per slot
+    __lock = None               # Shared slot state lock
+    __receiver = None           # Result receiver thread
+    __context = None            # Worker process context
+    __raw_slots = None          # Shared frame slots
+    __ready = None              # Worker ready semaphore
+    __pending = None            # Pending jobs:
+                                #   {job id: [future, slot, generation, droppable, worker]}
+    __pending_lock = None       # Pending jobs lock
+    __job_id = 0                # Last job id
+    __dropped_cnt = 0           # Dropped job counter
+    __running = False           # Pool running flag
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __encode_pool
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if EncodePool.__encode_pool is None:
+
+            # Call the class constructor
+            EncodePool()
+
+        # Return the class instance
+        return EncodePool.__encode_pool
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if EncodePool.__encode_pool is None:
+
+            EncodePool.__encode_pool = self               # Initialize EncodePool class instance
+            self.__common = Common.get_instance()         # Initialize Common class instance
+            self.__metrics = Metrics.get_instance()       # Initialize Metrics class instance
+            self.name = constants.C_NAME_ENCODE_POOL      # Set class name
+
+            self.__pending = OrderedDict()
+            self.__pending_lock = threading.Lock()
+            self.__send_lock = threading.Lock()
+
+
+    # function start
+    # Description: Function that starts the worker processes.
+    #              With no worker, images are encoded in the calling thread.
+    # Parameter: self, worker_count, slot_count, slot_size
+    # Return value: None
+    def start(self, worker_count=constants.ENCODE_WORKERS, slot_count=constants.ENCODE_SLOTS, \
+        slot_size=constants.ENCODE_SLOT_SIZE):
+        """ Start the workers """
+
+        # Already started or disabled
+        if self.__running or worker_count <= 0 or slot_count <= 0:
+            return
+
+        # Spawn the workers: the parent runs GStreamer and MQTT threads
+        self.__context = multiprocessing.get_context('spawn')
+
+        self.__slot_count = slot_count
+        self.__slot_size = slot_size
+        self.__raw_slots = self.__context.RawArray('B', slot_count * slot_size)
+        self.__slots = np.frombuffer(self.__raw_slots, np.uint8)
+        self.__states = self.__context.RawArray('i', slot_count)
+        self.__generations = self.__context.RawArray('i', slot_count)
+        self.__lock = self.__context.Lock()
+        self.__ready = self.__context.Semaphore(0)
+
+        self.__workers = [None] * worker_count
+        self.__connections = [None] * worker_count
+        for index in range(worker_count):
+            self.__start_worker(index)
+
+        # Wait until the workers are up, so the first jobs are not delayed by the startup
+        for _ in range(worker_count):
+            if not self.__ready.acquire(timeout=constants.ENCODE_START_TIMEOUT):
+                self.__common.post_message(self.name, "Encode worker start timeout!")
+                break
+
+        self.__running = True
+        self.__receiver = threading.Thread(target=self.__receive_loop, \
+            name=self.name, daemon=True)
+        self.__receiver.start()
+
+
+    # function stop
+    # Description: Function that stops the worker processes. Pending jobs are dropped.
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop the workers """
+
+        # Not started
+        if not self.__running:
+            return
+
+        self.__running = False
+
+        with self.__send_lock:
+            for connection in self.__connections:
+                self.__send(connection, None)
+        for worker in self.__workers:
+            worker.join()
+        self.__receiver.join()
+
+        # Drop remaining jobs
+        with self.__pending_lock:
+            for future, _, _, _, _ in self.__pending.values():
+                future.set_result(None)
+            self.__pending.clear()
+
+
+    # function __start_worker
+    # Description: Function that starts the worker process of an index with a new pipe
+    # Parameter: self, index
+    # Return value: None
+    def __start_worker(self, index):
+        """ Start a worker process """
+
+        connection, worker_connection = self.__context.Pipe()
+
+        worker = self.__context.Process(target=encode_worker, name=f"{self.name}-{index}", \
+            args=(self.__raw_slots, self.__slot_size, self.__states, self.__generations, \
+                self.__lock, worker_connection, self.__ready), daemon=True)
+        worker.start()
+
+        # The worker end is closed here, so the pipe reports the end of a dead worker
+        worker_connection.close()
+
+        with self.__send_lock:
+            self.__workers[index] = worker
+            self.__connections[index] = connection
+
+
+    # function __send
+    # Description: Function that sends a job to a worker. Called with the send lock held.
+    # Parameter: cls, connection, job
+    # Return value: True if sent, False if the worker is gone
+    @classmethod
+    def __send(cls, connection, job):
+        """ Send job """
+
+        try:
+            connection.send(job)
+            return True
+
+        # Dead worker: its jobs are failed by the receiver
+        except (OSError, ValueError):
+            return False
+
+
+    # function get_dropped_count
+    # Description: Function that returns the number of dropped jobs
+    # Parameter: self
+    # Return value: __dropped_cnt
+    def get_dropped_count(self):
+        """ Returns the dropped count """
+
+        return self.__dropped_cnt
+
+
+    # function encode
+    # Description: Function that draws and encodes an image and waits for the result
+    # Parameter: self, image, draw_ops, ext, droppable
+    # Return value: byte_img or None if the job was dropped
+    def encode(self, image, draw_ops=(), ext=".jpg", droppable=False):
+        """ Encode image """
+
+        return self.wait(self.submit(image, draw_ops, ext, droppable), image, draw_ops, ext, \
+            droppable)
+
+
+    # function wait
+    # Description: Function that waits for the result of a submitted job. If the worker
+    #              does not answer in ENCODE_TIMEOUT, or fails a job that is not droppable,
+    #              the image is encoded in the calling thread.
+    # Parameter: self, future, image, draw_ops, ext, droppable (as submitted)
+    # Return value: byte_img or None if the job was dropped
+    def wait(self, future, image, draw_ops=(), ext=".jpg", droppable=False):
+        """ Wait for encode job """
+
+        try:
+            byte_img = future.result(constants.ENCODE_TIMEOUT)
+
+        # Worker did not answer. Encode in this thread
+        except concurrent.futures.TimeoutError:
+
+            self.__common.post_message(self.name, "Encode timeout! Encoding in process.")
+            return draw_and_encode(image.copy(), draw_ops, ext)
+
+        # Job failed. Encode in this thread
+        if byte_img is None and not droppable:
+            byte_img = draw_and_encode(image.copy(), draw_ops, ext)
+
+        return byte_img
+
+
+    # function submit
+    # Description: Function that queues a draw and encode job. Does not block.
+    #              The image is not modified. Jobs that are not droppable are never dropped
+    #              and are encoded in the calling thread if no slot can be freed.
+    # Parameter: self, image, draw_ops, ext, droppable
+    # Return value: future (result: byte_img or None if the job was dropped)
+    def submit(self, image, draw_ops=(), ext=".jpg", droppable=False):
+        """ Queue encode job """
+
+        future = concurrent.futures.Future()
+        future.add_done_callback(partial(self.__observe, time.perf_counter()))
+
+        # No worker or image does not fit in a slot: encode in this thread
+        if not self.__running or image.nbytes > self.__slot_size:
+            future.set_result(draw_and_encode(image.copy(), draw_ops, ext))
+            return future
+
+        with self.__pending_lock:
+
+            slot = self.__reserve_slot()
+
+            # All slots are busy
+            if slot is None:
+
+                # Drop the new job
+                if droppable:
+                    self.__dropped_cnt += 1
+                    future.set_result(None)
+
+                else:
+                    future.set_result(draw_and_encode(image.copy(), draw_ops, ext))
+
+                return future
+
+            # Least loaded worker
+            loads = [0] * len(self.__workers)
+            for pending in self.__pending.values():
+                loads[pending[4]] += 1
+            worker = loads.index(min(loads))
+
+            self.__job_id += 1
+            job_id = self.__job_id
+            generation = self.__generations[slot]
+            self.__pending[job_id] = [future, slot, generation, droppable, worker]
+
+        # Copy the image into the reserved slot
+        offset = slot * self.__slot_size
+        self.__slots[offset:offset + image.nbytes] = np.ascontiguousarray(image).ravel()
+
+        # Queue the job. If the worker died meanwhile, the job was failed: free the slot
+        with self.__lock:
+            if self.__generations[slot] == generation:
+                self.__states[slot] = constants.SLOT_QUEUED
+            else:
+                self.__states[slot] = constants.SLOT_FREE
+        with self.__send_lock:
+            self.__send(self.__connections[worker], \
+                (job_id, slot, generation, image.shape, list(draw_ops), ext))
+
+        return future
+
+
+    # function __observe
+    # Description: Callback that adds the time and size of a finished job to the metrics
+    # Parameter: self, start, future
+    # Return value: None
+    def __observe(self, start, future):
+        """ Encode metrics """
+
+        byte_img = future.result()
+
+        # Dropped or failed
+        if byte_img is None:
+            self.__metrics.inc(constants.METRIC_ENCODE_DROPPED)
+            return
+
+        self.__metrics.observe(constants.METRIC_ENCODE_SECONDS, time.perf_counter() - start)
+        self.__metrics.observe(constants.METRIC_ENCODE_BYTES, len(byte_img))
+
+
+    # function __reserve_slot
+    # Description: Function that reserves a free slot. If none, the slot of the
+    #              oldest droppable queued job is taken and the job is dropped.
+    # Parameter: self
+    # Return value: slot or None if all slots are busy
+    def __reserve_slot(self):
+        """ Reserve frame slot """
+
+        with self.__lock:
+
+            # Free slot
+            for slot in range(self.__slot_count):
+                if self.__states[slot] == constants.SLOT_FREE:
+                    self.__states[slot] = constants.SLOT_RESERVED
+                    return slot
+
+            # Drop the oldest droppable job not yet claimed by a worker
+            for job_id, (future, slot, generation, droppable, _) in self.__pending.items():
+
+                if droppable and self.__states[slot] == constants.SLOT_QUEUED and \
+                    self.__generations[slot] == generation:
+
+                    # A new generation invalidates the queued job
+                    self.__generations[slot] += 1
+                    self.__states[slot] = constants.SLOT_RESERVED
+                    del self.__pending[job_id]
+                    future.set_result(None)
+                    self.__dropped_cnt += 1
+                    return slot
+
+        return None
+
+
+    # function __receive_loop
+    # Description: Function that sets the worker results to the pending jobs
+    #              and replaces the dead workers
+    # Parameter: self
+    # Return value: None
+    def __receive_loop(self):
+        """ Result receiver thread """
+
+        while True:
+
+            connections = [connection for connection in self.__connections \
+                if not connection.closed]
+
+            # Stopped and all workers ended
+            if not connections:
+                break
+
+            for connection in wait_connections(connections, constants.ENCODE_WATCH_INTERVAL):
+
+                try:
+                    job_id, byte_img = connection.recv()
+
+                # Worker ended
+                except (EOFError, OSError):
+                    connection.close()
+                    continue
+
+                with self.__pending_lock:
+                    pending = self.__pending.pop(job_id, None)
+
+                # Job was not dropped
+                if pending is not None:
+                    pending[0].set_result(byte_img)
+
+            self.__check_workers()
+
+
+    # function __check_workers
+    # Description: Function that replaces the dead workers. The jobs sent to a dead worker
+    #              are failed and their slots are freed, so no caller waits on them.
+    # Parameter: self
+    # Return value: None
+    def __check_workers(self):
+        """ Replace dead workers """
+
+        # Stopping: the workers exit on purpose
+        if not self.__running:
+            return
+
+        for index, worker in enumerate(self.__workers):
+
+            # Worker is alive
+            if worker.is_alive():
+                continue
+
+            self.__common.post_message(self.name, \
+                f"Encode worker {index} died (exit code {worker.exitcode})! Restarting.", \
+                constants.LOG_WARNING)
+
+            self.__connections[index].close()
+
+            # Jobs of the dead worker
+            with self.__pending_lock:
+                failed = [job_id for job_id, pending in self.__pending.items() \
+                    if pending[4] == index]
+                failed = [self.__pending.pop(job_id) for job_id in failed]
+
+            # Free their slots. A new generation invalidates the jobs.
+            # A slot still being filled is freed by the submitter
+            with self.__lock:
+                for _, slot, generation, _, _ in failed:
+                    if self.__generations[slot] == generation:
+                        self.__generations[slot] += 1
+                        if self.__states[slot] != constants.SLOT_RESERVED:
+                            self.__states[slot] = constants.SLOT_FREE
+
+            for pending in failed:
+                pending[0].set_result(None)
+
+            self.__start_worker(index)
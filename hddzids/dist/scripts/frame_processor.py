@@ -0,0 +1,470 @@
+""" Frame Processor """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import time
+from common import constants
+from common.common import Common
+from common.metrics import Metrics
+from scripts.tracker import Tracker
+from scripts.b_eye_transform import BirdsEyeTransform
+from scripts.monitoring import Monitoring
+from scripts.host_worker import HostWorker, FrameResult
+from scripts.frame_scheduler import FrameScheduler
+from scripts.stage_times import StageTimes
+from scripts.frame_tracer import FrameTracer
+#pylint: disable=wrong-import-position
+
+# class SourceState
+# Description: Class that holds the per-source state of the pipeline
+# Parameter: source_id, calibration_path
+# Return value: None
+class SourceState:
+    """ Per-source state """
+
+    __slots__ = ('source_id', 'calibration_path', 'is_first_frame', 'calibrations', \
+        'calibration_stat', 'b_eye_transform', 'has_image', 'lazy_frame', 'pts')
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, source_id, calibration_path
+    # Return value: None
+    def __init__(self, source_id, calibration_path):
+        """ Set initial state """
+
+        self.source_id = source_id                           # Source id (streammux pad index)
+        self.calibration_path = calibration_path             # Calibration file path
+        self.is_first_frame = True                           # Holds the first frame flag
+        self.calibrations = None                             # Holds calibration result:
+                                                             #   [0] - Bird's Eye View Calibration
+                                                             #   [1] - Danger Zones
+        self.calibration_stat = constants.CALIB_STAT_DEFAULT # Holds the calibration status
+        self.b_eye_transform = None                          # Camera to Bird's Eye View transform
+        self.has_image = False                               # Got frame image flag
+        self.lazy_frame = None                               # Holds the current frame reference
+        self.pts = None                                      # Buffer PTS of the current frame
+
+
+# class FrameProcessor
+# Description: Class that runs the post-inference process of a frame:
+#              tracking, danger zone monitoring and the host worker hand-off.
+#              It only consumes object ids, bounding boxes and a frame reference,
+#              so it runs the same with the DeepStream pipeline and with recorded metadata.
+# Parameter: None
+# Return value: None
+class FrameProcessor:
+    """ Post-inference frame process """
+
+    __frame_processor = None    # FrameProcessor class instance
+    __common = None             # Common class instance
+    __stage_times = None        # StageTimes class instance
+    __metrics = None            # Metrics class instance
+    __tracer = None             # FrameTracer class instance
+
+    __sources = None            # Holds the state per source id
+    __pending = None            # Reloaded calibrations not yet applied, per source id
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __frame_processor
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if FrameProcessor.__frame_processor is None:
+
+            # Call the class constructor
+            FrameProcessor()
+
+        # Return the class instance
+        return FrameProcessor.__frame_processor
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if FrameProcessor.__frame_processor is None:
+
+            FrameProcessor.__frame_processor = self       # Initialize FrameProcessor class instance
+            self.__common = Common.get_instance()         # Initialize Common class instance
+            self.__stage_times = StageTimes.get_instance()# Initialize StageTimes class instance
+            self.__metrics = Metrics.get_instance()       # Initialize Metrics class instance
+            self.__tracer = FrameTracer.get_instance()    # Initialize FrameTracer class instance
+            self.name = constants.C_NAME_FRAME_PROCESSOR  # Set class name
+
+            self.__sources = {}
+            self.__pending = {}
+
+
+    # function add_source
+    # Description: Function that adds a source to be processed
+    # Parameter: self, source_id, calibration_path (None: calibration file of the source)
+    # Return value: None
+    def add_source(self, source_id, calibration_path=None):
+        """ Add source """
+
+        if calibration_path is None:
+            calibration_path = self.__common.get_calibration_path(source_id)
+
+        self.__sources[source_id] = SourceState(source_id, calibration_path)
+
+
+    # function clear_sources
+    # Description: Function that removes all sources
+    # Parameter: self
+    # Return value: None
+    def clear_sources(self):
+        """ Clear sources """
+
+        self.__sources.clear()
+        self.__pending.clear()
+
+
+    # function get_calibration_paths
+    # Description: Function that returns the calibration file path of each source
+    # Parameter: self
+    # Return value: {source id: path}
+    def get_calibration_paths(self):
+        """ Returns calibration file paths """
+
+        return {source_id: source.calibration_path \
+            for source_id, source in list(self.__sources.items())}
+
+
+    # function set_calibrations
+    # Description: Function that sets reloaded calibrations of a source.
+    #              Called from the calibration watcher thread: the transform is built here
+    #              and the calibrations are swapped in before the next frame of the source.
+    # Parameter: self, source_id, calibrations (Bird's Eye and Danger Zone calibrations)
+    # Return value: None
+    def set_calibrations(self, source_id, calibrations):
+        """ Set reloaded calibrations """
+
+        b_eye_transform = BirdsEyeTransform(calibrations[constants.B_EYE_CALIB_INDEX], \
+            constants.B_EYE_VIEW_DIM)
+
+        # Single assignment: a newer reload replaces one not yet applied
+        self.__pending[source_id] = (calibrations, b_eye_transform)
+
+
+    # function is_active
+    # Description: Function that returns True if the frames of the source are processed
+    # Parameter: self, source_id
+    # Return value: result
+    def is_active(self, source_id):
+        """ Check if the source is processed """
+
+        source = self.__sources.get(source_id)
+
+        # Unknown source or its calibration process failed and no reload is pending
+        return source is not None and (source.calibration_stat != constants.CALIB_STAT_ERROR \
+            or source_id in self.__pending)
+
+
+    # function process
+    # Description: Function that processes the detections of a frame
+    # Parameter: self, source_id, objects, lazy_frame, pts, inferred
+    #            (objects: list of (object id, class id, bounding box),
+    #             lazy_frame: LazyFrame of the frame image,
+    #             pts: buffer PTS of the frame in nanoseconds. Key of the frame in the trace,
+    #             inferred: True if nvinfer ran on the frame. None: unknown)
+    # Return value: True if the frame was processed, False if skipped
+    def process(self, source_id, objects, lazy_frame, pts=None, inferred=None):
+        """ Frame process """
+
+        # Do not proceed for an unknown source or if its calibration process failed
+        if not self.is_active(source_id):
+            return False
+
+        source = self.__sources[source_id]
+
+        # Swap in reloaded calibrations between frames
+        self.__apply_calibrations(source)
+
+        # Set frame reference for alert images
+        source.lazy_frame = lazy_frame
+        source.pts = pts
+
+        # Got frame image
+        source.has_image = True
+
+        labels = {"source": source_id}
+
+        # Skip the frame based on the scheduled interval
+        if not FrameScheduler.get_instance().should_process(source_id, inferred):
+            self.__metrics.inc(constants.METRIC_FRAMES_SKIPPED, labels=labels)
+            return False
+
+        process_start = time.perf_counter()
+
+        # Add person detections and remove unused tracker
+        tracker = Tracker.get_instance(source_id)
+        obj_count = self.__add_objects(tracker, objects)
+
+        # Objects no longer tracked leave the danger zones
+        Monitoring.get_instance(source_id).remove_tracks(tracker.update())
+
+        tracker_end = time.perf_counter()
+        self.__stage_times.add(constants.STAGE_TRACKER, tracker_end - process_start)
+        self.__tracer.add(constants.STAGE_TRACKER, source_id, pts, process_start, tracker_end)
+
+        self.__metrics.inc(constants.METRIC_FRAMES_PROCESSED, labels=labels)
+        self.__metrics.observe(constants.METRIC_PERSONS, obj_count, labels)
+
+        # First frame process
+        self.__process_first_frame(source)
+
+        # Calibration process failed on the first frame: nothing to monitor
+        if source.calibration_stat == constants.CALIB_STAT_ERROR:
+            return True
+
+        # Main process
+        self.__process_main(source, obj_count)
+
+        process_end = time.perf_counter()
+        self.__stage_times.add(constants.STAGE_FRAME, process_end - process_start)
+        self.__tracer.add(constants.STAGE_FRAME, source_id, pts, process_start, process_end)
+
+        # Update the interval based on the scene and the processing time.
+        # Near the danger zones: someone inside or approaching
+        monitoring = Monitoring.get_instance(source_id)
+        FrameScheduler.get_instance().update(source_id, obj_count, \
+            monitoring.get_record_count() > 0 or monitoring.has_warning(), \
+            process_end - process_start)
+
+        return True
+
+
+    # function __add_objects
+    # Description: Function that adds the person detections to the tracker
+    # Parameter: cls, tracker, objects
+    # Return value: obj_count
+    @classmethod
+    def __add_objects(cls, tracker, objects):
+        """ Add detections """
+
+        obj_count = 0      # Holds detection count
+
+        for object_id, class_id, bbox in objects:
+
+            # Check if the detected object is "Person"
+            if class_id == constants.OBJ_CLASS_ID_PERSON:
+
+                # Add tracker info: track id, bounding box details
+                tracker.add(object_id, bbox)
+
+                # Add object count
+                obj_count += 1
+
+        return obj_count
+
+
+    # function __process_first_frame
+    # Description: Function that handles the first frame process of a source
+    # Parameter: self, source
+    # Return value: None
+    def __process_first_frame(self, source):
+        """ First frame process """
+
+        # Check if first frame
+        if source.is_first_frame:
+            source.is_first_frame = False
+
+            # Extract calibrations from calibration file
+            source.calibration_stat = self.__extract_calibrations(source)
+
+            # Calibrations are extracted successfully
+            if source.calibration_stat == constants.CALIB_STAT_NORMAL:
+
+                # Initialize Bird's Eye View transformation
+                source.b_eye_transform = BirdsEyeTransform( \
+                    source.calibrations[constants.B_EYE_CALIB_INDEX], \
+                    constants.B_EYE_VIEW_DIM)
+
+                # Initialize danger zone transformation
+                Monitoring.get_instance(source.source_id).initialize_d_zone( \
+                    constants.B_EYE_VIEW_DIM, \
+                    source.calibrations[constants.B_EYE_CALIB_INDEX], \
+                    source.calibrations[constants.D_ZONE_CALIB_INDEX])
+
+
+    # function __apply_calibrations
+    # Description: Function that swaps in the reloaded calibrations of a source, if any.
+    #              The dwell state is reset only if the danger zones have changed: zones and
+    #              centroids are both mapped by the Bird's Eye calibration, so it alone does
+    #              not move objects in or out of a zone.
+    # Parameter: self, source
+    # Return value: None
+    def __apply_calibrations(self, source):
+        """ Apply reloaded calibrations """
+
+        pending = self.__pending.pop(source.source_id, None)
+
+        # No reload, or the file was rewritten with the same calibrations
+        if pending is None or pending[0] == source.calibrations:
+            return
+
+        calibrations, b_eye_transform = pending
+
+        # The reloaded calibrations replace the first frame extraction
+        source.is_first_frame = False
+        source.calibrations = calibrations
+        source.b_eye_transform = b_eye_transform
+        source.calibration_stat = constants.CALIB_STAT_NORMAL
+
+        Monitoring.get_instance(source.source_id).reload_d_zone( \
+            constants.B_EYE_VIEW_DIM, \
+            calibrations[constants.B_EYE_CALIB_INDEX], \
+            calibrations[constants.D_ZONE_CALIB_INDEX])
+
+        self.__common.post_message(self.name, \
+            f"Calibration of source {source.source_id} is reloaded.")
+
+
+    # function __process_main
+    # Description: Function that handles the main process of a source
+    # Parameter: self, source, obj_count
+    # Return value: None
+    def __process_main(self, source, obj_count):
+        """ Main process """
+
+        monitoring_start = time.perf_counter()
+
+        tracker = Tracker.get_instance(source.source_id)
+        monitoring = Monitoring.get_instance(source.source_id)
+
+        # Get new detection objects: ids and centroids
+        new_ids, new_centroids = tracker.get_new_list()
+
+        # Get the list of transformed centroid
+        transform_start = time.perf_counter()
+        trans_centroid_list = self.__get_b_eye_centroids(source, new_centroids)
+        transform_end = time.perf_counter()
+        self.__metrics.observe(constants.METRIC_TRANSFORM_SECONDS, transform_end - transform_start)
+        self.__tracer.add(constants.STAGE_TRANSFORM, source.source_id, source.pts, \
+            transform_start, transform_end)
+
+        # Get transformed Danger zone polygons
+        trans_d_zones = monitoring.get_trans_d_zones()
+
+        # detected person is not none and the calibrations are extracted
+        has_new_alert = False
+        if obj_count > 0 and source.calibration_stat == constants.CALIB_STAT_NORMAL and \
+            source.has_image:
+
+            # Danger zone monitoring
+            run_start = time.perf_counter()
+            monitoring.run(new_ids, trans_centroid_list)
+            self.__tracer.add(constants.STAGE_MONITORING_RUN, source.source_id, source.pts, \
+                run_start, time.perf_counter())
+
+            # Get alerts triggered in this frame
+            alerts = monitoring.get_new_alerts()
+
+            # If alerts is not empty, it means there are persons which
+            # having dwell time inside the Danger zone that exceeded the allowable time.
+            if len(alerts) > 0:
+
+                # Alert details: Object id, Dwell time, Alert flag, Alert time, Zone name
+                # Get list of bbox and centroid of all new alerts
+                annotator_data = tracker.get_annotator_data(alerts)
+
+                has_new_alert = len(annotator_data) > 0
+
+        # No monitored object: no proximity warning
+        else:
+            monitoring.clear_proximities()
+
+        # Set frame results for the host worker
+        alert_flags = [monitoring.has_alert_by_id(track_id) for track_id in new_ids]
+        proximities = [monitoring.get_proximity_by_id(track_id) for track_id in new_ids]
+        frame_result = FrameResult(source.source_id, new_ids, trans_centroid_list, trans_d_zones, \
+            alert_flags, Monitoring.has_any_alert(), source.pts, proximities, \
+            constants.BUZZ_ON_WARNING and Monitoring.has_any_warning())
+
+        labels = {"source": source.source_id}
+        self.__metrics.set(constants.METRIC_ACTIVE_TRACKS, len(new_ids), labels)
+        self.__metrics.set(constants.METRIC_ACTIVE_ALERTS, sum(alert_flags), labels)
+
+        submit_start = time.perf_counter()
+        self.__stage_times.add(constants.STAGE_MONITORING, submit_start - monitoring_start)
+
+        # Set new alerts: object ids, alert times and zone names,
+        # their annotation data and the frame image
+        if has_new_alert:
+            # Materialize the frame image while the buffer is still mapped
+            frame = source.lazy_frame.get()
+
+            frame_result.set_alert([(alert[0], alert[3], alert[4]) for alert in alerts], \
+                annotator_data, frame)
+
+        # Host update, annotation, alert sending and buzzer run in the host worker
+        HostWorker.get_instance().submit(frame_result)
+
+        submit_end = time.perf_counter()
+        self.__stage_times.add(constants.STAGE_SUBMIT, submit_end - submit_start)
+        self.__tracer.add(constants.STAGE_SUBMIT, source.source_id, source.pts, submit_start, \
+            submit_end)
+
+
+    # function __extract_calibrations
+    # Description: Function to extract calibrations from the calibration file of a source
+    # Parameter: self, source
+    # Return value: calibration_stat
+    def __extract_calibrations(self, source):
+        """ Extract calibrations from file """
+
+        # Get calibration details
+        source.calibrations = self.__common.get_calibrations(source.calibration_path)
+
+        # Calibration process failed
+        if source.calibrations is None:
+
+            self.__common.post_message(self.name, f"Calibration of source {source.source_id}" + \
+                " is not yet done successfully. Unable to proceed.", constants.LOG_WARNING)
+
+            # Set calibration status to error
+            calibration_stat = constants.CALIB_STAT_ERROR
+
+        # Calibration process is successful
+        else:
+
+            self.__common.post_message(self.name, \
+                f"Calibration of source {source.source_id} is extracted successfully.")
+
+            # Set calibration status to normal
+            calibration_stat = constants.CALIB_STAT_NORMAL
+
+        # Return the calibration process status
+        return calibration_stat
+
+
+    # function __get_b_eye_centroids
+    # Description: Function to get the bird's eye centroids
+    # Parameter: cls, source, new_centroids
+    # Return value: trans_centroid_list
+    @classmethod
+    def __get_b_eye_centroids(cls, source, new_centroids):
+        """ Get the Bird's eye centroids """
+
+        # Calibrations are not yet extracted
+        if source.b_eye_transform is None:
+            return []
+
+        # Transform all centroids in one call
+        trans_centroids = source.b_eye_transform.transform(new_centroids)
+
+        # Set transformed centroids as list of (x, y)
+        trans_centroid_list = [tuple(centroid) for centroid in trans_centroids.tolist()]
+
+        # Return the transformed centroid list
+        return trans_centroid_list
@@ -0,0 +1,214 @@
+""" Frame Scheduler """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+from common import constants
+from common.common import Common
+#pylint: disable=wrong-import-position
+
+# class FrameScheduler
+# Description: Class that sets the inference interval and the Python processing cadence
+#              together, and adapts them to the scene and to the processing load.
+#              - Someone inside or approaching a danger zone: every frame
+#              - Persons in view: SCHED_PRESENT_INTERVAL
+#              - Empty scene for SCHED_IDLE_FRAMES processed frames: SCHED_IDLE_INTERVAL
+#              A busier tier applies at once, the present tier after SCHED_HOLD_FRAMES
+#              processed frames requesting it, so the interval does not flap.
+#              The interval is raised further while processing exceeds the frame budget,
+#              unless someone is inside or approaching a danger zone in any source.
+# Parameter: None
+# Return value: None
+class FrameScheduler:
+    """ Adaptive inference and processing interval scheduler """
+
+    __frame_scheduler = None    # FrameScheduler class instance
+    __common = None             # Common class instance
+
+    __pgie = None               # Inference element
+    __interval = 0              # Current interval: frames skipped between processed frames
+    __scene_interval = None     # Interval requested by the scene, per source id
+    __near_zone = None          # Source ids with someone inside or approaching a danger zone
+    __load_interval = 0         # Additional interval requested by the processing load
+    __skipped_cnt = None        # Frames skipped since the last processed frame, per source id
+    __empty_cnt = None          # Processed frames without any person, per source id
+    __hold_cnt = None           # Processed frames requesting a quieter tier, per source id
+    __process_time = 0.0        # Smoothed processing time per processed frame (seconds)
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __frame_scheduler
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if FrameScheduler.__frame_scheduler is None:
+
+            # Call the class constructor
+            FrameScheduler()
+
+        # Return the class instance
+        return FrameScheduler.__frame_scheduler
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if FrameScheduler.__frame_scheduler is None:
+
+            FrameScheduler.__frame_scheduler = self       # Initialize FrameScheduler class instance
+            self.__common = Common.get_instance()         # Initialize Common class instance
+            self.name = constants.C_NAME_FRAME_SCHEDULER  # Set class name
+
+            self.__scene_interval = {}
+            self.__near_zone = set()
+            self.__skipped_cnt = {}
+            self.__empty_cnt = {}
+            self.__hold_cnt = {}
+
+
+    # function set_inference_element
+    # Description: Function that sets the nvinfer element whose interval is scheduled
+    # Parameter: self, pgie
+    # Return value: None
+    def set_inference_element(self, pgie):
+        """ Set inference element """
+
+        self.__pgie = pgie
+
+        # Apply the current interval
+        self.__pgie.set_property('interval', self.__interval)
+
+
+    # function get_interval
+    # Description: Function that returns the current interval
+    # Parameter: self
+    # Return value: __interval
+    def get_interval(self):
+        """ Returns the current interval """
+
+        return self.__interval
+
+
+    # function should_process
+    # Description: Function that returns True if the current frame should be processed.
+    #              With the inference element, the frames inferred by nvinfer are processed,
+    #              so the cadence follows its batches. Otherwise, e.g. on replay, one frame
+    #              is processed every interval + 1 frames.
+    # Parameter: self, source_id, inferred (True if nvinfer ran on the frame. None: unknown)
+    # Return value: result
+    def should_process(self, source_id=0, inferred=None):
+        """ Check if the frame is processed """
+
+        # Cadence of the inference element
+        if inferred is not None:
+            return bool(inferred)
+
+        skipped_cnt = self.__skipped_cnt.get(source_id, self.__interval)
+
+        # Interval reached: process the frame
+        if skipped_cnt >= self.__interval:
+
+            self.__skipped_cnt[source_id] = 0
+            result = True
+
+        # Skip the frame
+        else:
+
+            self.__skipped_cnt[source_id] = skipped_cnt + 1
+            result = False
+
+        # Return result
+        return result
+
+
+    # function update
+    # Description: Function that updates the interval after a processed frame.
+    #              The inference interval is shared by all sources,
+    #              so the busiest source decides the scene interval.
+    # Parameter: self, source_id, obj_count, near_zone, process_time
+    #            (persons detected, True if someone is inside or approaching a danger zone,
+    #             processing time of the frame in seconds)
+    # Return value: None
+    def update(self, source_id, obj_count, near_zone, process_time):
+        """ Update the interval """
+
+        # Interval requested by the scene of the source
+        if obj_count > 0 or near_zone:
+            self.__empty_cnt[source_id] = 0
+        else:
+            self.__empty_cnt[source_id] = self.__empty_cnt.get(source_id, 0) + 1
+
+        self.__near_zone.discard(source_id)
+
+        if near_zone:
+            self.__near_zone.add(source_id)
+            requested = constants.SCHED_ACTIVE_INTERVAL
+        elif self.__empty_cnt[source_id] >= constants.SCHED_IDLE_FRAMES:
+            requested = constants.SCHED_IDLE_INTERVAL
+        else:
+            requested = constants.SCHED_PRESENT_INTERVAL
+
+        scene_interval = self.__scene_interval.get(source_id, constants.SCHED_ACTIVE_INTERVAL)
+
+        # Busier tier: at once. Idle tier: SCHED_IDLE_FRAMES empty frames are its hold
+        if requested <= scene_interval or requested == constants.SCHED_IDLE_INTERVAL:
+
+            self.__hold_cnt[source_id] = 0
+            self.__scene_interval[source_id] = requested
+
+        # Quieter tier: after the hold
+        else:
+
+            self.__hold_cnt[source_id] = self.__hold_cnt.get(source_id, 0) + 1
+            if self.__hold_cnt[source_id] >= constants.SCHED_HOLD_FRAMES:
+                self.__hold_cnt[source_id] = 0
+                self.__scene_interval[source_id] = requested
+
+        # Smooth processing time
+        self.__process_time += constants.SCHED_TIME_SMOOTHING * \
+            (process_time - self.__process_time)
+
+        # Interval requested by the processing load
+        if self.__process_time > constants.SCHED_FRAME_BUDGET:
+            self.__load_interval += 1
+        elif self.__process_time < constants.SCHED_FRAME_BUDGET / 2 and self.__load_interval > 0:
+            self.__load_interval -= 1
+
+        # Apply the new interval. Someone inside or approaching a danger zone:
+        # every frame is processed, whatever the load
+        scene_interval = min(self.__scene_interval.values(), \
+            default=constants.SCHED_ACTIVE_INTERVAL)
+        if self.__near_zone:
+            self.__set_interval(scene_interval)
+        else:
+            self.__set_interval(min(scene_interval + self.__load_interval, \
+                constants.SCHED_MAX_INTERVAL))
+
+
+    # function __set_interval
+    # Description: Function that applies the interval to the inference element and the cadence
+    # Parameter: self, interval
+    # Return value: None
+    def __set_interval(self, interval):
+        """ Set interval """
+
+        # Interval is unchanged
+        if interval == self.__interval:
+            return
+
+        self.__interval = interval
+
+        # Set inference interval
+        if self.__pgie is not None:
+            self.__pgie.set_property('interval', interval)
+
+        self.__common.post_message(self.name, f"Interval changed: {interval}")
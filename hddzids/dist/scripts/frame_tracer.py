@@ -0,0 +1,149 @@
+""" Frame Tracer """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import itertools
+import json
+import threading
+import time
+from common import constants
+#pylint: disable=wrong-import-position
+
+# class FrameTracer
+# Description: Class that records the processing spans of each frame, keyed by
+#              the source id and the buffer PTS, into a fixed-size ring buffer.
+#              The ring can be dumped as Chrome trace-event JSON (chrome://tracing, Perfetto).
+#              Recording is a tuple store: no lock, no allocation of the ring.
+# Parameter: None
+# Return value: None
+class FrameTracer:
+    """ Per-frame stage tracer """
+
+    __frame_tracer = None       # FrameTracer class instance
+
+    __ring = None               # Span ring: (stage, source id, pts, start, end, thread) per span
+    __counter = None            # Span counter: next ring index
+    __enabled = False           # Recording flag
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __frame_tracer
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if FrameTracer.__frame_tracer is None:
+
+            # Call the class constructor
+            FrameTracer()
+
+        # Return the class instance
+        return FrameTracer.__frame_tracer
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if FrameTracer.__frame_tracer is None:
+
+            FrameTracer.__frame_tracer = self   # Initialize FrameTracer class instance
+
+
+    # function start
+    # Description: Function that allocates the ring and starts recording
+    # Parameter: self, size (span count kept)
+    # Return value: None
+    def start(self, size=constants.TRACE_RING_SIZE):
+        """ Start recording """
+
+        self.__ring = [None] * size
+        self.__counter = itertools.count()
+        self.__enabled = True
+
+
+    # function stop
+    # Description: Function that stops recording. The recorded spans are kept for dump.
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop recording """
+
+        self.__enabled = False
+
+
+    # function is_enabled
+    # Description: Function that returns True while recording
+    # Parameter: self
+    # Return value: __enabled
+    def is_enabled(self):
+        """ Returns recording flag """
+
+        return self.__enabled
+
+
+    # function add
+    # Description: Function that records a span of a frame. The oldest span is overwritten
+    #              when the ring is full.
+    # Parameter: self, stage, source_id, pts (buffer PTS in nanoseconds. None: unknown),
+    #            start, end (time.perf_counter() seconds)
+    # Return value: None
+    def add(self, stage, source_id, pts, start, end):
+        """ Record span """
+
+        if not self.__enabled:
+            return
+
+        # next() on itertools.count is atomic under the GIL
+        index = next(self.__counter) % len(self.__ring)
+        self.__ring[index] = (stage, source_id, pts, start, end, threading.current_thread().name)
+
+
+    # function get_spans
+    # Description: Function that returns the recorded spans, oldest first
+    # Parameter: self
+    # Return value: [(stage, source id, pts, start, end, thread), ...]
+    def get_spans(self):
+        """ Returns recorded spans """
+
+        if self.__ring is None:
+            return []
+
+        return sorted((span for span in list(self.__ring) if span is not None), \
+            key=lambda span: span[3])
+
+
+    # function dump
+    # Description: Function that writes the recorded spans as Chrome trace-event JSON.
+    #              Each source is a process and each thread a track. The PTS of the frame
+    #              is kept in the event arguments, so the spans of one frame can be matched.
+    # Parameter: self, path
+    # Return value: span count
+    def dump(self, path):
+        """ Dump Chrome trace """
+
+        spans = self.get_spans()
+        origin = spans[0][3] if spans else time.perf_counter()
+
+        events = []
+        for source_id in sorted({span[1] for span in spans}):
+            events.append({"name": "process_name", "ph": "M", "pid": source_id, \
+                "args": {"name": f"Source {source_id}"}})
+
+        for stage, source_id, pts, start, end, thread in spans:
+            events.append({"name": stage, "cat": constants.TRACE_CATEGORY, "ph": "X", \
+                "ts": round((start - origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1), \
+                "pid": source_id, "tid": thread, "args": {"pts": pts}})
+
+        with open(path, 'w', encoding=constants.FILE_ENCODING) as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+        return len(spans)
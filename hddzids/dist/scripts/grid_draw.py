@@ -4,9 +4,11 @@
 # Add license here
 
 # Add imports here
+from collections import Counter
 import cv2
 import numpy as np
 from common import constants
+from scripts.encode_pool import EncodePool
 #pylint: disable=wrong-import-position
 
 # class GridDraw
@@ -16,53 +18,67 @@ from common import constants
 class GridDraw:
     """ Draw Bird's Eye View Grid """
 
-    __grid_draw = None         # Class instance
-    __grid = None              # Grid template with danger zone box
+    __grid_draws = {}          # Class instance per source id
+    __grid = None              # Grid template with danger zone polygons
+    __d_zones = None           # Danger zone polygons of the grid template
+    __frame = None             # Last composited grid image
+    __drawn = None             # Centroid items drawn on the composited image: (centroid, alert)
+    __empty_img = None         # Encoded grid template without centroids
+    __last_img = None          # Encoded last composited grid image
 
     # function get_instance
-    # Description: Functon to return the class instance
-    # Parameter: b_eye_dimension, grid_division, d_zone_cornert_pts
-    # Return value: __grid_draw
+    # Description: Functon to return the class instance of a source
+    # Parameter: source_id
+    # Return value: __grid_draws[source_id]
     @staticmethod
-    def get_instance():
+    def get_instance(source_id=0):
         """ Static access method. """
 
         # Check if not yet initialized
-        if GridDraw.__grid_draw is None:
+        if source_id not in GridDraw.__grid_draws:
 
             # Call the class constructor
-            GridDraw()
+            GridDraw(source_id)
 
         # Return the class instance
-        return GridDraw.__grid_draw
+        return GridDraw.__grid_draws[source_id]
 
 
     # function __init__
     # Description: Class constructor
-    # Parameter: self
+    # Parameter: self, source_id
     # Return value: None
-    def __init__(self):
+    def __init__(self, source_id=0):
         """ Virtually private constructor. """
 
         # Check if not yet initialized
-        if GridDraw.__grid_draw is None:
+        if source_id not in GridDraw.__grid_draws:
 
-            GridDraw.__grid_draw = self           # Set GridDraw class instance
+            GridDraw.__grid_draws[source_id] = self   # Set GridDraw class instance
 
 
     # function initialize_grid
     # Description: Function that initializes grid
-    # Parameter: self, b_eye_dimension, grid_division, d_zone_cornert_pts
+    # Parameter: self, b_eye_dimension, grid_division, d_zones (flat point list per zone)
     # Return value: None
-    def initialize_grid(self, b_eye_dimension, grid_division, d_zone_cornert_pts):
+    def initialize_grid(self, b_eye_dimension, grid_division, d_zones):
         """ Initialize grid """
 
-        # Check if grid is not yet initialized
-        if self.__grid is None:
+        d_zones = [list(points) for points in d_zones]
+
+        # Check if grid is not yet initialized or the danger zones have changed
+        if self.__grid is None or d_zones != self.__d_zones:
 
             # Initialize grid template
             self.__grid = self.__create_grid(b_eye_dimension)
-            self.__draw_lines(self.__grid, b_eye_dimension, grid_division, d_zone_cornert_pts)
+            self.__draw_lines(self.__grid, b_eye_dimension, grid_division, d_zones)
+            self.__d_zones = d_zones
+
+            # Start compositing from the template and pre-encode the empty grid
+            self.__frame = self.__grid.copy()
+            self.__drawn = Counter()
+            self.__empty_img = self.__encode(self.__grid)
+            self.__last_img = self.__empty_img
 
 
     # function __create_grid
@@ -82,9 +98,9 @@ class GridDraw:
 
     # function __draw_lines
     # Description: Function to draw grid lines
-    # Parameter: self, frame, b_eye_dimension, grid_division, d_zone_corner_pts
+    # Parameter: self, frame, b_eye_dimension, grid_division, d_zones
     # Return value: None
-    def __draw_lines(self, frame, b_eye_dimension, grid_division, d_zone_corner_pts):
+    def __draw_lines(self, frame, b_eye_dimension, grid_division, d_zones):
         """ Draw grid lines on template """
 
         # Set grid cell dimension
@@ -107,17 +123,11 @@ class GridDraw:
         self.__grid = frame
 
         ###############################################################
-        # Draw danger zone
+        # Draw danger zones
         ###############################################################
 
-        cv2.line(frame, (d_zone_corner_pts[0], d_zone_corner_pts[1]), \
-            (d_zone_corner_pts[2], d_zone_corner_pts[3]), constants.GRID_D_ZONE_COLOR, 2)
-        cv2.line(frame, (d_zone_corner_pts[2], d_zone_corner_pts[3]), \
-            (d_zone_corner_pts[4], d_zone_corner_pts[5]), constants.GRID_D_ZONE_COLOR, 2)
-        cv2.line(frame, (d_zone_corner_pts[4], d_zone_corner_pts[5]), \
-            (d_zone_corner_pts[6], d_zone_corner_pts[7]), constants.GRID_D_ZONE_COLOR, 2)
-        cv2.line(frame, (d_zone_corner_pts[6], d_zone_corner_pts[7]), \
-            (d_zone_corner_pts[0], d_zone_corner_pts[1]), constants.GRID_D_ZONE_COLOR, 2)
+        cv2.polylines(frame, [np.asarray(points, dtype=np.int32).reshape(-1, 2) \
+            for points in d_zones], True, constants.GRID_D_ZONE_COLOR, 2)
 
 
     # function __draw_centroids
@@ -135,32 +145,104 @@ class GridDraw:
             if item[1]:
                 # Centroid color is red
                 centroid_color = constants.PTS_ALRT_ZONE_COLOR
+            elif item[2] == constants.PROXIMITY_INSIDE:
+                # Centroid color is orange
+                centroid_color = constants.PTS_INSD_ZONE_COLOR
+            elif item[2] == constants.PROXIMITY_APPROACHING:
+                # Centroid color is yellow
+                centroid_color = constants.PTS_APPR_ZONE_COLOR
             else:
                 # Centroid color is blue
                 centroid_color = constants.PTS_NORM_ZONE_COLOR
 
             # Draw centroid
-            cv2.circle(frame, item[0], 7, centroid_color, -1)
+            cv2.circle(frame, item[0], constants.GRID_CENTROID_RADIUS, centroid_color, -1)
 
         return frame
 
 
+    # function __get_dirty_rect
+    # Description: Function that returns the region covered by a centroid, clipped to the grid
+    # Parameter: self, centroid
+    # Return value: (x1, y1, x2, y2)
+    def __get_dirty_rect(self, centroid):
+        """ Returns the centroid region """
+
+        radius = constants.GRID_CENTROID_RADIUS + 1
+        height, width = self.__grid.shape[:2]
+
+        return (max(centroid[0] - radius, 0), max(centroid[1] - radius, 0), \
+            min(centroid[0] + radius + 1, width), min(centroid[1] + radius + 1, height))
+
+
+    # function __encode
+    # Description: Function that encodes the grid image into JPEG bytes in the encode pool
+    # Parameter: cls, frame, droppable
+    # Return value: byte_img or None if the job was dropped
+    @classmethod
+    def __encode(cls, frame, droppable=False):
+        """ Encode grid image """
+
+        # Convert to bytecode
+        return EncodePool.get_instance().encode(frame, droppable=droppable)
+
+
     # function get_b_eye_grid_img
-    # Description: Function that returns the bytecode copy of the grid image with centroids
+    # Description: Function that returns the bytecode copy of the grid image with centroids.
+    #              Only the regions of vanished, moved and new centroids are redrawn on the
+    #              last composited image, and the encoded image is reused for an unchanged scene.
     # Parameter: self, centroid_data
-    # Return value: byte_img
+    # Return value: byte_img or None if the encode job was dropped
     def get_b_eye_grid_img(self, centroid_data):
         """ Return bytecode copy of the grid image """
 
-        # Copy the grid template
-        frame = self.__grid.copy()
+        items = Counter((tuple(centroid), bool(alert_flag), int(proximity)) \
+            for centroid, alert_flag, proximity in centroid_data)
 
-        # Plot centroid
-        frame = self.__draw_centroids(frame, centroid_data)
+        # Unchanged scene
+        if items == self.__drawn and self.__last_img is not None:
+            return self.__last_img
 
-        # Convert to bytecode
-        _, img = cv2.imencode(".jpg", frame)
-        byte_img = img.tobytes()
+        removed = self.__drawn - items
+        added = items - self.__drawn
+
+        # Erase vanished and moved centroids by restoring the template regions
+        dirty_rects = []
+        for centroid, _, _ in removed:
+
+            rect = self.__get_dirty_rect(centroid)
+            if rect[0] < rect[2] and rect[1] < rect[3]:
+                self.__frame[rect[1]:rect[3], rect[0]:rect[2]] = \
+                    self.__grid[rect[1]:rect[3], rect[0]:rect[2]]
+                dirty_rects.append(rect)
+
+        # Redraw kept centroids overlapping an erased region, then draw new centroids
+        kept = items - added
+        redraw = [item for item in kept if any(self.__is_overlapping(item[0], rect) \
+            for rect in dirty_rects)]
+        self.__draw_centroids(self.__frame, redraw + list(added))
+        self.__drawn = items
+
+        # Empty scene: pre-encoded template
+        if not items:
+            self.__last_img = self.__empty_img
+
+        # Encode job may be dropped under load. The next update encodes again
+        else:
+            self.__last_img = self.__encode(self.__frame, droppable=True)
+
+        # Return bytecode grid image. If dropped, return None
+        return self.__last_img
+
+
+    # function __is_overlapping
+    # Description: Function that returns True if the centroid region overlaps the rect
+    # Parameter: self, centroid, rect
+    # Return value: result
+    def __is_overlapping(self, centroid, rect):
+        """ Check centroid region overlap """
+
+        other = self.__get_dirty_rect(centroid)
 
-        # Return bytecode grid image
-        return byte_img
+        return other[0] < rect[2] and rect[0] < other[2] and \
+            other[1] < rect[3] and rect[1] < other[3]
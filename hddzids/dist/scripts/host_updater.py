@@ -3,12 +3,12 @@
 
 # Add imports here
 import time
-import socket
-import paho.mqtt.client as mqtt
 from common import constants
 from common.common import Common
+from scripts.mqtt_publisher import MqttPublisher
 from scripts.grid_draw import GridDraw
 from scripts.monitoring import Monitoring
+from scripts.vector_encoder import VectorEncoder
 #pylint: disable=wrong-import-position
 
 # class HostUpdater
@@ -18,129 +18,219 @@ from scripts.monitoring import Monitoring
 class HostUpdater:
     """ Update sender to mobile """
 
-    __host_updater = None  # HostUpdater Class instance
-    __common = None        # Common class instance
-    __grid_draw = None     # GridDraw class instance
-    __monitoring = None    # Monitoring class instance
+    __host_updaters = {}     # HostUpdater Class instance per source id
+    __common = None          # Common class instance
+    __source_id = 0          # Source id
+    __grid_draw = None       # GridDraw class instance
+    __monitoring = None      # Monitoring class instance
+    __publisher = None       # MqttPublisher class instance
+    __topic = None           # Host update topic of the source
+    __vector_topic = None    # Host update track list topic of the source
+    __vector_encoder = None  # Track list keyframe and delta encoder
+    __last_signature = None  # Signature of the last published update
+    __last_time = None       # Time of the last published update (monotonic seconds)
 
     # function get_instance
-    # Description: Functon to return the class instance
-    # Parameter: None
-    # Return value: __host_updater
+    # Description: Functon to return the class instance of a source
+    # Parameter: source_id
+    # Return value: __host_updaters[source_id]
     @staticmethod
-    def get_instance():
+    def get_instance(source_id=0):
         """ Static access method. """
 
         # Check if not yet initialized
-        if HostUpdater.__host_updater is None:
+        if source_id not in HostUpdater.__host_updaters:
 
             # Call the class constructor
-            HostUpdater()
+            HostUpdater(source_id)
 
         # Return the class instance
-        return HostUpdater.__host_updater
+        return HostUpdater.__host_updaters[source_id]
 
 
     # function __init__
     # Description: Class constructor
-    # Parameter: self
+    # Parameter: self, source_id
     # Return value: None
-    def __init__(self):
+    def __init__(self, source_id=0):
         """ Virtually private constructor. """
 
         # Check if not yet initialized
-        if HostUpdater.__host_updater is None:
+        if source_id not in HostUpdater.__host_updaters:
 
-            HostUpdater.__host_updater = self             # Initialize HostUpdater class instance
-            self.__common = Common.get_instance()         # Initialize Common class instance
-            self.__grid_draw = GridDraw.get_instance()    # Initialize GridDraw class instance
-            self.__monitoring = Monitoring.get_instance() # Initialize Monitoring class instance
-            self.name = constants.C_NAME_HOST_UPDATER     # Set class name
+            HostUpdater.__host_updaters[source_id] = self          # Initialize class instance
+            self.__common = Common.get_instance()                  # Initialize Common class instance
+            self.__grid_draw = GridDraw.get_instance(source_id)    # Initialize GridDraw instance
+            self.__monitoring = Monitoring.get_instance(source_id) # Initialize Monitoring instance
+            self.__publisher = MqttPublisher.get_instance()        # Initialize MqttPublisher instance
+            self.name = constants.C_NAME_HOST_UPDATER              # Set class name
+            self.__source_id = source_id                           # Set source id
+
+            # Set host update topic of the source
+            self.__topic = self.__common.get_topic(constants.MSG_TOPIC_HOST_UPDATE, source_id)
+            self.__vector_topic = self.__common.get_topic(constants.MSG_TOPIC_HOST_VECTOR, \
+                source_id)
+            self.__vector_encoder = VectorEncoder()
 
 
     # function __send_update_to_host
-    # Description: function that publishes the host update using bytecode image
-    # Parameter: image
+    # Description: function that queues the host update using bytecode image.
+    #              Only the latest queued update is kept while the host is unreachable.
+    # Parameter: image, pts
     # Return value: result
-    def __send_update_to_host(self, image):
+    def __send_update_to_host(self, image, pts=None):
         """ Updates the mobile host """
 
-        client = mqtt.Client()
-        try:
-            # Timeout for image saving time
-            time.sleep(0.3)
-            # Connect client
-            client.connect(constants.MOBILE_HOST, constants.MOBILE_PORT, 60)
-
-            #publish topic and image
-            client.publish(constants.MSG_TOPIC_HOST_UPDATE, image, 0)
-
-        # This error occurred when:
-        # - The MQTT service is off
-        # - The Host and Port of MQTT service and Edge PC did not matched
-        except ConnectionRefusedError:
-
-            self.__common.post_message(self.name, \
-                "[ConnectionRefusedError] Unable to connect to MQTT service!")
-            result = constants.RETURN_NG
-
-        # This error occurred when the IP string is not valid
-        except socket.gaierror:
+        # Queue topic and image
+        return self.__publisher.publish(self.__topic, image, 0, replace=True, \
+            ttl=constants.MQTT_TTL_HOST_UPDATE, trace=(self.__source_id, pts))
 
-            self.__common.post_message(self.name, \
-                "[socket.gaierror] Invalid MQTT host!")
-            result = constants.RETURN_NG
 
-        # This error occurred when:
-        # - The Host is set with integer
-        # - The Port is set with string
-        except TypeError:
-
-            self.__common.post_message(self.name, \
-                "[TypeError] Host IP should be in string form. Port should be in int form.")
-            result = constants.RETURN_NG
+    # function run
+    # Description: Function that runs the host updater.
+    #              The grid is drawn and published only if the update is due.
+    # Parameter: self, new_ids, trans_centroid_list, trans_d_zones, alert_flags
+    #            (alert flag per id. If None, the flags are read from Monitoring), pts,
+    #            proximities (proximity tier per id. If None, the tiers are read from Monitoring)
+    # Return value: None
+    def run(self, new_ids, trans_centroid_list, trans_d_zones, alert_flags=None, pts=None, \
+        proximities=None):
+        """ Runs the host updater """
 
-        # The update is sent successfully
-        else:
-            result = constants.RETURN_OK
+        # Generate grid data
+        grid_data = self.__generate_grid_data(new_ids, trans_centroid_list, alert_flags, \
+            proximities)
 
-        finally:
-            #Disconnect client
-            client.disconnect()
+        now = time.monotonic()
 
-        return result
+        # Track list update
+        if constants.HOST_UPDATE_FORMATS & constants.HOST_UPDATE_VECTOR:
+            self.__run_vector(new_ids, grid_data, trans_d_zones, now, pts)
 
+        # Grid image update for legacy hosts
+        if not constants.HOST_UPDATE_FORMATS & constants.HOST_UPDATE_JPEG:
+            return
 
-    # function run
-    # Description: Function that runs the host updater
-    # Parameter: self, new_ids, trans_centroid_list, trans_d_zone_pts
-    # Return value: None
-    def run(self, new_ids, trans_centroid_list, trans_d_zone_pts):
-        """ Runs the host updater """
+        # Check if the update is due
+        signature = self.__get_signature(grid_data, trans_d_zones)
+        if not self.__is_update_due(signature, now):
+            return
 
         # Initialize grid template
         self.__grid_draw.initialize_grid( \
             (constants.B_EYE_VIEW_DIM[2], constants.B_EYE_VIEW_DIM[7]), \
             constants.GRID_DIV, \
-            trans_d_zone_pts)
-
-        # Generate grid data
-        grid_data = self.__generate_grid_data(new_ids, trans_centroid_list)
+            trans_d_zones)
 
         # Get byte code Bird's Eye grid image with centroids
         grid_byte_img = self.__grid_draw.get_b_eye_grid_img(grid_data)
 
+        # Encode job was dropped under load. Retry on the next update
+        if grid_byte_img is None:
+            return
+
         # Send updated grid image to mobile
         # Check if the sending process fails
-        if constants.RETURN_OK != self.__send_update_to_host(grid_byte_img):
+        if constants.RETURN_OK != self.__send_update_to_host(grid_byte_img, pts):
             self.__common.post_message(self.name, "Update sending failed!")
 
+        else:
+
+            # Set the published update
+            self.__last_signature = signature
+            self.__last_time = now
+
+
+    # function __run_vector
+    # Description: Function that publishes the track list keyframe or delta, if any
+    # Parameter: self, new_ids, grid_data, trans_d_zones, now, pts
+    # Return value: None
+    def __run_vector(self, new_ids, grid_data, trans_d_zones, now, pts=None):
+        """ Track list update """
+
+        payload = self.__vector_encoder.encode(new_ids, \
+            [centroid for centroid, _, _ in grid_data], \
+            [alert_flag for _, alert_flag, _ in grid_data], trans_d_zones, now)
+
+        # Nothing changed
+        if payload is None:
+            return
+
+        # Deltas are never replaced: each one applies to the previous message
+        if constants.RETURN_OK != self.__publisher.publish(self.__vector_topic, payload, \
+            ttl=constants.MQTT_TTL_HOST_UPDATE, trace=(self.__source_id, pts)):
+            self.__common.post_message(self.name, "Track list sending failed!")
+
+
+    # function __get_signature
+    # Description: Function that returns the signature of the update.
+    #              Centroids are quantized so that jitter does not trigger an update.
+    # Parameter: cls, grid_data, trans_d_zones
+    # Return value: (danger zone polygons,
+    #                sorted quantized centroids with alert flags and proximity tiers)
+    @classmethod
+    def __get_signature(cls, grid_data, trans_d_zones):
+        """ Returns the update signature """
+
+        quantum = constants.HOST_UPDATE_QUANTUM
+
+        return (tuple(tuple(points) for points in trans_d_zones), tuple(sorted( \
+            (centroid[0] // quantum, centroid[1] // quantum, alert_flag, proximity) \
+            for centroid, alert_flag, proximity in grid_data)))
+
+
+    # function __is_update_due
+    # Description: Function that returns True if the update should be published:
+    #              - Keep-alive: HOST_UPDATE_KEEPALIVE seconds passed since the last update
+    #              - Alert state changed: published right away
+    #              - Centroids changed: published at HOST_UPDATE_MAX_RATE at most
+    # Parameter: self, signature, now
+    # Return value: result
+    def __is_update_due(self, signature, now):
+        """ Check if the update is due """
+
+        # First update
+        if self.__last_signature is None:
+            return True
+
+        elapsed = now - self.__last_time
+
+        # Keep-alive
+        if elapsed >= constants.HOST_UPDATE_KEEPALIVE:
+            result = True
+
+        # Unchanged
+        elif signature == self.__last_signature:
+            result = False
+
+        # Alert state changed
+        elif self.__get_alert_count(signature) != self.__get_alert_count(self.__last_signature):
+            result = True
+
+        # Centroids changed. Limit the publish rate
+        else:
+            result = elapsed >= 1.0 / constants.HOST_UPDATE_MAX_RATE
+
+        # Return result
+        return result
+
+
+    # function __get_alert_count
+    # Description: Function that returns the alert count of an update signature
+    # Parameter: cls, signature
+    # Return value: alert count
+    @classmethod
+    def __get_alert_count(cls, signature):
+        """ Returns the alert count """
+
+        return sum(1 for _, _, alert_flag, _ in signature[1] if alert_flag)
+
 
     # function __generate_grid_data
     # Description: Function that generates the data for grid
-    # Parameter: self, new_ids, new_centroids
+    # Parameter: self, new_ids, new_centroids, alert_flags, proximities
     # Return value: data
-    def __generate_grid_data(self, new_ids, new_centroids):
+    def __generate_grid_data(self, new_ids, new_centroids, alert_flags=None, proximities=None):
         """ Generate grid data """
 
         ids_len = len(new_ids)          # Get id count
@@ -152,11 +242,20 @@ class HostUpdater:
             alert_flag = False          # Holds alert flag. Initial value is False
 
             # Verify alert flag
-            alert_flag = self.__monitoring.has_alert_by_id(new_ids[index])
-
-            # Append new centroid details and alert flag
-            data_item = (new_centroids[index], alert_flag)
+            if alert_flags is None:
+                alert_flag = self.__monitoring.has_alert_by_id(new_ids[index])
+            else:
+                alert_flag = alert_flags[index]
+
+            # Verify proximity tier
+            if proximities is None:
+                proximity = self.__monitoring.get_proximity_by_id(new_ids[index])
+            else:
+                proximity = proximities[index]
+
+            # Append new centroid details, alert flag and proximity tier
+            data_item = (new_centroids[index], alert_flag, proximity)
             data.append(data_item)
 
-        # Return collected centroids and alert flags
+        # Return collected centroids, alert flags and proximity tiers
         return data
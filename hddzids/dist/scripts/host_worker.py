@@ -0,0 +1,369 @@
+""" Host Worker """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from common import constants
+from common.common import Common
+from scripts.host_updater import HostUpdater
+from scripts.annotator import Annotator
+from scripts.alert_notify import AlertNotify
+from scripts.stage_times import StageTimes
+from scripts.frame_tracer import FrameTracer
+#pylint: disable=wrong-import-position
+
+# class FrameResult
+# Description: Class that holds the per-frame results handed to the host worker
+# Parameter: source_id, new_ids, trans_centroids, trans_d_zones, alert_flags, has_alert, pts,
+#            proximities, has_warning
+# Return value: None
+class FrameResult:
+    """ Per-frame results """
+
+    __slots__ = ('source_id', 'new_ids', 'trans_centroids', 'trans_d_zones', 'alert_flags', \
+        'has_alert', 'pts', 'proximities', 'has_warning', 'alerts', 'annotator_data', 'frame')
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, source_id, new_ids, trans_centroids, trans_d_zones, alert_flags, has_alert,
+    #            pts, proximities, has_warning
+    # Return value: None
+    def __init__(self, source_id, new_ids, trans_centroids, trans_d_zones, alert_flags, \
+        has_alert, pts=None, proximities=None, has_warning=False):
+        """ Set frame results """
+
+        self.source_id = source_id                # Source id of the frame
+        self.new_ids = new_ids                    # Track ids of current detections
+        self.trans_centroids = trans_centroids    # Bird's Eye View centroids
+        self.trans_d_zones = trans_d_zones        # Transformed danger zone polygons
+        self.alert_flags = alert_flags            # Alert flag per track id
+        self.has_alert = has_alert                # True if any alert is active on any source
+        self.pts = pts                            # Buffer PTS of the frame
+        self.proximities = proximities            # Proximity tier per track id (None: unknown)
+        self.has_warning = has_warning            # True if a warning sounds the buzzer
+        self.alerts = None                        # New alerts:
+                                                  #   [(object id, alert time, zone name), ...]
+                                                  #   zone name None: unnamed zone
+        self.annotator_data = None                # Bounding box and centroid per new alert
+        self.frame = None                         # Frame image for the alert
+
+
+    # function set_alert
+    # Description: Function that sets the details of the alerts triggered in the frame
+    # Parameter: self, alerts, annotator_data, frame
+    # Return value: None
+    def set_alert(self, alerts, annotator_data, frame):
+        """ Set new alerts """
+
+        self.alerts = alerts
+        self.annotator_data = annotator_data
+        self.frame = frame
+
+
+# class HostWorker
+# Description: Class that runs host updates, annotation, alert sending and buzzer
+#              outside the GStreamer streaming thread
+# Parameter: None
+# Return value: None
+class HostWorker:
+    """ Host-facing side effects worker """
+
+    __host_worker = None        # HostWorker class instance
+    __common = None             # Common class instance
+    __stage_times = None        # StageTimes class instance
+    __tracer = None             # FrameTracer class instance
+    __buzzer = None             # Buzzer class instance (None: no buzzer)
+
+    __queue = None              # Bounded frame result queue
+    __condition = None          # Queue condition
+    __thread = None             # Worker thread
+    __executor = None           # Thread pool for annotation and encoding
+    __spooled = None            # Future of the last submitted alert annotation
+    __running = False           # Worker running flag
+    __dropped_cnt = 0           # Dropped frame result counter
+    __alert_frames = 0          # Alert frames held, queued or annotating
+    __stripped_cnt = 0          # Alerts sent without image counter
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __host_worker
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if HostWorker.__host_worker is None:
+
+            # Call the class constructor
+            HostWorker()
+
+        # Return the class instance
+        return HostWorker.__host_worker
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if HostWorker.__host_worker is None:
+
+            HostWorker.__host_worker = self               # Initialize HostWorker class instance
+            self.__common = Common.get_instance()         # Initialize Common class instance
+            self.__stage_times = StageTimes.get_instance()# Initialize StageTimes class instance
+            self.__tracer = FrameTracer.get_instance()    # Initialize FrameTracer class instance
+            self.name = constants.C_NAME_HOST_WORKER      # Set class name
+
+            self.__queue = deque()
+            self.__condition = threading.Condition()
+
+
+    # function start
+    # Description: Function that starts the worker thread and the thread pool
+    # Parameter: self, use_buzzer (False: run without the GPIO buzzer, e.g. on replay)
+    # Return value: None
+    def start(self, use_buzzer=True):
+        """ Start the worker """
+
+        # Already started
+        if self.__running:
+            return
+
+        # Import on use: the buzzer needs the Jetson GPIO library
+        if use_buzzer:
+            from scripts.buzzer import Buzzer       #pylint: disable=import-outside-toplevel
+            self.__buzzer = Buzzer.get_instance()
+
+        self.__running = True
+        self.__executor = ThreadPoolExecutor(max_workers=constants.HOST_WORKER_THREADS)
+        self.__thread = threading.Thread(target=self.__work_loop, name=self.name, daemon=True)
+        self.__thread.start()
+
+
+    # function stop
+    # Description: Function that processes the remaining results and stops the worker
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop the worker """
+
+        # Not started
+        if not self.__running:
+            return
+
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+
+        self.__thread.join()
+        self.__executor.shutdown(wait=True)
+
+
+    # function submit
+    # Description: Function that queues the per-frame results. Does not block.
+    #              When the queue is full, a result is dropped based on HOST_WORKER_DROP_POLICY.
+    #              Results carrying a new alert are never dropped, but beyond
+    #              HOST_WORKER_ALERT_FRAMES held alert frames, their frame is not kept:
+    #              the alert is sent without image and the memory stays bounded.
+    # Parameter: self, frame_result
+    # Return value: None
+    def submit(self, frame_result):
+        """ Queue frame results """
+
+        # Start on first use
+        if not self.__running:
+            self.start()
+
+        with self.__condition:
+
+            # Alert frame
+            if frame_result.frame is not None:
+
+                # Too many alert frames held: send the alert without image
+                if self.__alert_frames >= constants.HOST_WORKER_ALERT_FRAMES:
+                    frame_result.set_alert(frame_result.alerts, None, None)
+                    self.__stripped_cnt += 1
+                    self.__common.post_message(self.name, \
+                        "Alert frame backlog! Alert is sent without image.", \
+                        constants.LOG_WARNING, "alert-frame-backlog")
+
+                else:
+                    self.__alert_frames += 1
+
+            # Queue is full
+            if len(self.__queue) >= constants.HOST_WORKER_QUEUE_SIZE:
+
+                # Drop the incoming result
+                if constants.HOST_WORKER_DROP_POLICY == constants.DROP_NEWEST and \
+                    frame_result.alerts is None:
+
+                    self.__dropped_cnt += 1
+                    return
+
+                # Drop the oldest result without alert
+                for result in self.__queue:
+                    if result.alerts is None:
+                        self.__queue.remove(result)
+                        self.__dropped_cnt += 1
+                        break
+
+            self.__queue.append(frame_result)
+            self.__condition.notify()
+
+
+    # function get_dropped_count
+    # Description: Function that returns the number of dropped frame results
+    # Parameter: self
+    # Return value: __dropped_cnt
+    def get_dropped_count(self):
+        """ Returns the dropped count """
+
+        return self.__dropped_cnt
+
+
+    # function get_stripped_count
+    # Description: Function that returns the number of alerts sent without image
+    # Parameter: self
+    # Return value: __stripped_cnt
+    def get_stripped_count(self):
+        """ Returns the stripped count """
+
+        return self.__stripped_cnt
+
+
+    # function __work_loop
+    # Description: Function that processes the queued frame results in order
+    # Parameter: self
+    # Return value: None
+    def __work_loop(self):
+        """ Worker thread """
+
+        while True:
+
+            # Wait for a queued result
+            with self.__condition:
+
+                while self.__running and not self.__queue:
+                    self.__condition.wait()
+
+                # Stopped and nothing left to process
+                if not self.__queue:
+                    break
+
+                frame_result = self.__queue.popleft()
+
+            try:
+
+                self.__process(frame_result)
+
+            # Keep the worker alive on any processing error
+            except Exception as error:      #pylint: disable=broad-except
+
+                self.__common.post_message(self.name, f"Process error! [{error}]")
+
+
+    # function __process
+    # Description: Function that runs the host update, alert and buzzer processes
+    # Parameter: self, frame_result
+    # Return value: None
+    def __process(self, frame_result):
+        """ Process frame results """
+
+        update_start = time.perf_counter()
+
+        # Bird's Eye View - Update sending
+        HostUpdater.get_instance(frame_result.source_id).run(frame_result.new_ids, \
+            frame_result.trans_centroids, frame_result.trans_d_zones, frame_result.alert_flags, \
+            frame_result.pts, frame_result.proximities)
+
+        update_end = time.perf_counter()
+        self.__stage_times.add(constants.STAGE_HOST_UPDATE, update_end - update_start)
+        self.__tracer.add(constants.STAGE_HOST_UPDATE, frame_result.source_id, frame_result.pts, \
+            update_start, update_end)
+
+        # New alerts
+        if frame_result.alerts is not None:
+
+            # Annotate and encode frame in the thread pool. Spooled after the previous alert
+            self.__spooled = self.__executor.submit(self.__annotate_alert, \
+                frame_result.source_id, frame_result.alerts, frame_result.annotator_data, \
+                frame_result.frame, frame_result.pts, self.__spooled)
+
+            # Alarm buzzer
+            if self.__buzzer is not None:
+                self.__buzzer.alarm_buzz()
+
+        # Object approaching or inside a danger zone (BUZZ_ON_WARNING)
+        elif frame_result.has_warning and self.__buzzer is not None:
+
+            # Alarm buzzer
+            self.__buzzer.alarm_buzz()
+
+        # Check if there is alert or warning
+        if not frame_result.has_alert and not frame_result.has_warning and \
+            self.__buzzer is not None:
+
+            # Turn off buzzer alarm
+            self.__buzzer.alarm_off()
+
+
+    # function __annotate_alert
+    # Description: Function that annotates the alert frame once and adds the alerts
+    #              of the frame as one batched alert. Frames are annotated in parallel,
+    #              but the alerts are spooled in submission order.
+    # Parameter: self, source_id, alerts, annotator_data, frame, pts,
+    #            previous (future of the previously submitted alert)
+    # Return value: None
+    def __annotate_alert(self, source_id, alerts, annotator_data, frame, pts=None, \
+        previous=None):
+        """ Annotate frame and add alerts """
+
+        try:
+
+            annotate_start = time.perf_counter()
+
+            # Annotate frame: crop around the bounding boxes and context thumbnail
+            if frame is not None:
+                image, thumbnail = Annotator.get_instance().annotate(annotator_data, frame, \
+                    [(source_id, AlertNotify.get_alert_id(*alert)) for alert in alerts])
+
+            # Frame was not kept: alert data only
+            else:
+                image, thumbnail = None, None
+
+            annotate_end = time.perf_counter()
+            self.__stage_times.add(constants.STAGE_ANNOTATE, annotate_end - annotate_start)
+            self.__tracer.add(constants.STAGE_ANNOTATE, source_id, pts, annotate_start, \
+                annotate_end)
+
+            # Wait until the previous alert is spooled. It was submitted earlier, so it
+            # is already running on another thread of the pool
+            if previous is not None:
+                previous.result()
+
+            # Add alerts
+            AlertNotify.get_instance().add_alert(alerts, image, source_id, thumbnail, pts)
+
+            self.__tracer.add(constants.STAGE_ALERT_SPOOL, source_id, pts, annotate_end, \
+                time.perf_counter())
+
+        # Keep the pool alive on any processing error
+        except Exception as error:      #pylint: disable=broad-except
+
+            self.__common.post_message(self.name, f"Annotation error! [{error}]")
+
+        # Release the alert frame
+        finally:
+
+            if frame is not None:
+                with self.__condition:
+                    self.__alert_frames -= 1
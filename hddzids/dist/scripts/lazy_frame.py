@@ -0,0 +1,72 @@
+""" Lazy Frame Image """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import time
+import cv2
+import numpy as np
+from common import constants
+from scripts.frame_tracer import FrameTracer
+#pylint: disable=wrong-import-position
+
+# class LazyFrame
+# Description: Class that holds a reference to a frame surface and materializes
+#              the BGRA frame image only when it is requested
+# Parameter: get_surface, source_id, pts
+# Return value: None
+class LazyFrame:
+    """ Lazily materialized frame image """
+
+    __slots__ = ('__get_surface', '__image', '__source_id', '__pts')
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, get_surface (callable that returns the RGBA surface view),
+    #            source_id, pts (buffer PTS of the frame for the trace)
+    # Return value: None
+    def __init__(self, get_surface, source_id=0, pts=None):
+        """ Set frame surface reference """
+
+        self.__get_surface = get_surface     # Returns the zero-copy RGBA surface view
+        self.__image = None                  # Holds the materialized frame image
+        self.__source_id = source_id         # Source id of the frame
+        self.__pts = pts                     # Buffer PTS of the frame
+
+
+    # function get
+    # Description: Function that copies and converts the frame surface on first request.
+    #              Must be called while the buffer is still mapped (inside the pad probe).
+    # Parameter: self
+    # Return value: __image
+    def get(self):
+        """ Returns the frame image """
+
+        # Materialize on first request
+        if self.__image is None:
+
+            copy_start = time.perf_counter()
+
+            # Get RGBA surface view
+            n_frame = self.__get_surface()
+
+            # Convert into cv2 default color format.
+            # The conversion writes a new array, so the surface is copied only once.
+            self.__image = cv2.cvtColor(np.asarray(n_frame, order='C'), cv2.COLOR_RGBA2BGRA)
+
+            FrameTracer.get_instance().add(constants.STAGE_SURFACE_COPY, self.__source_id, \
+                self.__pts, copy_start, time.perf_counter())
+
+        # Return the frame image
+        return self.__image
+
+
+    # function is_materialized
+    # Description: Function that returns True if the frame image was already copied
+    # Parameter: self
+    # Return value: result
+    def is_materialized(self):
+        """ Returns materialized flag """
+
+        return self.__image is not None
@@ -0,0 +1,107 @@
+""" Detection Metadata Recorder """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import struct
+from common import constants
+from scripts.tracker import BBox
+#pylint: disable=wrong-import-position
+
+# File layout (little endian):
+#   File header:  magic (4s), version (H)
+#   Frame header: frame number (I), source id (H), buffer pts in ns (Q), object count (H)
+#   Object:       object id (Q), class id (H), left, top, width, height (4f)
+FILE_HEADER = struct.Struct('<4sH')
+FRAME_HEADER = struct.Struct('<IHQH')
+OBJECT_RECORD = struct.Struct('<QHffff')
+
+# class MetaRecorder
+# Description: Class that writes the per-frame detection metadata to a compact binary file
+# Parameter: path
+# Return value: None
+class MetaRecorder:
+    """ Detection metadata recorder """
+
+    # function __init__
+    # Description: Class constructor. Creates the file and writes the file header.
+    # Parameter: self, path
+    # Return value: None
+    def __init__(self, path):
+        """ Open recording file """
+
+        self.__file = open(path, 'wb')       #pylint: disable=consider-using-with
+        self.__file.write(FILE_HEADER.pack(constants.META_FILE_MAGIC, \
+            constants.META_FILE_VERSION))
+        self.__frame_cnt = 0                 # Recorded frame count
+
+
+    # function record
+    # Description: Function that writes the detection metadata of a frame
+    # Parameter: self, frame_number, source_id, pts, objects
+    #            (objects: list of (object id, class id, bounding box))
+    # Return value: None
+    def record(self, frame_number, source_id, pts, objects):
+        """ Record frame metadata """
+
+        data = [FRAME_HEADER.pack(frame_number, source_id, pts, len(objects))]
+        for object_id, class_id, bbox in objects:
+            data.append(OBJECT_RECORD.pack(object_id, class_id, \
+                bbox.left, bbox.top, bbox.width, bbox.height))
+
+        self.__file.write(b''.join(data))
+        self.__frame_cnt += 1
+
+
+    # function get_frame_count
+    # Description: Function that returns the recorded frame count
+    # Parameter: self
+    # Return value: __frame_cnt
+    def get_frame_count(self):
+        """ Returns recorded frame count """
+
+        return self.__frame_cnt
+
+
+    # function close
+    # Description: Function that flushes and closes the recording file
+    # Parameter: self
+    # Return value: None
+    def close(self):
+        """ Close recording file """
+
+        self.__file.close()
+
+
+# function read_meta
+# Description: Generator that reads the recorded detection metadata per frame
+# Parameter: path
+# Return value: (frame_number, source_id, pts, objects) per frame
+def read_meta(path):
+    """ Read recorded metadata """
+
+    with open(path, 'rb') as meta_file:
+
+        # Check file header
+        magic, version = FILE_HEADER.unpack(meta_file.read(FILE_HEADER.size))
+        if magic != constants.META_FILE_MAGIC or version != constants.META_FILE_VERSION:
+            raise ValueError(f"[{path}] is not a detection metadata file!")
+
+        while True:
+
+            header = meta_file.read(FRAME_HEADER.size)
+
+            # End of file
+            if len(header) < FRAME_HEADER.size:
+                break
+
+            frame_number, source_id, pts, obj_count = FRAME_HEADER.unpack(header)
+
+            objects = []
+            for values in OBJECT_RECORD.iter_unpack( \
+                meta_file.read(OBJECT_RECORD.size * obj_count)):
+
+                objects.append((values[0], values[1], BBox(*values[2:])))
+
+            yield frame_number, source_id, pts, objects
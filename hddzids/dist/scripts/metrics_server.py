@@ -0,0 +1,94 @@
+""" Metrics HTTP Server """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import http.server
+import socketserver
+import threading
+from common import constants
+from common.metrics import Metrics
+#pylint: disable=wrong-import-position
+
+# class MetricsHandler
+# Description: Class that serves the metrics on /metrics
+# Parameter: None
+# Return value: None
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """ Metrics request handler """
+
+    # function do_GET
+    # Description: Function that answers a GET request
+    # Parameter: self
+    # Return value: None
+    def do_GET(self):           #pylint: disable=invalid-name
+        """ GET request """
+
+        # Unknown path
+        if self.path.split('?')[0] != constants.METRICS_PATH:
+            self.send_error(404)
+            return
+
+        body = Metrics.get_instance().render().encode(constants.FILE_ENCODING)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    # function log_message
+    # Description: Function that suppresses the request log of every scrape
+    # Parameter: self, format, args
+    # Return value: None
+    def log_message(self, format, *args):     #pylint: disable=redefined-builtin
+        """ Request log """
+
+
+# class MetricsServer
+# Description: Class for the HTTP server of the metrics endpoint
+# Parameter: host, port
+# Return value: None
+class MetricsServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """ Metrics HTTP server """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, host, port
+    # Return value: None
+    def __init__(self, host=constants.METRICS_HOST, port=constants.METRICS_PORT):
+        """ Bind server """
+
+        super().__init__((host, port), MetricsHandler)
+
+        self.__thread = None         # Server thread
+
+
+    # function start
+    # Description: Function that starts serving in a background thread
+    # Parameter: self
+    # Return value: port
+    def start(self):
+        """ Start server """
+
+        self.__thread = threading.Thread(target=self.serve_forever, \
+            name=constants.C_NAME_METRICS_SERVER, daemon=True)
+        self.__thread.start()
+
+        return self.server_address[1]
+
+
+    # function stop
+    # Description: Function that stops serving
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop server """
+
+        self.shutdown()
+        self.server_close()
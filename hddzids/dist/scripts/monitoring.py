@@ -6,10 +6,39 @@
 # Add imports here
 import time
 from datetime import datetime
+import numpy as np
 from common import constants
 from common.common import Common
+from scripts.b_eye_transform import BirdsEyeTransform
+from scripts.zone_set import ZoneSet
+from scripts.zone_raster import ZoneRaster
 #pylint: disable=wrong-import-position
 
+# class ZoneRecord
+# Description: Class that holds the state of one tracked object in one danger zone
+# Parameter: track_id, zone_index, enter_time
+# Return value: None
+class ZoneRecord:
+    """ Danger zone state record """
+
+    __slots__ = ('track_id', 'zone_index', 'state', 'enter_time', 'dwell_time', \
+        'alert_trig_time')
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, track_id, zone_index, enter_time
+    # Return value: None
+    def __init__(self, track_id, zone_index, enter_time):
+        """ Set record details """
+
+        self.track_id = track_id                  # Object id
+        self.zone_index = zone_index              # Danger zone index in the calibration
+        self.state = constants.D_ZONE_STATE_ENTER # Danger zone state
+        self.enter_time = enter_time              # Time the object entered the danger zone
+        self.dwell_time = 0                       # Dwell time when the alert was triggered
+        self.alert_trig_time = ''                 # Alert time triggered
+
+
 # class Monitoring
 # Description: Class for danger zone monitoring
 # Parameter: None
@@ -17,194 +46,268 @@ from common.common import Common
 class Monitoring:
     """ Danger zone monitoring """
 
-    __monitoring = None                   # Monitoring class instance
+    __monitorings = {}                    # Monitoring class instance per source id
     __common = None                       # Common class instance
+    __source_id = 0                       # Source id
 
-    __trans_d_zone = None                 # Holds Transformed danger zone calibration
+    __trans_d_zones = None                # Holds Transformed danger zone polygons
+    __zone_set = None                     # Danger zone membership in Bird's Eye View:
+                                          #   ZoneRaster or ZoneSet
+    __calib_signature = None              # Calibration file signature of the cached transform
+    __d_zones = None                      # Danger zones of the cached transform:
+                                          #   [(name, dwell time limit, points), ...]
 
     # Monitoring details
-    __obj_ids = []                        # Monitoring ids
-    __dwell_time = []                     # Monitoring dwell time
-    __alert_flag = []                     # Monitoring alert flag
-    __alert_trig_time = []                # Alert time triggered
-
-    __has_new_alert = False
+    __records = None                      # State record per (object id, zone index)
+    __track_zones = None                  # Zone indexes with a record per object id
+    __alert_records = None                # Records in alert state per (object id, zone index),
+                                          # in trigger order
+    __new_alert_records = None            # Records that entered alert state since the last check
+    __alert_ids = None                    # Count of zones in alert state per object id
+    __proximities = None                  # Proximity tier per object id of the last run
 
     # function get_instance
-    # Description: Functon to return the class instance
-    # Parameter: None
-    # Return value: __monitoring
+    # Description: Functon to return the class instance of a source
+    # Parameter: source_id
+    # Return value: __monitorings[source_id]
     @staticmethod
-    def get_instance():
+    def get_instance(source_id=0):
         """ Static access method. """
 
         # Check if not yet initialized
-        if Monitoring.__monitoring is None:
+        if source_id not in Monitoring.__monitorings:
 
             # Call the class constructor
-            Monitoring()
+            Monitoring(source_id)
 
         # Return the class instance
-        return Monitoring.__monitoring
+        return Monitoring.__monitorings[source_id]
 
 
     # function __init__
     # Description: Class constructor
-    # Parameter: self
+    # Parameter: self, source_id
     # Return value: None
-    def __init__(self):
+    def __init__(self, source_id=0):
         """ Virtually private constructor. """
 
         # Check if not yet initialized
-        if Monitoring.__monitoring is None:
+        if source_id not in Monitoring.__monitorings:
 
-            Monitoring.__monitoring = self                      # Set Monitoring class instance
+            Monitoring.__monitorings[source_id] = self          # Set Monitoring class instance
             self.__common = Common.get_instance()               # Set Common class instance
+            self.__source_id = source_id                        # Set source id
+
+            self.__records = {}
+            self.__track_zones = {}
+            self.__alert_records = {}
+            self.__new_alert_records = []
+            self.__alert_ids = {}
+            self.__proximities = {}
+
+
+    # function has_any_alert
+    # Description: Function that returns True if any source has an existing alert
+    # Parameter: None
+    # Return value: result
+    @staticmethod
+    def has_any_alert():
+        """ Returns flag for alert existence of all sources """
+
+        return any(monitoring.has_alert() for monitoring in Monitoring.__monitorings.values())
+
+
+    # function has_any_warning
+    # Description: Function that returns True if an object of any source is approaching
+    #              or inside a danger zone
+    # Parameter: None
+    # Return value: result
+    @staticmethod
+    def has_any_warning():
+        """ Returns flag for warning existence of all sources """
+
+        return any(monitoring.has_warning() for monitoring in Monitoring.__monitorings.values())
 
 
     # function initialize_d_zone
     # Description: Function that initializes the danger zone transformation
-    # Parameter: self, b_eye_dim, b_eye_calib, d_zone_calib
+    # Parameter: self, b_eye_dim, b_eye_calib, d_zones ([(name, dwell time limit, points), ...])
     # Return value: None
-    def initialize_d_zone(self, b_eye_dim, b_eye_calib, d_zone_calib):
+    def initialize_d_zone(self, b_eye_dim, b_eye_calib, d_zones):
         """ Initializes danger zone transformation """
 
+        # Get the current calibration file signature
+        calib_signature = self.__common.get_calibration_signature( \
+            self.__common.get_calibration_path(self.__source_id))
+
         # Check if transformed danger zone is not yet initialized
-        if self.__trans_d_zone is None:
+        # or the calibration file has changed since it was cached
+        if self.__trans_d_zones is None or self.__calib_signature != calib_signature:
+
+            # Set calibration signature of the cached transform
+            self.__calib_signature = calib_signature
 
-            # Set transformed danger zone corner points
-            self.__set_trans_d_zone(b_eye_dim, b_eye_calib, d_zone_calib)
+            # Set transformed danger zone polygons
+            self.__set_trans_d_zones(b_eye_dim, b_eye_calib, d_zones)
 
 
-    # function __set_trans_d_zone
-    # Description: Function that transform the corner points of the danger zone calibration
-    # Parameter: self, b_eye_dim, b_eye_calib, d_zone_calib
+    # function reload_d_zone
+    # Description: Function that replaces the danger zone transformation with reloaded
+    #              calibrations. If the danger zones have changed, the dwell state of all
+    #              objects is reset: objects inside the new danger zones enter them again.
+    # Parameter: self, b_eye_dim, b_eye_calib, d_zones
     # Return value: None
-    def __set_trans_d_zone(self, b_eye_dim, b_eye_calib, d_zone_calib):
-        """ Set transformed danger zone """
+    def reload_d_zone(self, b_eye_dim, b_eye_calib, d_zones):
+        """ Reloads danger zone transformation """
+
+        # Set calibration signature of the reloaded transform
+        self.__calib_signature = self.__common.get_calibration_signature( \
+            self.__common.get_calibration_path(self.__source_id))
+
+        # Danger zones have changed
+        if list(d_zones) != self.__d_zones:
+
+            self.__records = {}
+            self.__track_zones = {}
+            self.__alert_records = {}
+            self.__new_alert_records = []
+            self.__alert_ids = {}
+            self.__proximities = {}
 
-        # Write details in the input file.
-        # This input file will be read by Bird's Eye Converter plugin when executed
-        self.__common.write_b_eye_input_file(b_eye_dim, b_eye_calib, \
-           [(d_zone_calib[0], d_zone_calib[1]), (d_zone_calib[2], d_zone_calib[3]), \
-            (d_zone_calib[4], d_zone_calib[5]), (d_zone_calib[6], d_zone_calib[7])])
+        # Set transformed danger zone polygons
+        self.__set_trans_d_zones(b_eye_dim, b_eye_calib, d_zones)
 
-        # Run the Bird's Eye Converter plugin
-        self.__common.run_b_eye_converter()
 
-        # Get the list of transformed centroid
-        trans_centroid_list = self.__common.read_b_eye_output_file()
+    # function __set_trans_d_zones
+    # Description: Function that transforms the danger zone polygons into Bird's Eye View
+    #              and builds their membership test
+    # Parameter: self, b_eye_dim, b_eye_calib, d_zones
+    # Return value: None
+    def __set_trans_d_zones(self, b_eye_dim, b_eye_calib, d_zones):
+        """ Set transformed danger zones """
 
-        self.__trans_d_zone = []        # Holds transformed danger zone corner points
+        self.__d_zones = list(d_zones)
 
-        # Read each transformed centroid
-        for centroid_x, centroid_y in trans_centroid_list:
+        # Transform danger zone polygons into Bird's Eye View
+        b_eye_transform = BirdsEyeTransform(b_eye_calib, b_eye_dim)
+        self.__trans_d_zones = [b_eye_transform.transform_corners(points) \
+            for _, _, points in d_zones]
 
-            # Set transformed danger zone corner points
-            self.__trans_d_zone.append(centroid_x)
-            self.__trans_d_zone.append(centroid_y)
+        # Membership is tested in Bird's Eye View: by raster lookup, or by polygon test
+        # if disabled or if there are more zones than raster bits
+        if constants.D_ZONE_RASTER and \
+            len(self.__trans_d_zones) <= constants.D_ZONE_RASTER_MAX_ZONES:
+            self.__zone_set = ZoneRaster.load(self.__trans_d_zones, b_eye_dim)
+        else:
+            self.__zone_set = ZoneSet(self.__trans_d_zones)
 
 
     # function run
-    # Description: Function that runs the monitoring process
-    # Parameter: self, track_id_list, trans_centroid_list
+    # Description: Function that runs the monitoring process.
+    #              The membership of all centroids in all danger zones and their distance
+    #              to the nearest zone are computed at once.
+    # Parameter: self, track_id_list, b_eye_centroid_list (Bird's Eye View centroids)
     # Return value: result
-    def run(self, track_id_list, trans_centroid_list):
+    def run(self, track_id_list, b_eye_centroid_list):
         """ Runs the monitoring process """
 
-        id_list_len = len(track_id_list)               # Get id count
-
-        # Write details in the input file.
-        # This input file will be read by Bird's Eye Converter plugin when executed
-        self.__common.write_b_eye_input_file(constants.D_ZONE_DIM, self.__trans_d_zone, \
-           trans_centroid_list)
+        membership = self.__zone_set.get_membership(b_eye_centroid_list)
+        distances = self.__zone_set.get_distances(b_eye_centroid_list)
 
-        # Run the Bird's Eye Converter plugin
-        self.__common.run_b_eye_converter()
+        # Set the proximity tier of each object
+        proximities = np.where(membership.any(axis=1), constants.PROXIMITY_INSIDE, \
+            np.where(distances <= constants.D_ZONE_APPROACH_DISTANCE, \
+            constants.PROXIMITY_APPROACHING, constants.PROXIMITY_NONE))
+        self.__proximities = dict(zip(track_id_list, proximities.tolist()))
 
-        # Get the list of transformed centroid
-        trans_dz_centroid_list = self.__common.read_b_eye_output_file()
+        # Get the (centroid index, zone index) pairs of the centroids inside a danger zone
+        point_indexes, zone_indexes = membership.nonzero()
+        inside_keys = {(track_id_list[point_index], zone_index) \
+            for point_index, zone_index in zip(point_indexes.tolist(), zone_indexes.tolist())}
 
-        try:
+        # Exit the danger zones: remove the records of the tracked objects now outside
+        for track_id in track_id_list:
+            for zone_index in list(self.__track_zones.get(track_id, ())):
+                if (track_id, zone_index) not in inside_keys:
+                    self.__exit(self.__records[(track_id, zone_index)])
 
-            # Check each index corresponds to id_list
-            for index in range(0, id_list_len, 1):
+        # Check each centroid inside a danger zone
+        for key in inside_keys:
 
-                # Check if the centroid is outside the danger zone
-                outside_flag = int(trans_dz_centroid_list[index][0]) <= 0 or \
-                    int(trans_dz_centroid_list[index][0]) >= 50 or \
-                    int(trans_dz_centroid_list[index][1]) <= 0 or \
-                    int(trans_dz_centroid_list[index][1]) >= 50
+            # Get existing record of the track id in the zone
+            record = self.__records.get(key)
 
-                # Check if track id has existing record
-                if track_id_list[index] in self.__obj_ids:
+            # Centroid is inside the danger zone. Track id has no record yet
+            if record is None:
 
-                    # Get monitoring index
-                    monitor_index = self.__get_id_index(track_id_list[index])
+                # Enter the danger zone: add new record
+                self.__records[key] = ZoneRecord(key[0], key[1], time.time())
+                self.__track_zones.setdefault(key[0], set()).add(key[1])
 
-                    # Centroid is outside the danger zone
-                    if outside_flag is True:
+            # Centroid stays inside the danger zone
+            else:
 
-                        # Remove existing record
-                        self.__remove_alert(monitor_index)
+                # Check dwell time
+                self.__dwell_time_check(record)
 
-                    # Centroid is insde the danger zone
-                    else:
 
-                        # Check dwell time
-                        self.__dwell_time_check(monitor_index)
-
-                # Track id has no record yet
-                else:
+    # function remove_tracks
+    # Description: Function that exits the danger zones of the objects no longer tracked
+    # Parameter: self, track_ids
+    # Return value: None
+    def remove_tracks(self, track_ids):
+        """ Removes the records of untracked objects """
 
-                    # If inside danger zone, add new record
-                    if not outside_flag:
+        for track_id in track_ids:
+            for zone_index in list(self.__track_zones.get(track_id, ())):
+                self.__exit(self.__records[(track_id, zone_index)])
 
-                        # add new item in danger zone monitoring
-                        self.__add_alert(track_id_list[index])
 
-        except IndexError:
+    # function clear_proximities
+    # Description: Function that clears the proximity tiers, when no object is monitored
+    # Parameter: self
+    # Return value: None
+    def clear_proximities(self):
+        """ Clears proximity tiers """
 
-            print("Transform error from Bird's Eye Converter output file...")
+        self.__proximities = {}
 
 
-    # function __get_id_index
-    # Description: Function that returns the monitoring index
+    # function get_proximity_by_id
+    # Description: Function that returns the proximity tier of the track id in the last run:
+    #              PROXIMITY_NONE, PROXIMITY_APPROACHING or PROXIMITY_INSIDE
     # Parameter: self, track_id
-    # Return value: result_index
-    def __get_id_index(self, track_id):
-        """ Returns the monitoring index """
-
-        ids_len = len(self.__obj_ids)      # id count
-
-        result_index = -1                  # Holds index as result
+    # Return value: proximity
+    def get_proximity_by_id(self, track_id):
+        """ Returns proximity tier """
 
-        # Check if id list is not empty
-        if ids_len != 0:
+        return self.__proximities.get(track_id, constants.PROXIMITY_NONE)
 
-            # Check each monitoring index
-            for index in range(0, ids_len, 1):
 
-                # Track id exists
-                if track_id == self.__obj_ids[index]:
-
-                    # Set index as result
-                    result_index = index
+    # function has_warning
+    # Description: Function that returns True if an object is approaching or inside
+    #              a danger zone
+    # Parameter: self
+    # Return value: result
+    def has_warning(self):
+        """ Returns flag for warning existence """
 
-                    # Exit loop
-                    break
+        return any(proximity != constants.PROXIMITY_NONE \
+            for proximity in self.__proximities.values())
 
-        # Return the monitoring index
-        return result_index
 
-    # function get_trans_d_zone
-    # Description: Function that returns the transformed danger zone corner points
+    # function get_trans_d_zones
+    # Description: Function that returns the transformed danger zone polygons
     # Parameter: self
-    # Return value: self.__trans_d_zone.copy()
-    def get_trans_d_zone(self):
-        """ Returns the transformed danger zone """
+    # Return value: [[x1, y1, x2, y2, ...], ...]
+    def get_trans_d_zones(self):
+        """ Returns the transformed danger zones """
+
+        # Danger zones are not yet initialized
+        if self.__trans_d_zones is None:
+            return []
 
-        return self.__trans_d_zone.copy()
+        return [list(points) for points in self.__trans_d_zones]
 
 
     # function has_alert
@@ -214,132 +317,113 @@ class Monitoring:
     def has_alert(self):
         """ Returns flag for alert existence """
 
-        result = False        # Holds the Has alert flag
-
-        # Check each alert flag
-        for flag in self.__alert_flag:
-
-            # Alert exists
-            if flag is True:
-
-                # Set result to True
-                result = True
+        return len(self.__alert_records) > 0
 
-                # Exit loop
-                break
 
-        # Return Has alert flag
-        return result
-
-
-    # function has_alert
-    # Description: Function that return True if the track id has alert, False if not
+    # function has_alert_by_id
+    # Description: Function that return True if the track id has alert in any danger zone,
+    #              False if not
     # Parameter: self, track_id
     # Return value: result
     def has_alert_by_id(self, track_id):
         """ Returns flag for alert existence """
 
-        result = False        # Holds the Has alert flag
-
-        # Get alert record index
-        index = self.__get_id_index(track_id)
+        return track_id in self.__alert_ids
 
-        # Check if record exists
-        if index >= 0:
 
-            # Set alert flag
-            result = self.__alert_flag[index]
+    # function get_record_count
+    # Description: Function that returns the number of objects inside the danger zones.
+    #              An object inside several danger zones is counted for each.
+    # Parameter: self
+    # Return value: record count
+    def get_record_count(self):
+        """ Returns the record count """
 
-        # Return alert flag
-        return result
+        return len(self.__records)
 
 
-    # function __add_alert
-    # Description: Function that adds new alert record
-    # Parameter: self, track_id
+    # function __exit
+    # Description: Function that removes the record of an object that left the danger zone
+    # Parameter: self, record
     # Return value: None
-    def __add_alert(self, track_id):
-        """ Adds new alert """
+    def __exit(self, record):
+        """ Exits the danger zone """
 
-        # Add new alert record
-        self.__obj_ids.append(track_id)
-        self.__dwell_time.append(time.time())
-        self.__alert_flag.append(False)
-        self.__alert_trig_time.append('')
+        # Set exit state
+        record.state = constants.D_ZONE_STATE_EXIT
 
+        # Remove record
+        key = (record.track_id, record.zone_index)
+        del self.__records[key]
 
-    # function remove_alert
-    # Description: Function that removes an alert record
-    # Parameter: self, index
-    # Return value: None
-    def __remove_alert(self, index):
-        """ Removes an alert record """
+        zone_indexes = self.__track_zones[record.track_id]
+        zone_indexes.discard(record.zone_index)
+        if not zone_indexes:
+            del self.__track_zones[record.track_id]
 
-        # Remove alert item
-        del self.__obj_ids[index]
-        del self.__dwell_time[index]
-        del self.__alert_flag[index]
-        del self.__alert_trig_time[index]
+        # Remove its alert
+        if self.__alert_records.pop(key, None) is not None:
+            self.__alert_ids[record.track_id] -= 1
+            if self.__alert_ids[record.track_id] == 0:
+                del self.__alert_ids[record.track_id]
 
 
     # function __dwell_time_check
     # Description: Function that checks the dwell time inside the danger zone
-    # Parameter: self, index
+    #              against the dwell time limit of the zone
+    # Parameter: self, record
     # Return value: None
-    def __dwell_time_check(self, index):
+    def __dwell_time_check(self, record):
         """ Checks dwell time inside the danger zone """
 
-        # Check dwell time
-        current_time = time.time()
-        time_passed = current_time - self.__dwell_time[index]
+        # Object stays after entering: start dwelling
+        if record.state == constants.D_ZONE_STATE_ENTER:
+            record.state = constants.D_ZONE_STATE_DWELL
 
-        # Check if dwell time reached time limit
-        if self.__alert_flag[index] is False and \
-            constants.D_ZONE_DTIME_LIMIT <= time_passed:
-
-            # Set dwell time
-            self.__dwell_time[index] = time_passed
+        # Check dwell time
+        if record.state == constants.D_ZONE_STATE_DWELL:
 
-            # Set alert flag to True
-            self.__alert_flag[index] = True
+            time_passed = time.time() - record.enter_time
 
-            # Set alert trigger time
-            dtime = datetime.now()
-            self.__alert_trig_time[index] = dtime.strftime("%Y-%m-%d %H:%M:%S")
+            # Dwell time limit of the zone. None: default limit
+            dwell_limit = self.__d_zones[record.zone_index][1]
+            if dwell_limit is None:
+                dwell_limit = constants.D_ZONE_DTIME_LIMIT
 
-            # Activate flag for new alert
-            self.__has_new_alert = True
+            # Check if dwell time reached time limit
+            if dwell_limit <= time_passed:
 
+                # Set dwell time
+                record.dwell_time = time_passed
 
-    # function get_alerts
-    # Description: Function that returns all alert item
-    # Parameter: self
-    # Return value: alert_list
-    def get_alerts(self):
-        """ Return alerts """
+                # Set alert state
+                record.state = constants.D_ZONE_STATE_ALERT
+                self.__alert_records[(record.track_id, record.zone_index)] = record
+                self.__alert_ids[record.track_id] = self.__alert_ids.get(record.track_id, 0) + 1
 
-        alerts = []         # Holds alert items
+                # Set alert trigger time
+                dtime = datetime.now()
+                record.alert_trig_time = dtime.strftime("%Y-%m-%d %H:%M:%S")
 
-        # If new alert exists
-        if self.__has_new_alert is True:
+                # Add new alert
+                self.__new_alert_records.append(record)
 
-            # Disable new alert flag
-            self.__has_new_alert = False
 
-            # Get index count
-            len_ids = len(self.__obj_ids)
-
-            # Check each index
-            for index in range(0, len_ids, 1):
+    # function get_new_alerts
+    # Description: Function that returns the alert items triggered since the last check,
+    #              in trigger order. Alerts of objects that already left are skipped.
+    # Parameter: self
+    # Return value: alert_list
+    def get_new_alerts(self):
+        """ Return new alerts """
 
-                # Check if alert is activated
-                if self.__alert_flag[index]:
+        # Add alert details: Object id, Dwell time, Alert flag, Alert time, Zone name
+        alerts = [(record.track_id, record.dwell_time, True, record.alert_trig_time, \
+            self.__d_zones[record.zone_index][0]) for record in self.__new_alert_records \
+            if (record.track_id, record.zone_index) in self.__alert_records]
 
-                    # Add alert details
-                    alerts.append((self.__obj_ids[index], \
-                        self.__dwell_time[index], \
-                        self.__alert_flag[index], \
-                        self.__alert_trig_time[index]))
+        # Clear new alerts
+        self.__new_alert_records = []
 
-        # Return alerts
+        # Return new alerts
         return alerts
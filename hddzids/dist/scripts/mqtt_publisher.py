@@ -0,0 +1,419 @@
+""" MQTT Publisher """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import socket
+import time
+import threading
+import paho.mqtt.client as mqtt
+from common import constants
+from common.common import Common
+from common.metrics import Metrics
+from scripts.outbound_queue import OutboundQueue
+from scripts.frame_tracer import FrameTracer
+#pylint: disable=wrong-import-position
+
+# class MqttPublisher
+# Description: Class that holds one long-lived MQTT connection to the mobile host.
+#              Messages are queued and published from a background thread,
+#              so publishing never blocks the caller.
+# Parameter: None
+# Return value: None
+class MqttPublisher:
+    """ Persistent MQTT publisher """
+
+    __mqtt_publisher = None     # MqttPublisher class instance
+    __common = None             # Common class instance
+    __metrics = None            # Metrics class instance
+    __tracer = None             # FrameTracer class instance
+
+    __client = None             # MQTT client
+    __queue = None              # Outbound priority message queue
+    __condition = None          # Queue condition
+    __connected = None          # Connected event
+    __sender = None             # Sender thread
+    __running = False           # Sender thread running flag
+    __subscriptions = None      # Message callback per subscribed topic filter
+    __acks = None               # Sent callback per message id waiting for acknowledgement
+    __acks_lock = None          # Sent callback lock
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __mqtt_publisher
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if MqttPublisher.__mqtt_publisher is None:
+
+            # Call the class constructor
+            MqttPublisher()
+
+        # Return the class instance
+        return MqttPublisher.__mqtt_publisher
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if MqttPublisher.__mqtt_publisher is None:
+
+            MqttPublisher.__mqtt_publisher = self         # Initialize MqttPublisher class instance
+            self.__common = Common.get_instance()         # Initialize Common class instance
+            self.__metrics = Metrics.get_instance()       # Initialize Metrics class instance
+            self.__tracer = FrameTracer.get_instance()    # Initialize FrameTracer class instance
+            self.name = constants.C_NAME_MQTT_PUBLISHER   # Set class name
+
+            self.__queue = OutboundQueue()
+            self.__condition = threading.Condition()
+            self.__connected = threading.Event()
+            self.__subscriptions = {}
+            self.__acks = {}
+            self.__acks_lock = threading.Lock()
+
+
+    # function start
+    # Description: Function that starts the network loop and the sender thread
+    # Parameter: self, host, port
+    # Return value: result
+    def start(self, host=constants.MOBILE_HOST, port=constants.MOBILE_PORT):
+        """ Start the publisher """
+
+        # Already started
+        if self.__running:
+            return constants.RETURN_OK
+
+        # Create client with automatic reconnect
+        self.__client = mqtt.Client()
+        self.__client.on_connect = self.__on_connect
+        self.__client.on_disconnect = self.__on_disconnect
+        self.__client.on_message = self.__on_message
+        self.__client.on_publish = self.__on_publish
+        self.__client.reconnect_delay_set(constants.MQTT_RECONNECT_MIN, \
+            constants.MQTT_RECONNECT_MAX)
+
+        try:
+
+            # Connect in the background network loop
+            self.__client.connect_async(host, port, constants.MQTT_KEEPALIVE)
+            self.__client.loop_start()
+
+        # This error occurred when the IP string is not valid
+        except socket.gaierror:
+
+            self.__common.post_message(self.name, "[socket.gaierror] Invalid MQTT host!")
+            result = constants.RETURN_NG
+
+        # This error occurred when:
+        # - The Host is set with integer
+        # - The Port is set with string
+        except (TypeError, ValueError):
+
+            self.__common.post_message(self.name, \
+                "[TypeError] Host IP should be in string form. Port should be in int form.")
+            result = constants.RETURN_NG
+
+        else:
+
+            # Start sender thread
+            self.__running = True
+            self.__sender = threading.Thread(target=self.__send_loop, \
+                name=self.name, daemon=True)
+            self.__sender.start()
+
+            result = constants.RETURN_OK
+
+        # Return process result
+        return result
+
+
+    # function stop
+    # Description: Function that stops the sender thread and disconnects the client
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop the publisher """
+
+        # Not started
+        if not self.__running:
+            return
+
+        # Stop sender thread
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+        self.__connected.set()
+        self.__sender.join()
+
+        # Stop network loop and disconnect
+        self.__client.disconnect()
+        self.__client.loop_stop()
+        self.__connected.clear()
+
+
+    # function is_connected
+    # Description: Function that returns True if connected to the MQTT service
+    # Parameter: self
+    # Return value: self.__connected.is_set()
+    def is_connected(self):
+        """ Returns the connection status """
+
+        return self.__connected.is_set()
+
+
+    # function publish
+    # Description: Function that queues a message. Does not block.
+    #              When replace is True, a queued message of the same topic is
+    #              replaced instead of queueing another one.
+    # Parameter: self, topic, payload, qos, replace, priority, ttl, on_sent, trace
+    #            (priority: smaller value is sent first, ttl: seconds until the message
+    #             is dropped if not yet sent. None: no limit, on_sent: called in the
+    #             sender or network loop thread once the message is written (QoS 0)
+    #             or acknowledged by the broker (QoS 1 and 2). Not called if dropped,
+    #             trace: (source id, pts) of the frame the message was made from)
+    # Return value: result
+    def publish(self, topic, payload, qos=0, replace=False, \
+        priority=constants.MQTT_PRIORITY_HOST_UPDATE, ttl=None, on_sent=None, trace=None):
+        """ Queue message for publishing """
+
+        # Start on first use
+        if not self.__running and self.start() != constants.RETURN_OK:
+            return constants.RETURN_NG
+
+        deadline = time.monotonic() + ttl if ttl is not None else None
+
+        with self.__condition:
+
+            dropped = self.__queue.put(topic, payload, qos, priority, deadline, replace, \
+                on_sent, trace)
+            self.__metrics.set(constants.METRIC_MQTT_QUEUE_DEPTH, len(self.__queue))
+            self.__condition.notify()
+
+        # Queue is full
+        if dropped is not None:
+            self.__metrics.inc(constants.METRIC_MQTT_DROPPED)
+            self.__common.post_message(self.name, \
+                f"Queue is full. Message dropped: [TOPIC:{dropped.topic}].")
+
+        # Return process result
+        return constants.RETURN_OK
+
+
+    # function subscribe
+    # Description: Function that subscribes to a topic filter. The subscription is renewed
+    #              on every reconnection. The callback runs in the network loop thread,
+    #              so it must not block.
+    # Parameter: self, topic, callback (called with topic and payload), qos
+    # Return value: None
+    def subscribe(self, topic, callback, qos=0):
+        """ Subscribe to topic """
+
+        self.__subscriptions[topic] = (callback, qos)
+
+        # Already connected. Otherwise subscribed on connection
+        if self.__connected.is_set():
+            self.__client.subscribe(topic, qos)
+
+
+    # function get_queue_size
+    # Description: Function that returns the number of queued messages
+    # Parameter: self
+    # Return value: queue size
+    def get_queue_size(self):
+        """ Returns the queue size """
+
+        return len(self.__queue)
+
+
+    # function get_dropped_count
+    # Description: Function that returns the number of dropped messages
+    # Parameter: self
+    # Return value: dropped count
+    def get_dropped_count(self):
+        """ Returns the dropped count """
+
+        return self.__queue.get_dropped_count()
+
+
+    # function __send_loop
+    # Description: Function that publishes queued messages while connected.
+    #              Up to MQTT_DRAIN_BATCH messages are sent per cycle.
+    # Parameter: self
+    # Return value: None
+    def __send_loop(self):
+        """ Sender thread """
+
+        while self.__running:
+
+            # Wait for the connection
+            if not self.__connected.wait(constants.MQTT_KEEPALIVE):
+                continue
+
+            # Wait for ready messages
+            with self.__condition:
+
+                while self.__running:
+
+                    now = time.monotonic()
+                    wait_time = self.__queue.get_wait_time(now)
+
+                    if wait_time == 0.0:
+                        break
+
+                    self.__condition.wait(wait_time)
+
+                if not self.__running:
+                    break
+
+                messages, expired = self.__queue.get_ready(time.monotonic(), \
+                    constants.MQTT_DRAIN_BATCH)
+                self.__metrics.set(constants.METRIC_MQTT_QUEUE_DEPTH, len(self.__queue))
+
+            for message in expired:
+                self.__metrics.inc(constants.METRIC_MQTT_DROPPED)
+                self.__common.post_message(self.name, \
+                    f"Message expired: [TOPIC:{message.topic}].")
+
+            for index, message in enumerate(messages):
+
+                # Disconnected. Put back the messages not yet sent
+                if not self.__connected.is_set():
+
+                    with self.__condition:
+                        for unsent in messages[index:]:
+                            self.__queue.requeue(unsent)
+                    break
+
+                # Publish message
+                info = self.__client.publish(message.topic, message.payload, message.qos)
+
+                # Publish failed. Retry after the backoff of the message
+                if info.rc != mqtt.MQTT_ERR_SUCCESS:
+
+                    self.__metrics.inc(constants.METRIC_MQTT_FAILURES)
+
+                    with self.__condition:
+                        retried = self.__queue.retry(message, time.monotonic())
+
+                    # Retries exhausted. A message superseded by a newer one is not dropped
+                    if retried == constants.RETRY_DROPPED:
+                        self.__metrics.inc(constants.METRIC_MQTT_DROPPED)
+                        self.__common.post_message(self.name, \
+                            f"Message dropped after retries: [TOPIC:{message.topic}].")
+
+                else:
+
+                    publish_end = time.perf_counter()
+                    self.__metrics.observe(constants.METRIC_MQTT_PUBLISH_SECONDS, \
+                        publish_end - message.put_time)
+
+                    if message.trace is not None:
+                        self.__tracer.add(constants.STAGE_MQTT_PUBLISH, message.trace[0], \
+                            message.trace[1], message.put_time, publish_end)
+
+                    if message.on_sent is not None:
+                        self.__set_sent(message, info)
+
+
+    # function __set_sent
+    # Description: Function that calls the sent callback of a published message.
+    #              With QoS 1 and 2, the callback waits for the broker acknowledgement.
+    # Parameter: self, message, info
+    # Return value: None
+    def __set_sent(self, message, info):
+        """ Sent callback """
+
+        if message.qos > 0:
+
+            with self.__acks_lock:
+                self.__acks[info.mid] = message.on_sent
+
+            # Acknowledged before the callback was set
+            if not info.is_published():
+                return
+
+            with self.__acks_lock:
+                if self.__acks.pop(info.mid, None) is None:
+                    return
+
+        message.on_sent()
+
+
+    # function __on_connect
+    # Description: Callback when connected to the MQTT service
+    # Parameter: self, client, userdata, flags, rc
+    # Return value: None
+    def __on_connect(self, _client, _userdata, _flags, rc):
+        """ Connected callback """
+
+        # Connection accepted
+        if rc == mqtt.CONNACK_ACCEPTED:
+
+            self.__connected.set()
+            self.__common.post_message(self.name, "Connected to MQTT service.")
+
+            # Renew subscriptions
+            for topic, (_, qos) in list(self.__subscriptions.items()):
+                self.__client.subscribe(topic, qos)
+
+        else:
+
+            self.__common.post_message(self.name, \
+                f"Unable to connect to MQTT service! [{mqtt.connack_string(rc)}]")
+
+
+    # function __on_disconnect
+    # Description: Callback when disconnected from the MQTT service.
+    #              The network loop reconnects automatically.
+    # Parameter: self, client, userdata, rc
+    # Return value: None
+    def __on_disconnect(self, _client, _userdata, rc):
+        """ Disconnected callback """
+
+        self.__connected.clear()
+
+        # Unexpected disconnection
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            self.__common.post_message(self.name, "Disconnected from MQTT service. Reconnecting...")
+
+
+    # function __on_publish
+    # Description: Callback when a message is written (QoS 0) or acknowledged (QoS 1 and 2)
+    # Parameter: self, client, userdata, mid
+    # Return value: None
+    def __on_publish(self, _client, _userdata, mid):
+        """ Published callback """
+
+        with self.__acks_lock:
+            on_sent = self.__acks.pop(mid, None)
+
+        if on_sent is not None:
+            on_sent()
+
+
+    # function __on_message
+    # Description: Callback when a message of a subscribed topic is received
+    # Parameter: self, client, userdata, message
+    # Return value: None
+    def __on_message(self, _client, _userdata, message):
+        """ Message received callback """
+
+        for topic, (callback, _) in list(self.__subscriptions.items()):
+
+            if mqtt.topic_matches_sub(topic, message.topic):
+
+                try:
+                    callback(message.topic, message.payload)
+
+                # Keep the network loop alive on any callback error
+                except Exception as error:      #pylint: disable=broad-except
+                    self.__common.post_message(self.name, f"Message callback error! [{error}]")
@@ -0,0 +1,256 @@
+""" Outbound Message Queue """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import heapq
+import time
+import itertools
+from common import constants
+#pylint: disable=wrong-import-position
+
+# class OutboundMessage
+# Description: Class that holds one queued message and its retry state
+# Parameter: topic, payload, qos, priority, seq, deadline, replace, on_sent, trace
+# Return value: None
+class OutboundMessage:
+    """ Queued message """
+
+    __slots__ = ('topic', 'payload', 'qos', 'priority', 'seq', 'deadline', 'replace', \
+        'on_sent', 'trace', 'put_time', 'attempts', 'next_time', 'queued')
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, topic, payload, qos, priority, seq, deadline, replace, on_sent, trace
+    # Return value: None
+    def __init__(self, topic, payload, qos, priority, seq, deadline, replace, on_sent=None, \
+        trace=None):
+        """ Set message """
+
+        self.topic = topic              # Message topic
+        self.payload = payload          # Message payload
+        self.qos = qos                  # Message QoS
+        self.priority = priority        # Priority: smaller value is sent first
+        self.seq = seq                  # Queue order within the same priority
+        self.deadline = deadline        # Dropped if not sent by this time (None: no deadline)
+        self.replace = replace          # Replaced by a newer message of the same topic
+        self.on_sent = on_sent          # Called once the message is sent (None: no callback)
+        self.trace = trace              # (source id, pts) of the frame for the trace
+        self.put_time = time.perf_counter()  # Time queued
+        self.attempts = 0               # Failed publish attempts
+        self.next_time = 0.0            # Earliest time of the next attempt
+        self.queued = True              # False once sent or dropped
+
+
+# class OutboundQueue
+# Description: Class for a bounded priority queue of outbound messages.
+#              Messages are taken by priority, then in queue order. A failed message
+#              waits with exponential backoff without blocking the messages behind it.
+#              Not thread-safe: the caller holds its own lock.
+# Parameter: max_size
+# Return value: None
+class OutboundQueue:
+    """ Priority outbound queue with backoff """
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, max_size
+    # Return value: None
+    def __init__(self, max_size=constants.MQTT_QUEUE_SIZE):
+        """ Set initial state """
+
+        self.__max_size = max_size      # Queue size limit (messages)
+        self.__ready = []               # Ready messages: heap of (priority, seq, message)
+        self.__delayed = []             # Messages in backoff: heap of (next time, seq, message)
+        self.__latest = {}              # Queued replaceable message per topic
+        self.__seq = itertools.count()  # Queue order
+        self.__size = 0                 # Queued message count
+        self.__dropped_cnt = 0          # Dropped message count: queue full, expired or retries
+
+
+    # function __len__
+    # Description: Function that returns the queued message count
+    # Parameter: self
+    # Return value: __size
+    def __len__(self):
+        """ Returns the queued message count """
+
+        return self.__size
+
+
+    # function put
+    # Description: Function that queues a message. When replace is True, a queued message
+    #              of the same topic is replaced. When the queue is full, the oldest message
+    #              with the lowest priority is dropped.
+    # Parameter: self, topic, payload, qos, priority, deadline, replace, on_sent, trace
+    # Return value: dropped message or None
+    def put(self, topic, payload, qos, priority, deadline=None, replace=False, on_sent=None, \
+        trace=None):
+        """ Queue message """
+
+        # Replace the queued message of the same topic
+        if replace:
+            message = self.__latest.get(topic)
+            if message is not None and message.queued:
+                message.payload = payload
+                message.qos = qos
+                message.deadline = deadline
+                message.trace = trace
+                message.put_time = time.perf_counter()
+                return None
+
+        message = OutboundMessage(topic, payload, qos, priority, next(self.__seq), \
+            deadline, replace, on_sent, trace)
+        heapq.heappush(self.__ready, (priority, message.seq, message))
+        self.__size += 1
+        if replace:
+            self.__latest[topic] = message
+
+        # Queue is full
+        dropped = None
+        if self.__size > self.__max_size:
+            dropped = self.__drop_lowest()
+
+        return dropped
+
+
+    # function get_ready
+    # Description: Function that takes up to limit messages ready to be sent.
+    #              Expired messages are dropped.
+    # Parameter: self, now, limit
+    # Return value: messages, expired messages
+    def get_ready(self, now, limit):
+        """ Take ready messages """
+
+        # Move messages whose backoff has passed
+        while self.__delayed and self.__delayed[0][0] <= now:
+            _, seq, message = heapq.heappop(self.__delayed)
+            if message.queued:
+                heapq.heappush(self.__ready, (message.priority, seq, message))
+
+        messages = []
+        expired = []
+        while self.__ready and len(messages) < limit:
+
+            _, _, message = heapq.heappop(self.__ready)
+
+            # Already dropped
+            if not message.queued:
+                continue
+
+            self.__remove(message)
+
+            # Deadline passed
+            if message.deadline is not None and message.deadline < now:
+                self.__dropped_cnt += 1
+                expired.append(message)
+
+            else:
+                messages.append(message)
+
+        return messages, expired
+
+
+    # function retry
+    # Description: Function that queues a failed message again after its backoff.
+    #              The message is dropped when the retries or its deadline are exhausted.
+    #              A replaceable message already replaced by a newer one is not retried,
+    #              and is not counted as dropped.
+    # Parameter: self, message, now
+    # Return value: RETRY_QUEUED, RETRY_DROPPED or RETRY_SUPERSEDED
+    def retry(self, message, now):
+        """ Retry failed message """
+
+        # A newer message already replaced this one
+        if message.replace and message.topic in self.__latest:
+            return constants.RETRY_SUPERSEDED
+
+        message.attempts += 1
+        message.next_time = now + min(constants.MQTT_BACKOFF_MIN * \
+            (2 ** (message.attempts - 1)), constants.MQTT_BACKOFF_MAX)
+
+        # Retries exhausted or the deadline passes before the next attempt
+        if message.attempts > constants.MQTT_MAX_RETRY or \
+            (message.deadline is not None and message.deadline < message.next_time):
+
+            self.__dropped_cnt += 1
+            return constants.RETRY_DROPPED
+
+        message.queued = True
+        heapq.heappush(self.__delayed, (message.next_time, message.seq, message))
+        self.__size += 1
+        if message.replace:
+            self.__latest[message.topic] = message
+
+        return constants.RETRY_QUEUED
+
+
+    # function requeue
+    # Description: Function that puts a taken message back without counting an attempt
+    # Parameter: self, message
+    # Return value: None
+    def requeue(self, message):
+        """ Requeue message """
+
+        message.queued = True
+        heapq.heappush(self.__ready, (message.priority, message.seq, message))
+        self.__size += 1
+        if message.replace:
+            self.__latest.setdefault(message.topic, message)
+
+
+    # function get_wait_time
+    # Description: Function that returns the time until a message is ready
+    # Parameter: self, now
+    # Return value: seconds, 0 if a message is ready, None if the queue is empty
+    def get_wait_time(self, now):
+        """ Returns the wait time """
+
+        if any(message.queued for _, _, message in self.__ready):
+            return 0.0
+
+        for next_time, _, message in sorted(self.__delayed):
+            if message.queued:
+                return max(next_time - now, 0.0)
+
+        return None
+
+
+    # function get_dropped_count
+    # Description: Function that returns the dropped message count
+    # Parameter: self
+    # Return value: __dropped_cnt
+    def get_dropped_count(self):
+        """ Returns the dropped count """
+
+        return self.__dropped_cnt
+
+
+    # function __remove
+    # Description: Function that marks a message as no longer queued
+    # Parameter: self, message
+    # Return value: None
+    def __remove(self, message):
+        """ Remove message """
+
+        message.queued = False
+        self.__size -= 1
+        if self.__latest.get(message.topic) is message:
+            del self.__latest[message.topic]
+
+
+    # function __drop_lowest
+    # Description: Function that drops the oldest queued message with the lowest priority
+    # Parameter: self
+    # Return value: dropped message
+    def __drop_lowest(self):
+        """ Drop lowest priority message """
+
+        dropped = max((message for _, _, message in self.__ready + self.__delayed \
+            if message.queued), key=lambda message: (message.priority, -message.seq))
+
+        self.__remove(dropped)
+        self.__dropped_cnt += 1
+
+        return dropped
@@ -0,0 +1,105 @@
+""" Stage Times """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import threading
+from common import constants
+from common.metrics import Metrics
+#pylint: disable=wrong-import-position
+
+# class StageTimes
+# Description: Class that accumulates the processing time per stage.
+#              Stages are timed from the streaming thread and the host worker threads.
+# Parameter: None
+# Return value: None
+class StageTimes:
+    """ Processing time per stage """
+
+    __stage_times = None        # StageTimes class instance
+
+    __metrics = None            # Metrics class instance
+    __lock = None               # Stage time lock
+    __times = None              # [count, total seconds, max seconds] per stage
+
+    # function get_instance
+    # Description: Functon to return the class instance
+    # Parameter: None
+    # Return value: __stage_times
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+
+        # Check if not yet initialized
+        if StageTimes.__stage_times is None:
+
+            # Call the class constructor
+            StageTimes()
+
+        # Return the class instance
+        return StageTimes.__stage_times
+
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Virtually private constructor. """
+
+        # Check if not yet initialized
+        if StageTimes.__stage_times is None:
+
+            StageTimes.__stage_times = self     # Initialize StageTimes class instance
+            self.__metrics = Metrics.get_instance() # Initialize Metrics class instance
+
+            self.__lock = threading.Lock()
+            self.__times = {}
+
+
+    # function add
+    # Description: Function that adds the processing time of a stage.
+    #              The time is also observed in the stage time histogram.
+    # Parameter: self, stage, seconds
+    # Return value: None
+    def add(self, stage, seconds):
+        """ Add stage time """
+
+        self.__metrics.observe(constants.METRIC_STAGE_SECONDS, seconds, {"stage": stage})
+
+        with self.__lock:
+
+            stage_time = self.__times.get(stage)
+
+            # First time of the stage
+            if stage_time is None:
+                self.__times[stage] = [1, seconds, seconds]
+
+            else:
+                stage_time[0] += 1
+                stage_time[1] += seconds
+                if seconds > stage_time[2]:
+                    stage_time[2] = seconds
+
+
+    # function get
+    # Description: Function that returns the accumulated times
+    # Parameter: self
+    # Return value: {stage: (count, total seconds, max seconds)}
+    def get(self):
+        """ Returns stage times """
+
+        with self.__lock:
+            return {stage: tuple(stage_time) for stage, stage_time in self.__times.items()}
+
+
+    # function reset
+    # Description: Function that clears the accumulated times
+    # Parameter: self
+    # Return value: None
+    def reset(self):
+        """ Reset stage times """
+
+        with self.__lock:
+            self.__times.clear()
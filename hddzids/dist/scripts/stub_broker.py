@@ -0,0 +1,250 @@
+""" Stub MQTT Broker """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import socketserver
+import threading
+#pylint: disable=wrong-import-position
+
+# MQTT control packet types
+CONNECT = 1
+PUBLISH = 3
+PUBREL = 6
+SUBSCRIBE = 8
+PINGREQ = 12
+DISCONNECT = 14
+
+CONNACK_ACCEPTED = b'\x20\x02\x00\x00'
+PINGRESP = b'\xd0\x00'
+
+# class StubBrokerHandler
+# Description: Class that serves one MQTT client connection.
+#              Published messages are counted and discarded.
+# Parameter: None
+# Return value: None
+class StubBrokerHandler(socketserver.BaseRequestHandler):
+    """ Stub broker connection """
+
+    # function handle
+    # Description: Function that reads and answers the control packets of the client
+    # Parameter: self
+    # Return value: None
+    def handle(self):
+        """ Serve client """
+
+        while True:
+
+            packet = self.__read_packet()
+
+            # Connection closed by the client
+            if packet is None:
+                break
+
+            packet_type, flags, body = packet
+
+            if packet_type == CONNECT:
+                self.request.sendall(CONNACK_ACCEPTED)
+
+            elif packet_type == PUBLISH:
+                self.__on_publish(flags, body)
+
+            elif packet_type == PUBREL:
+                # PUBCOMP
+                self.request.sendall(b'\x70\x02' + body[:2])
+
+            elif packet_type == SUBSCRIBE:
+                # SUBACK: packet id and QoS 0 granted for each topic filter
+                self.request.sendall(self.__encode(0x90, body[:2] + \
+                    bytes(self.__count_topic_filters(body[2:]))))
+
+            elif packet_type == PINGREQ:
+                self.request.sendall(PINGRESP)
+
+            elif packet_type == DISCONNECT:
+                break
+
+
+    # function __on_publish
+    # Description: Function that counts the published message and acknowledges it
+    # Parameter: self, flags, body
+    # Return value: None
+    def __on_publish(self, flags, body):
+        """ Published message """
+
+        qos = (flags >> 1) & 0x03
+        topic_len = int.from_bytes(body[:2], 'big')
+        topic = body[2:2 + topic_len].decode('utf-8')
+        payload_start = 2 + topic_len + (2 if qos > 0 else 0)
+
+        self.server.add_message(topic, len(body) - payload_start)
+
+        # PUBACK
+        if qos == 1:
+            self.request.sendall(b'\x40\x02' + body[2 + topic_len:payload_start])
+
+        # PUBREC
+        elif qos == 2:
+            self.request.sendall(b'\x50\x02' + body[2 + topic_len:payload_start])
+
+
+    # function __read_packet
+    # Description: Function that reads one control packet
+    # Parameter: self
+    # Return value: (packet type, flags, body) or None if the connection is closed
+    def __read_packet(self):
+        """ Read control packet """
+
+        header = self.__read_exact(1)
+        if header is None:
+            return None
+
+        # Remaining length: variable byte integer
+        remaining_len = 0
+        multiplier = 1
+        while True:
+            length_byte = self.__read_exact(1)
+            if length_byte is None:
+                return None
+            remaining_len += (length_byte[0] & 0x7f) * multiplier
+            if not length_byte[0] & 0x80:
+                break
+            multiplier *= 128
+
+        body = self.__read_exact(remaining_len)
+        if body is None:
+            return None
+
+        return header[0] >> 4, header[0] & 0x0f, body
+
+
+    # function __read_exact
+    # Description: Function that reads the given number of bytes
+    # Parameter: self, size
+    # Return value: data or None if the connection is closed
+    def __read_exact(self, size):
+        """ Read bytes """
+
+        data = b''
+        while len(data) < size:
+            try:
+                chunk = self.request.recv(size - len(data))
+            except OSError:
+                return None
+            if not chunk:
+                return None
+            data += chunk
+
+        return data
+
+
+    # function __encode
+    # Description: Function that encodes a control packet
+    # Parameter: cls, header, body
+    # Return value: packet
+    @classmethod
+    def __encode(cls, header, body):
+        """ Encode control packet """
+
+        length = len(body)
+        encoded_len = bytearray()
+        while True:
+            length_byte = length % 128
+            length //= 128
+            encoded_len.append(length_byte | (0x80 if length > 0 else 0))
+            if length == 0:
+                break
+
+        return bytes([header]) + bytes(encoded_len) + body
+
+
+    # function __count_topic_filters
+    # Description: Function that counts the topic filters of a SUBSCRIBE payload
+    # Parameter: cls, payload
+    # Return value: count
+    @classmethod
+    def __count_topic_filters(cls, payload):
+        """ Count topic filters """
+
+        count = 0
+        index = 0
+        while index < len(payload):
+            index += 2 + int.from_bytes(payload[index:index + 2], 'big') + 1
+            count += 1
+
+        return count
+
+
+# class StubBroker
+# Description: Class for a local MQTT broker that accepts and counts published messages.
+#              Used in place of the mobile host for replay and benchmarking.
+# Parameter: host, port (0: any free port)
+# Return value: None
+class StubBroker(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """ Stub MQTT broker """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, host, port
+    # Return value: None
+    def __init__(self, host='127.0.0.1', port=0):
+        """ Bind broker """
+
+        super().__init__((host, port), StubBrokerHandler)
+
+        self.__lock = threading.Lock()
+        self.__messages = {}         # [message count, payload bytes] per topic
+        self.__thread = None         # Server thread
+
+
+    # function start
+    # Description: Function that starts serving in a background thread
+    # Parameter: self
+    # Return value: port
+    def start(self):
+        """ Start broker """
+
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+
+        return self.server_address[1]
+
+
+    # function stop
+    # Description: Function that stops serving
+    # Parameter: self
+    # Return value: None
+    def stop(self):
+        """ Stop broker """
+
+        self.shutdown()
+        self.server_close()
+
+
+    # function add_message
+    # Description: Function that counts a published message
+    # Parameter: self, topic, payload_len
+    # Return value: None
+    def add_message(self, topic, payload_len):
+        """ Count message """
+
+        with self.__lock:
+
+            message = self.__messages.setdefault(topic, [0, 0])
+            message[0] += 1
+            message[1] += payload_len
+
+
+    # function get_messages
+    # Description: Function that returns the received message counts
+    # Parameter: self
+    # Return value: {topic: (message count, payload bytes)}
+    def get_messages(self):
+        """ Returns message counts """
+
+        with self.__lock:
+            return {topic: tuple(message) for topic, message in self.__messages.items()}
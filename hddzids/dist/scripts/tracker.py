@@ -4,9 +4,36 @@
 # Add license here
 
 # Add imports here
+from collections import namedtuple, OrderedDict
 from common import constants
 #pylint: disable=wrong-import-position
 
+# Bounding box copied from the object metadata.
+# The metadata is released with the buffer, so it must not be kept outside the pad probe.
+BBox = namedtuple('BBox', ['left', 'top', 'width', 'height'])
+
+# class TrackRecord
+# Description: Class that holds the details of one tracked object
+# Parameter: track_id, bbox, centroid, update_tick
+# Return value: None
+class TrackRecord:
+    """ Tracked object record """
+
+    __slots__ = ('track_id', 'bbox', 'centroid', 'update_tick')
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, track_id, bbox, centroid, update_tick
+    # Return value: None
+    def __init__(self, track_id, bbox, centroid, update_tick):
+        """ Set record details """
+
+        self.track_id = track_id          # Object id
+        self.bbox = bbox                  # Bounding box
+        self.centroid = centroid          # Centroid
+        self.update_tick = update_tick    # Tracker tick of the last update
+
+
 # class Tracker
 # Description: Class for tracking object detection history
 # Parameter: None
@@ -14,42 +41,44 @@ from common import constants
 class Tracker:
     """ Tracker class """
 
-    __tracker = None              # Tracker Class instance
-    __tracker_id = []             # Holds the object ids
-    __tracker_update = []         # Holds the update counter per object id
-    __tracker_bbox = []           # Holds the bounding box per object id
-    __tracker_centroid = []       # Holds the centroid per object id
+    __trackers = {}               # Tracker Class instance per source id
+    __records = None              # Holds the records per object id, in first detection order
+    __expiry = None               # Holds the object ids, least recently updated first
+    __tick = 0                    # Update counter. Increased on every tracker update
 
     # function get_instance
-    # Description: Functon to return the class instance
-    # Parameter: None
-    # Return value: __tracker
+    # Description: Functon to return the class instance of a source
+    # Parameter: source_id
+    # Return value: __trackers[source_id]
     @staticmethod
-    def get_instance():
+    def get_instance(source_id=0):
         """ Static access method. """
 
         # Check if not yet initialized
-        if Tracker.__tracker is None:
+        if source_id not in Tracker.__trackers:
 
             # Call the class constructor
-            Tracker()
+            Tracker(source_id)
 
         # Return the class instance
-        return Tracker.__tracker
+        return Tracker.__trackers[source_id]
 
 
     # function __init__
     # Description: Class constructor
-    # Parameter: self
+    # Parameter: self, source_id
     # Return value: None
-    def __init__(self):
+    def __init__(self, source_id=0):
         """ Virtually private constructor. """
 
         # Check if not yet initialized
-        if Tracker.__tracker is None:
+        if source_id not in Tracker.__trackers:
 
             # Initialize class instance
-            Tracker.__tracker = self
+            Tracker.__trackers[source_id] = self
+
+            self.__records = {}
+            self.__expiry = OrderedDict()
 
 
     # function add
@@ -59,25 +88,30 @@ class Tracker:
     def add(self, track_id, bbox):
         """" Add new object details """
 
-        # Get the index of the track id if already existing
-        index = self.get_index(track_id)
+        # Copy bounding box details
+        bbox = BBox(bbox.left, bbox.top, bbox.width, bbox.height)
+
+        # Get the record of the track id if already existing
+        record = self.__records.get(track_id)
 
         # Track id is not existing
-        if constants.NO_INDEX >= index:
+        if record is None:
 
             # Add the details for new object
-            self.__tracker_id.append(track_id)
-            self.__tracker_bbox.append(bbox)
-            self.__tracker_centroid.append(self.__compute_centroid(bbox))
-            self.__tracker_update.append(0)
+            self.__records[track_id] = TrackRecord(track_id, bbox, \
+                self.__compute_centroid(bbox), self.__tick)
 
         # Track id is existing
         else:
 
             # Update the details of the existing object
-            self.__tracker_bbox[index] = bbox
-            self.__tracker_centroid[index] = self.__compute_centroid(bbox)
-            self.__tracker_update[index] = 0
+            record.bbox = bbox
+            record.centroid = self.__compute_centroid(bbox)
+            record.update_tick = self.__tick
+
+        # Move the track id to the most recently updated end
+        self.__expiry[track_id] = None
+        self.__expiry.move_to_end(track_id)
 
 
     # function __compute_centroid
@@ -102,11 +136,11 @@ class Tracker:
     # function get_centroid_list
     # Description: Function that returns the centroid list
     # Parameter: self
-    # Return value: __tracker_centroid
+    # Return value: centroid list
     def get_centroid_list(self):
         """ Returns the centroid list """
 
-        return self.__tracker_centroid
+        return [record.centroid for record in self.__records.values()]
 
 
     # function get_annotator_data
@@ -116,22 +150,22 @@ class Tracker:
     def get_annotator_data(self, alerts):
         """ Returns annotation data """
 
-        data = []       # Holds data for annotation
+        data = []           # Holds data for annotation
+        track_ids = set()   # Holds the added track ids: an object may alert in several zones
 
         # Check each alert
         for alert in alerts:
 
-            # Set alert track id
-            track_id = alert[0]
+            # Get record of the alert track id
+            record = self.__records.get(alert[0])
 
-            # Get index
-            index = self.get_index(track_id)
+            # Record exists and is not yet added
+            if record is not None and alert[0] not in track_ids:
 
-            # Index exists
-            if index >= 0:
+                track_ids.add(alert[0])
 
                 # Set bounding box and centroid
-                data.append((self.__tracker_bbox[index], self.__tracker_centroid[index]))
+                data.append((record.bbox, record.centroid))
 
 
         # Return bounding box and centroid
@@ -141,11 +175,11 @@ class Tracker:
     # function get_id_list
     # Description: Function that returns the track id list
     # Parameter: self
-    # Return value: __tracker_id
+    # Return value: track id list
     def get_id_list(self):
         """ Returns the track id list """
 
-        return self.__tracker_id
+        return list(self.__records)
 
 
     # function get_new_list
@@ -155,68 +189,55 @@ class Tracker:
     def get_new_list(self):
         """ Returns current detections: ids and centroids """
 
-        update_len = len(self.__tracker_update)    # Set tracker count
-
         new_ids = []                               # Holds new ids
         new_centroids = []                         # Holds new centroids
 
-        # Return if the tracker count is 0
-        if update_len > 0:
-
-            # Check each tracker
-            for index in range(0, update_len, 1):
+        # Check each tracker
+        for record in self.__records.values():
 
-                # Trackers with 1 or less update counter are new data
-                if self.__tracker_update[index] <= 1:
+            # Trackers with 1 or less update counter are new data
+            if self.__tick - record.update_tick <= 1:
 
-                    # Append ids and centroids
-                    new_ids.append(self.__tracker_id[index])
-                    new_centroids.append(self.__tracker_centroid[index])
+                # Append ids and centroids
+                new_ids.append(record.track_id)
+                new_centroids.append(record.centroid)
 
         # Return ids and centroids of new data
         return new_ids, new_centroids
 
 
-    # function get_index
-    # Description: Function that returns the index based on track id
+    # function has_track
+    # Description: Function that returns True if the track id has record
     # Parameter: self, track_id
     # Return value: result
-    def get_index(self, track_id):
-        """ Get track id index """
-
-        result = -1                          # Holds the result index
-        track_len = len(self.__tracker_id)   # Get the current number of existing tracker id
-
-        # Check each tracker
-        for index in range(0, track_len, 1):
-
-            # Check if the track id has record
-            if self.__tracker_id[index] == track_id:
+    def has_track(self, track_id):
+        """ Check track id record """
 
-                # Set index as the result
-                result = index
-
-                # Exit the loop
-                break
-
-        # Return the index as result
-        return result
+        return track_id in self.__records
 
 
     # function update
     # Description: Function that maintains the active tracker
     # Parameter: self
-    # Return value: None
+    # Return value: removed_ids (track ids of the removed trackers)
     def update(self):
         """ Maintain active tracker """
 
-        # Remove tracker that exceeds the update timeout
-        tracker_max_index = len(self.__tracker_id) - 1
-        for index in range(tracker_max_index, -1, -1):
+        removed_ids = []
+
+        # Increase update counter of all trackers
+        self.__tick += 1
+
+        # Remove tracker that exceeds the update timeout.
+        # Least recently updated trackers come first, so stop at the first active one.
+        while self.__expiry:
+
+            track_id = next(iter(self.__expiry))
+            if self.__tick - self.__records[track_id].update_tick < constants.UPDATE_TIMEOUT:
+                break
+
+            self.__expiry.popitem(last=False)
+            del self.__records[track_id]
+            removed_ids.append(track_id)
 
-            self.__tracker_update[index] += 1
-            if self.__tracker_update[index] >= constants.UPDATE_TIMEOUT:
-                del self.__tracker_id[index]
-                del self.__tracker_update[index]
-                del self.__tracker_bbox[index]
-                del self.__tracker_centroid[index]
+        return removed_ids
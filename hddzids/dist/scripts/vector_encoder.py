@@ -0,0 +1,137 @@
+""" Host Update Vector Encoder """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import json
+from common import constants
+#pylint: disable=wrong-import-position
+
+# Compact JSON host update messages. Every message has a type "t" and a sequence number "s".
+#   Keyframe: {"t":"k","s":seq,"z":[[x1,y1,x2,y2,x3,y3,...],...],"tr":[[id,x,y,alert],...]}
+#             (z: danger zone polygons)
+#   Delta:    {"t":"d","s":seq,"a":[[id,x,y,alert],...],"m":[[id,x,y],...],
+#              "r":[id,...],"al":[[id,alert],...]}
+#             (a: added, m: moved, r: removed, al: alert changed. Empty lists are omitted.)
+# Coordinates are in the Bird's Eye View and alert is 0 or 1.
+# A delta applies to the state after the message with sequence number s - 1.
+# On a sequence gap, the host discards deltas until the next keyframe.
+
+# class VectorEncoder
+# Description: Class that encodes the track list into keyframes and deltas
+# Parameter: None
+# Return value: None
+class VectorEncoder:
+    """ Host update vector encoder """
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self
+    # Return value: None
+    def __init__(self):
+        """ Set initial state """
+
+        self.__seq = 0              # Sequence number of the last message
+        self.__tracks = {}          # Track state known by the host: {id: [x, y, alert]}
+        self.__d_zones = None       # Danger zone polygons known by the host
+        self.__keyframe_time = None # Time of the last keyframe (monotonic seconds)
+
+
+    # function encode
+    # Description: Function that returns the next message, or None if nothing changed
+    # Parameter: self, new_ids, centroids, alert_flags, d_zones, now
+    # Return value: payload
+    def encode(self, new_ids, centroids, alert_flags, d_zones, now):
+        """ Encode host update """
+
+        d_zones = [[int(value) for value in points] for points in d_zones]
+
+        # Keyframe: first message, danger zones changed or keyframe interval passed
+        if self.__keyframe_time is None or d_zones != self.__d_zones or \
+            now - self.__keyframe_time >= constants.VECTOR_KEYFRAME_INTERVAL:
+
+            message = self.__encode_keyframe(new_ids, centroids, alert_flags, d_zones)
+            self.__keyframe_time = now
+
+        else:
+
+            message = self.__encode_delta(new_ids, centroids, alert_flags)
+
+        # Nothing changed
+        if message is None:
+            return None
+
+        self.__seq += 1
+        message['s'] = self.__seq
+
+        return json.dumps(message, separators=(',', ':'))
+
+
+    # function __encode_keyframe
+    # Description: Function that sets the full state as known by the host
+    # Parameter: self, new_ids, centroids, alert_flags, d_zones
+    # Return value: message
+    def __encode_keyframe(self, new_ids, centroids, alert_flags, d_zones):
+        """ Encode keyframe """
+
+        self.__d_zones = d_zones
+        self.__tracks = {int(track_id): [int(centroid[0]), int(centroid[1]), int(alert_flag)] \
+            for track_id, centroid, alert_flag in zip(new_ids, centroids, alert_flags)}
+
+        return {'t': 'k', 'z': d_zones, \
+            'tr': [[track_id] + track for track_id, track in self.__tracks.items()]}
+
+
+    # function __encode_delta
+    # Description: Function that collects the changes since the last message.
+    #              Moves smaller than HOST_UPDATE_QUANTUM are not sent.
+    # Parameter: self, new_ids, centroids, alert_flags
+    # Return value: message or None if nothing changed
+    def __encode_delta(self, new_ids, centroids, alert_flags):
+        """ Encode delta """
+
+        added = []
+        moved = []
+        alert_changed = []
+        current_ids = set()
+
+        for track_id, centroid, alert_flag in zip(new_ids, centroids, alert_flags):
+
+            track_id = int(track_id)
+            pos_x, pos_y, alert = int(centroid[0]), int(centroid[1]), int(alert_flag)
+            current_ids.add(track_id)
+            track = self.__tracks.get(track_id)
+
+            # New track
+            if track is None:
+
+                self.__tracks[track_id] = [pos_x, pos_y, alert]
+                added.append([track_id, pos_x, pos_y, alert])
+                continue
+
+            # Moved
+            if abs(pos_x - track[0]) >= constants.HOST_UPDATE_QUANTUM or \
+                abs(pos_y - track[1]) >= constants.HOST_UPDATE_QUANTUM:
+
+                track[0], track[1] = pos_x, pos_y
+                moved.append([track_id, pos_x, pos_y])
+
+            # Alert changed
+            if alert != track[2]:
+
+                track[2] = alert
+                alert_changed.append([track_id, alert])
+
+        # Removed tracks
+        removed = [track_id for track_id in self.__tracks if track_id not in current_ids]
+        for track_id in removed:
+            del self.__tracks[track_id]
+
+        message = {'t': 'd'}
+        for key, values in (('a', added), ('m', moved), ('r', removed), ('al', alert_changed)):
+            if values:
+                message[key] = values
+
+        # Return message. If nothing changed, return None
+        return message if len(message) > 1 else None
@@ -0,0 +1,266 @@
+""" Danger Zone Raster """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+from common import constants
+from common.common import Common
+#pylint: disable=wrong-import-position
+
+# class ZoneRaster
+# Description: Class for the danger zone membership by raster lookup. All zones are
+#              rasterized once per calibration into a bitmask image: bit i of a pixel is set
+#              if the pixel is inside zone i. The membership of all points is then one
+#              fancy-indexing lookup, whatever the zone shapes. A distance field to the
+#              nearest zone covers a D_ZONE_APPROACH_DISTANCE margin around the zones.
+#              The raster is clipped to the Bird's Eye View area plus this margin.
+#              The raster is cached on disk, keyed by the hash of the zone polygons,
+#              so a restart does not rebuild it. The least recently used rasters beyond
+#              D_ZONE_RASTER_CACHE_SIZE are removed when a raster is added.
+# Parameter: labels (bitmask image), distances (distance field), origin ((x, y) of the
+#            top-left pixel), zone_count
+# Return value: None
+class ZoneRaster:
+    """ Danger zone raster """
+
+    # function __init__
+    # Description: Class constructor
+    # Parameter: self, labels, distances, origin, zone_count
+    # Return value: None
+    def __init__(self, labels, distances, origin, zone_count):
+        """ Set raster """
+
+        # Zone bitmask and distance to the nearest zone per pixel,
+        # position of the top-left pixel and bit index per zone
+        self.__labels = labels
+        self.__distances = distances
+        self.__origin = np.asarray(origin, dtype=np.int64)
+        self.__bits = np.arange(zone_count, dtype=labels.dtype)
+
+
+    # function load
+    # Description: Function that returns the raster of the zone polygons, from the cache
+    #              if it holds one for the same polygons, else built and cached
+    # Parameter: cls, polygons (flat point list per zone), b_eye_dim (Bird's Eye View corners),
+    #            cache_dir (None: no cache)
+    # Return value: raster
+    @classmethod
+    def load(cls, polygons, b_eye_dim=constants.B_EYE_VIEW_DIM, \
+        cache_dir=constants.D_ZONE_RASTER_CACHE_DIR):
+        """ Load or build raster """
+
+        polygons = [[int(value) for value in points] for points in polygons]
+        extent = [int(max(b_eye_dim[0::2])), int(max(b_eye_dim[1::2]))]
+
+        path = None
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, cls.get_key(polygons, extent) + ".npz")
+
+            # Cached raster
+            raster = cls.__read(path, len(polygons))
+            if raster is not None:
+                return raster
+
+        raster = cls(*cls.__build(polygons, extent), len(polygons))
+
+        if path is not None:
+            raster.save(path)
+            cls.prune(cache_dir)
+
+        return raster
+
+
+    # function get_key
+    # Description: Function that returns the cache key of the zone polygons
+    # Parameter: cls, polygons, extent ((width, height) of the Bird's Eye View)
+    # Return value: key (hex digest)
+    @classmethod
+    def get_key(cls, polygons, extent):
+        """ Returns cache key """
+
+        content = json.dumps([constants.D_ZONE_RASTER_VERSION, \
+            constants.D_ZONE_APPROACH_DISTANCE, list(extent), polygons], separators=(',', ':'))
+
+        return hashlib.sha1(content.encode(constants.FILE_ENCODING)).hexdigest()
+
+
+    # function __build
+    # Description: Function that rasterizes the zone polygons over their common bounding box,
+    #              extended by the approaching distance and clipped to the Bird's Eye View
+    #              extent plus that margin, so a zone far outside the view cannot blow up
+    #              the raster. The smallest unsigned type holding one bit per zone is used.
+    #              The distance field is the Euclidean distance transform of the pixels
+    #              outside all zones.
+    # Parameter: cls, polygons, extent
+    # Return value: labels, distances, origin
+    @classmethod
+    def __build(cls, polygons, extent):
+        """ Build raster """
+
+        margin = int(np.ceil(constants.D_ZONE_APPROACH_DISTANCE)) + 1
+        lower = np.full(2, -margin, dtype=np.int64)
+        upper = np.asarray(extent, dtype=np.int64) + margin
+
+        points = [np.asarray(polygon, dtype=np.int64).reshape(-1, 2) for polygon in polygons]
+        origin = np.clip(np.min([polygon.min(axis=0) for polygon in points], axis=0) - margin, \
+            lower, upper)
+        end = np.clip(np.max([polygon.max(axis=0) for polygon in points], axis=0) + margin, \
+            lower, upper)
+        size = end - origin + 1
+
+        dtype = np.min_scalar_type((1 << len(polygons)) - 1)
+        labels = np.zeros((size[1], size[0]), dtype=dtype)
+        mask = np.zeros(labels.shape, dtype=np.uint8)
+
+        for index, polygon in enumerate(points):
+
+            mask[:] = 0
+            cv2.fillPoly(mask, [(polygon - origin).astype(np.int32)], 1)
+            labels[mask > 0] |= dtype.type(1 << index)
+
+        # Distance of each pixel to the nearest zone pixel: 0 inside a zone
+        distances = cv2.distanceTransform((labels == 0).astype(np.uint8), cv2.DIST_L2, \
+            cv2.DIST_MASK_PRECISE)
+
+        return labels, distances, origin
+
+
+    # function __read
+    # Description: Function that reads a cached raster
+    # Parameter: cls, path, zone_count
+    # Return value: raster or None if not cached
+    @classmethod
+    def __read(cls, path, zone_count):
+        """ Read cached raster """
+
+        try:
+
+            with np.load(path, allow_pickle=False) as cached:
+                raster = cls(cached['labels'], cached['distances'], cached['origin'], zone_count)
+
+            # Mark as recently used
+            os.utime(path)
+
+            return raster
+
+        # Not cached or unreadable: build again
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+    # function save
+    # Description: Function that writes the raster into the cache. The file is replaced
+    #              at once, so a reader never sees a partial raster.
+    # Parameter: self, path
+    # Return value: None
+    def save(self, path):
+        """ Write raster """
+
+        try:
+
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+            with open(path + ".tmp", 'wb') as raster_file:
+                np.savez(raster_file, labels=self.__labels, distances=self.__distances, \
+                    origin=self.__origin)
+
+            os.replace(path + ".tmp", path)
+
+        # Membership works without the cache
+        except OSError as error:
+            Common.post_message(constants.C_NAME_ZONE_RASTER, \
+                f"Unable to cache the danger zone raster: {error}", constants.LOG_WARNING)
+
+
+    # function prune
+    # Description: Function that removes the least recently used cached rasters beyond
+    #              the cache size, and the leftovers of interrupted writes
+    # Parameter: cls, cache_dir, cache_size
+    # Return value: None
+    @classmethod
+    def prune(cls, cache_dir, cache_size=constants.D_ZONE_RASTER_CACHE_SIZE):
+        """ Remove stale cached rasters """
+
+        try:
+
+            paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) \
+                if name.endswith((".npz", ".tmp"))]
+            paths.sort(key=os.path.getmtime, reverse=True)
+
+            rasters = [path for path in paths if path.endswith(".npz")]
+            for path in rasters[cache_size:] + [path for path in paths if path.endswith(".tmp")]:
+                os.remove(path)
+
+        # Stale rasters are only disk space
+        except OSError as error:
+            Common.post_message(constants.C_NAME_ZONE_RASTER, \
+                f"Unable to prune the danger zone raster cache: {error}", constants.LOG_WARNING)
+
+
+    # function __len__
+    # Description: Function that returns the zone count
+    # Parameter: self
+    # Return value: zone count
+    def __len__(self):
+        """ Returns zone count """
+
+        return len(self.__bits)
+
+
+    # function __lookup
+    # Description: Function that returns the pixel value of each point in a raster image
+    # Parameter: self, image, points, default (value of the points outside the raster)
+    # Return value: values ((N,) array)
+    def __lookup(self, image, points, default):
+        """ Returns raster value per point """
+
+        points = np.rint(np.asarray(points, dtype=np.float64).reshape(-1, 2)).astype(np.int64)
+        points -= self.__origin
+
+        height, width = image.shape
+        inside = (points[:, 0] >= 0) & (points[:, 0] < width) & \
+            (points[:, 1] >= 0) & (points[:, 1] < height)
+
+        values = np.full(len(points), default, dtype=image.dtype)
+        values[inside] = image[points[inside, 1], points[inside, 0]]
+
+        return values
+
+
+    # function get_labels
+    # Description: Function that returns the zone bitmask of each point.
+    #              Points outside the raster are outside all zones.
+    # Parameter: self, points (list of (x, y) or (N, 2) array)
+    # Return value: labels ((N,) array)
+    def get_labels(self, points):
+        """ Returns zone bitmask per point """
+
+        return self.__lookup(self.__labels, points, 0)
+
+
+    # function get_distances
+    # Description: Function that returns the distance of each point to the nearest zone.
+    #              0 inside a zone. Points outside the raster are farther than the
+    #              approaching distance: inf.
+    # Parameter: self, points (list of (x, y) or (N, 2) array)
+    # Return value: distances ((N,) float array)
+    def get_distances(self, points):
+        """ Returns distance to the nearest zone per point """
+
+        return self.__lookup(self.__distances, points, np.inf)
+
+
+    # function get_membership
+    # Description: Function that returns which points are inside which zones
+    # Parameter: self, points (list of (x, y) or (N, 2) array)
+    # Return value: membership ((N, zone count) bool array)
+    def get_membership(self, points):
+        """ Returns point-in-zone flags """
+
+        return (self.get_labels(points)[:, None] >> self.__bits) & 1 == 1
@@ -0,0 +1,154 @@
+""" Danger Zone Set """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import numpy as np
+from common import constants
+#pylint: disable=wrong-import-position
+
+# class ZoneSet
+# Description: Class for the point-in-polygon membership of a set of danger zones.
+#              The polygon edges of all zones are kept as padded arrays, so the membership
+#              of all points in all zones is one vectorized crossing-number test.
+#              Point and zone pairs outside the zone bounding box are skipped.
+#              The distance to the nearest zone is the distance to the nearest edge.
+# Parameter: polygons (flat point lists: x1, y1, x2, y2, ...)
+# Return value: None
+class ZoneSet:
+    """ Danger zone membership """
+
+    __bboxes = None         # Bounding box per zone: (N, 4) min x, min y, max x, max y
+    __edge_x = None         # Edge start x per zone: (N, max point count)
+    __edge_x2 = None        # Edge end x per zone
+    __edge_y1 = None        # Edge start y per zone
+    __edge_y2 = None        # Edge end y per zone
+    __inv_slopes = None     # Edge dx / dy per zone. 0 for horizontal and padding edges
+
+    # function __init__
+    # Description: Class constructor. Builds the edge arrays once.
+    # Parameter: self, polygons
+    # Return value: None
+    def __init__(self, polygons):
+        """ Build edge arrays """
+
+        polygons = [np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in polygons]
+        zone_cnt = len(polygons)
+        point_cnt = max((len(polygon) for polygon in polygons), default=0)
+
+        # Closed polygons, padded with the first point: padding edges have no length
+        vertices = np.zeros((zone_cnt, point_cnt + 1, 2), dtype=np.float64)
+        for index, polygon in enumerate(polygons):
+            vertices[index, :len(polygon)] = polygon
+            vertices[index, len(polygon):] = polygon[0]
+
+        start = vertices[:, :-1]
+        end = vertices[:, 1:]
+        delta_y = end[..., 1] - start[..., 1]
+
+        self.__edge_x = start[..., 0]
+        self.__edge_x2 = end[..., 0]
+        self.__edge_y1 = start[..., 1]
+        self.__edge_y2 = end[..., 1]
+        self.__inv_slopes = np.divide(end[..., 0] - start[..., 0], delta_y, \
+            out=np.zeros_like(delta_y), where=delta_y != 0)
+
+        self.__bboxes = np.array([np.concatenate((polygon.min(axis=0), polygon.max(axis=0))) \
+            for polygon in polygons]).reshape(-1, 4)
+
+
+    # function __len__
+    # Description: Function that returns the zone count
+    # Parameter: self
+    # Return value: zone count
+    def __len__(self):
+        """ Returns zone count """
+
+        return len(self.__bboxes)
+
+
+    # function get_membership
+    # Description: Function that returns which points are inside which zones
+    # Parameter: self, points (list of (x, y) or (N, 2) array)
+    # Return value: membership ((N, zone count) bool array)
+    def get_membership(self, points):
+        """ Returns point-in-zone flags """
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        membership = np.zeros((len(points), len(self.__bboxes)), dtype=bool)
+
+        # Bounding box prefilter: candidate point and zone pairs
+        point_x = points[:, 0:1]
+        point_y = points[:, 1:2]
+        point_index, zone_index = np.nonzero( \
+            (point_x >= self.__bboxes[:, 0]) & (point_x <= self.__bboxes[:, 2]) & \
+            (point_y >= self.__bboxes[:, 1]) & (point_y <= self.__bboxes[:, 3]))
+
+        # No candidate
+        if point_index.size == 0:
+            return membership
+
+        point_x = points[point_index, 0:1]
+        point_y = points[point_index, 1:2]
+        edge_y1 = self.__edge_y1[zone_index]
+
+        # Edges crossed by the ray from the point towards +x
+        crossings = ((edge_y1 > point_y) != (self.__edge_y2[zone_index] > point_y)) & \
+            (point_x < self.__edge_x[zone_index] + \
+            (point_y - edge_y1) * self.__inv_slopes[zone_index])
+
+        # Inside if the crossing count is odd
+        inside = np.count_nonzero(crossings, axis=1) % 2 == 1
+        membership[point_index[inside], zone_index[inside]] = True
+
+        return membership
+
+
+    # function get_distances
+    # Description: Function that returns the distance of each point to the nearest zone.
+    #              0 inside a zone. Only the zones whose bounding box is within the
+    #              approaching distance are measured, the other points are at inf.
+    # Parameter: self, points (list of (x, y) or (N, 2) array),
+    #            max_distance (measuring limit)
+    # Return value: distances ((N,) float array)
+    def get_distances(self, points, max_distance=constants.D_ZONE_APPROACH_DISTANCE):
+        """ Returns distance to the nearest zone per point """
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        distances = np.full(len(points), np.inf)
+
+        # Bounding box prefilter, extended by the limit: candidate point and zone pairs
+        point_x = points[:, 0:1]
+        point_y = points[:, 1:2]
+        point_index, zone_index = np.nonzero( \
+            (point_x >= self.__bboxes[:, 0] - max_distance) & \
+            (point_x <= self.__bboxes[:, 2] + max_distance) & \
+            (point_y >= self.__bboxes[:, 1] - max_distance) & \
+            (point_y <= self.__bboxes[:, 3] + max_distance))
+
+        # No candidate
+        if point_index.size == 0:
+            return distances
+
+        point_x = points[point_index, 0:1]
+        point_y = points[point_index, 1:2]
+        edge_x = self.__edge_x[zone_index]
+        edge_y = self.__edge_y1[zone_index]
+        delta_x = self.__edge_x2[zone_index] - edge_x
+        delta_y = self.__edge_y2[zone_index] - edge_y
+
+        # Nearest point of each edge: projection clamped to the edge.
+        # Padding edges have no length: their nearest point is the first point
+        length = delta_x * delta_x + delta_y * delta_y
+        ratio = np.clip(np.divide((point_x - edge_x) * delta_x + (point_y - edge_y) * delta_y, \
+            length, out=np.zeros_like(length), where=length > 0), 0.0, 1.0)
+        edge_distances = np.hypot(edge_x + ratio * delta_x - point_x, \
+            edge_y + ratio * delta_y - point_y).min(axis=1)
+
+        np.minimum.at(distances, point_index, edge_distances)
+
+        # Inside a zone
+        distances[self.get_membership(points).any(axis=1)] = 0.0
+
+        return distances
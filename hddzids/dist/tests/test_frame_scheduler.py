@@ -0,0 +1,70 @@
+""" Frame Scheduler Tests """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import pytest
+from common import constants
+from scripts.frame_scheduler import FrameScheduler
+#pylint: disable=wrong-import-position
+
+# Processing times over and well under the frame budget
+SLOW = constants.SCHED_FRAME_BUDGET * 4
+FAST = 0.0
+
+# function scheduler
+# Description: Fixture that returns a new scheduler instance
+# Parameter: None
+# Return value: scheduler
+@pytest.fixture
+def scheduler():
+    """ New scheduler """
+
+    FrameScheduler._FrameScheduler__frame_scheduler = None      #pylint: disable=protected-access
+
+    return FrameScheduler.get_instance()
+
+
+# function test_persons_in_view_keep_every_frame
+# Description: Persons in view keep the baseline cadence by default
+def test_persons_in_view_keep_every_frame(scheduler):
+    """ Present tier """
+
+    for _ in range(constants.SCHED_HOLD_FRAMES * 2):
+        scheduler.update(0, 3, False, FAST)
+
+    assert scheduler.get_interval() == constants.SCHED_PRESENT_INTERVAL == 0
+    assert all(scheduler.should_process(0) for _ in range(10))
+
+
+# function test_empty_scene_backs_off
+# Description: The idle interval applies after SCHED_IDLE_FRAMES empty frames and
+#              someone approaching a zone restores every frame at once
+def test_empty_scene_backs_off(scheduler):
+    """ Idle tier """
+
+    for _ in range(constants.SCHED_IDLE_FRAMES):
+        scheduler.update(0, 0, False, FAST)
+    assert scheduler.get_interval() == constants.SCHED_IDLE_INTERVAL
+
+    scheduler.update(0, 1, True, FAST)
+    assert scheduler.get_interval() == constants.SCHED_ACTIVE_INTERVAL
+
+
+# function test_load_never_backs_off_near_zone
+# Description: The processing load raises the interval only when nobody is inside or
+#              approaching a danger zone in any source
+def test_load_never_backs_off_near_zone(scheduler):
+    """ Load interval """
+
+    for _ in range(100):
+        scheduler.update(0, 1, True, SLOW)
+        scheduler.update(1, 1, False, SLOW)
+    assert scheduler.get_interval() == constants.SCHED_ACTIVE_INTERVAL
+
+    scheduler.update(0, 1, False, SLOW)
+    assert scheduler.get_interval() > constants.SCHED_ACTIVE_INTERVAL
+
+    scheduler.update(1, 1, True, SLOW)
+    assert scheduler.get_interval() == constants.SCHED_ACTIVE_INTERVAL
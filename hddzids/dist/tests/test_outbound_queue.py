@@ -0,0 +1,186 @@
+""" Outbound Message Queue Tests """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+from common import constants
+from scripts.outbound_queue import OutboundQueue
+#pylint: disable=wrong-import-position
+
+# function take
+# Description: Function that returns the payloads of the ready messages
+# Parameter: queue, now, limit
+# Return value: payloads
+def take(queue, now=0.0, limit=100):
+    """ Ready payloads """
+
+    messages, _ = queue.get_ready(now, limit)
+
+    return [message.payload for message in messages]
+
+
+# function test_priority_then_queue_order
+# Description: Messages are taken by priority, then in queue order
+def test_priority_then_queue_order():
+    """ Take order """
+
+    queue = OutboundQueue()
+    queue.put('grid', 'g1', 0, constants.MQTT_PRIORITY_HOST_UPDATE)
+    queue.put('image', 'i1', 1, constants.MQTT_PRIORITY_ALERT_IMAGE)
+    queue.put('data', 'd1', 1, constants.MQTT_PRIORITY_ALERT_DATA)
+    queue.put('grid', 'g2', 0, constants.MQTT_PRIORITY_HOST_UPDATE)
+
+    assert take(queue, limit=3) == ['d1', 'i1', 'g1']
+    assert take(queue) == ['g2']
+    assert len(queue) == 0
+
+
+# function test_replace_keeps_queue_position
+# Description: A replaceable message is replaced in place by a newer one of the same topic
+def test_replace_keeps_queue_position():
+    """ Replace """
+
+    queue = OutboundQueue()
+    queue.put('grid', 'old', 0, 2, replace=True)
+    queue.put('tracks', 't1', 0, 2)
+    queue.put('grid', 'new', 0, 2, replace=True)
+
+    assert len(queue) == 2
+    assert take(queue) == ['new', 't1']
+
+
+# function test_full_queue_drops_oldest_lowest_priority
+# Description: When the queue is full, the oldest message with the lowest priority is dropped
+def test_full_queue_drops_oldest_lowest_priority():
+    """ Full queue """
+
+    queue = OutboundQueue(max_size=3)
+    queue.put('grid', 'g1', 0, 2)
+    queue.put('data', 'd1', 1, 0)
+    queue.put('grid', 'g2', 0, 2)
+    dropped = queue.put('data', 'd2', 1, 0)
+
+    assert dropped.payload == 'g1'
+    assert queue.get_dropped_count() == 1
+    assert take(queue) == ['d1', 'd2', 'g2']
+
+
+# function test_expired_messages_are_dropped
+# Description: Messages past their deadline are returned as expired
+def test_expired_messages_are_dropped():
+    """ Deadline """
+
+    queue = OutboundQueue()
+    queue.put('grid', 'late', 0, 2, deadline=5.0)
+    queue.put('grid', 'in-time', 0, 2, deadline=20.0)
+
+    messages, expired = queue.get_ready(10.0, 10)
+
+    assert [message.payload for message in messages] == ['in-time']
+    assert [message.payload for message in expired] == ['late']
+    assert queue.get_dropped_count() == 1
+
+
+# function test_retry_backoff_does_not_block
+# Description: A failed message waits for its exponential backoff
+#              without blocking the messages behind it
+def test_retry_backoff_does_not_block():
+    """ Retry backoff """
+
+    queue = OutboundQueue()
+    queue.put('data', 'd1', 1, 0)
+    queue.put('grid', 'g1', 0, 2)
+    failed = queue.get_ready(0.0, 1)[0][0]
+
+    assert queue.retry(failed, 0.0) == constants.RETRY_QUEUED
+    assert failed.next_time == constants.MQTT_BACKOFF_MIN
+    assert take(queue, 0.0) == ['g1']
+    assert queue.get_wait_time(0.0) == constants.MQTT_BACKOFF_MIN
+    assert take(queue, constants.MQTT_BACKOFF_MIN) == ['d1']
+
+    # Second failure: the backoff doubles
+    assert queue.retry(failed, 10.0) == constants.RETRY_QUEUED
+    assert failed.next_time == 10.0 + 2 * constants.MQTT_BACKOFF_MIN
+
+
+# function test_retry_backoff_is_capped
+# Description: The backoff does not exceed MQTT_BACKOFF_MAX
+def test_retry_backoff_is_capped():
+    """ Retry backoff cap """
+
+    queue = OutboundQueue()
+    queue.put('data', 'd1', 1, 0)
+    failed = queue.get_ready(0.0, 1)[0][0]
+    failed.attempts = constants.MQTT_MAX_RETRY - 1
+
+    assert queue.retry(failed, 0.0) == constants.RETRY_QUEUED
+    assert failed.next_time == min(constants.MQTT_BACKOFF_MIN * \
+        2 ** (constants.MQTT_MAX_RETRY - 1), constants.MQTT_BACKOFF_MAX)
+
+
+# function test_retries_exhausted_are_dropped
+# Description: A message is dropped after MQTT_MAX_RETRY failed attempts
+def test_retries_exhausted_are_dropped():
+    """ Retries exhausted """
+
+    queue = OutboundQueue()
+    queue.put('data', 'd1', 1, 0)
+    now = 0.0
+
+    for _ in range(constants.MQTT_MAX_RETRY):
+        failed = queue.get_ready(now, 1)[0][0]
+        assert queue.retry(failed, now) == constants.RETRY_QUEUED
+        now = failed.next_time
+
+    failed = queue.get_ready(now, 1)[0][0]
+
+    assert queue.retry(failed, now) == constants.RETRY_DROPPED
+    assert queue.get_dropped_count() == 1
+    assert len(queue) == 0
+
+
+# function test_retry_deadline_is_dropped
+# Description: A message is dropped when its deadline passes before the next attempt
+def test_retry_deadline_is_dropped():
+    """ Retry past deadline """
+
+    queue = OutboundQueue()
+    queue.put('grid', 'g1', 0, 2, deadline=0.1)
+    failed = queue.get_ready(0.0, 1)[0][0]
+
+    assert queue.retry(failed, 0.0) == constants.RETRY_DROPPED
+    assert queue.get_dropped_count() == 1
+
+
+# function test_superseded_retry_is_not_dropped
+# Description: A failed message replaced by a newer one is not retried nor counted as dropped
+def test_superseded_retry_is_not_dropped():
+    """ Superseded retry """
+
+    queue = OutboundQueue()
+    queue.put('grid', 'old', 0, 2, replace=True)
+    failed = queue.get_ready(0.0, 1)[0][0]
+    queue.put('grid', 'new', 0, 2, replace=True)
+
+    assert queue.retry(failed, 0.0) == constants.RETRY_SUPERSEDED
+    assert queue.get_dropped_count() == 0
+    assert take(queue, 100.0) == ['new']
+
+
+# function test_requeue_keeps_order
+# Description: Messages put back on disconnection are sent first again, with no attempt
+def test_requeue_keeps_order():
+    """ Requeue """
+
+    queue = OutboundQueue()
+    queue.put('data', 'd1', 1, 0)
+    queue.put('data', 'd2', 1, 0)
+    messages, _ = queue.get_ready(0.0, 2)
+    queue.put('data', 'd3', 1, 0)
+
+    for message in messages:
+        queue.requeue(message)
+
+    assert take(queue) == ['d1', 'd2', 'd3']
+    assert all(message.attempts == 0 for message in messages)
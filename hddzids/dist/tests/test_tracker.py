@@ -0,0 +1,104 @@
+""" Tracker Tests """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import itertools
+import pytest
+from common import constants
+from scripts.tracker import Tracker, BBox
+#pylint: disable=wrong-import-position
+
+# Source ids not used by the pipeline: one tracker instance per test
+SOURCE_IDS = itertools.count(1000)
+
+# function tracker
+# Description: Fixture that returns a new tracker instance
+# Parameter: None
+# Return value: tracker
+@pytest.fixture
+def tracker():
+    """ New tracker """
+
+    return Tracker.get_instance(next(SOURCE_IDS))
+
+
+# function test_centroid_is_bottom_center
+# Description: The centroid is the bottom center of the bounding box
+def test_centroid_is_bottom_center(tracker):
+    """ Centroid of the bounding box """
+
+    tracker.add(1, BBox(10, 20, 31, 40))
+
+    assert tracker.get_centroid_list() == [(26, 60)]
+
+
+# function test_new_list_in_first_detection_order
+# Description: Updated tracks keep their first detection order
+def test_new_list_in_first_detection_order(tracker):
+    """ New list order """
+
+    tracker.add(3, BBox(0, 0, 10, 10))
+    tracker.add(1, BBox(0, 0, 10, 10))
+    tracker.update()
+    tracker.add(1, BBox(10, 0, 10, 10))
+    tracker.add(3, BBox(20, 0, 10, 10))
+
+    new_ids, new_centroids = tracker.get_new_list()
+
+    assert new_ids == [3, 1]
+    assert new_centroids == [(25, 10), (15, 10)]
+
+
+# function test_new_list_skips_stale_tracks
+# Description: Tracks not updated in the last tick are not new
+def test_new_list_skips_stale_tracks(tracker):
+    """ New list without stale tracks """
+
+    tracker.add(1, BBox(0, 0, 10, 10))
+    tracker.add(2, BBox(0, 0, 10, 10))
+    tracker.update()
+    tracker.add(2, BBox(0, 0, 10, 10))
+    tracker.update()
+
+    assert tracker.get_new_list()[0] == [2]
+    assert tracker.get_id_list() == [1, 2]
+
+
+# function test_expiry_removes_least_recently_updated
+# Description: Tracks expire UPDATE_TIMEOUT ticks after their last update,
+#              least recently updated first, and update returns their ids
+def test_expiry_removes_least_recently_updated(tracker):
+    """ Expiry order """
+
+    tracker.add(1, BBox(0, 0, 10, 10))
+    tracker.add(2, BBox(0, 0, 10, 10))
+    tracker.add(3, BBox(0, 0, 10, 10))
+    tracker.update()
+
+    # Refresh track 1: it now expires last
+    tracker.add(1, BBox(0, 0, 10, 10))
+
+    removed = []
+    for _ in range(constants.UPDATE_TIMEOUT - 1):
+        removed += tracker.update()
+
+    assert removed == [2, 3]
+    assert tracker.get_id_list() == [1]
+    assert tracker.update() == [1]
+    assert not tracker.has_track(1)
+
+
+# function test_annotator_data_once_per_track
+# Description: An object alerting in several zones is annotated once
+def test_annotator_data_once_per_track(tracker):
+    """ Annotator data without duplicates """
+
+    tracker.add(1, BBox(0, 0, 10, 10))
+    tracker.add(2, BBox(5, 5, 10, 10))
+
+    data = tracker.get_annotator_data([(1, 0, True, '', 'a'), (1, 0, True, '', 'b'), \
+        (9, 0, True, '', 'a')])
+
+    assert data == [(BBox(0, 0, 10, 10), (5, 10))]
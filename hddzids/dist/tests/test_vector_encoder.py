@@ -0,0 +1,148 @@
+""" Host Update Vector Encoder Tests """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import json
+import random
+from common import constants
+from scripts.vector_encoder import VectorEncoder
+#pylint: disable=wrong-import-position
+
+ZONES = [[10, 10, 50, 10, 50, 50, 10, 50]]
+
+# function decode
+# Description: Function that applies a message to the host state, as the host does
+# Parameter: state ({'seq', 'zones', 'tracks'}), payload
+# Return value: None
+def decode(state, payload):
+    """ Apply message """
+
+    message = json.loads(payload)
+
+    if message['t'] == 'k':
+        state['zones'] = message['z']
+        state['tracks'] = {track[0]: track[1:] for track in message['tr']}
+
+    else:
+        assert message['s'] == state['seq'] + 1
+        for track_id, pos_x, pos_y, alert in message.get('a', []):
+            state['tracks'][track_id] = [pos_x, pos_y, alert]
+        for track_id, pos_x, pos_y in message.get('m', []):
+            state['tracks'][track_id][:2] = [pos_x, pos_y]
+        for track_id in message.get('r', []):
+            del state['tracks'][track_id]
+        for track_id, alert in message.get('al', []):
+            state['tracks'][track_id][2] = alert
+
+    state['seq'] = message['s']
+
+
+# function test_first_message_is_keyframe
+# Description: The first message is a keyframe with the zones and all tracks
+def test_first_message_is_keyframe():
+    """ First keyframe """
+
+    message = json.loads(VectorEncoder().encode([1, 2], [(5, 6), (7, 8)], [False, True], \
+        ZONES, 0.0))
+
+    assert message == {'t': 'k', 's': 1, 'z': ZONES, 'tr': [[1, 5, 6, 0], [2, 7, 8, 1]]}
+
+
+# function test_unchanged_scene_sends_nothing
+# Description: No message and no sequence number is used when nothing changed
+def test_unchanged_scene_sends_nothing():
+    """ Unchanged scene """
+
+    encoder = VectorEncoder()
+    encoder.encode([1], [(5, 6)], [False], ZONES, 0.0)
+
+    assert encoder.encode([1], [(5, 6)], [False], ZONES, 0.1) is None
+    assert json.loads(encoder.encode([1], [(50, 6)], [False], ZONES, 0.2))['s'] == 2
+
+
+# function test_delta_changes
+# Description: A delta lists the added, moved, removed and alert changed tracks only
+def test_delta_changes():
+    """ Delta content """
+
+    encoder = VectorEncoder()
+    encoder.encode([1, 2, 3], [(0, 0), (20, 20), (40, 40)], [False, False, False], ZONES, 0.0)
+
+    message = json.loads(encoder.encode([1, 2, 4], [(0, 0), (30, 20), (60, 60)], \
+        [True, False, False], ZONES, 0.1))
+
+    assert message == {'t': 'd', 's': 2, 'a': [[4, 60, 60, 0]], 'm': [[2, 30, 20]], \
+        'r': [3], 'al': [[1, 1]]}
+
+
+# function test_small_moves_are_not_sent
+# Description: Moves below HOST_UPDATE_QUANTUM are not sent, but accumulate
+def test_small_moves_are_not_sent():
+    """ Move quantization """
+
+    step = constants.HOST_UPDATE_QUANTUM - 1
+    encoder = VectorEncoder()
+    encoder.encode([1], [(0, 0)], [False], ZONES, 0.0)
+
+    assert encoder.encode([1], [(step, 0)], [False], ZONES, 0.1) is None
+    assert json.loads(encoder.encode([1], [(2 * step, 0)], [False], ZONES, 0.2))['m'] == \
+        [[1, 2 * step, 0]]
+
+
+# function test_keyframe_on_zone_change_and_interval
+# Description: A keyframe is sent when the zones change and after the keyframe interval
+def test_keyframe_on_zone_change_and_interval():
+    """ Keyframe triggers """
+
+    encoder = VectorEncoder()
+    encoder.encode([1], [(0, 0)], [False], ZONES, 0.0)
+
+    message = json.loads(encoder.encode([1], [(0, 0)], [False], [[0, 0, 9, 0, 9, 9]], 0.1))
+    assert (message['t'], message['s']) == ('k', 2)
+
+    assert encoder.encode([1], [(0, 0)], [False], [[0, 0, 9, 0, 9, 9]], 0.2) is None
+
+    message = json.loads(encoder.encode([1], [(0, 0)], [False], [[0, 0, 9, 0, 9, 9]], \
+        0.1 + constants.VECTOR_KEYFRAME_INTERVAL))
+    assert (message['t'], message['s']) == ('k', 3)
+
+
+# function test_deltas_rebuild_the_state
+# Description: Applying the messages in sequence rebuilds the track state within the quantum
+def test_deltas_rebuild_the_state():
+    """ Keyframe and delta sequence """
+
+    rng = random.Random(1)
+    encoder = VectorEncoder()
+    state = {'seq': 0, 'zones': None, 'tracks': {}}
+    tracks = {}
+
+    for frame in range(300):
+
+        # Tracks appear, move, alert and leave
+        for track_id in list(tracks):
+            if rng.random() < 0.05:
+                del tracks[track_id]
+            else:
+                tracks[track_id] = [tracks[track_id][0] + rng.randint(-3, 3), \
+                    tracks[track_id][1] + rng.randint(-3, 3), \
+                    tracks[track_id][2] or rng.random() < 0.02]
+        if rng.random() < 0.2:
+            tracks[frame] = [rng.randint(0, 200), rng.randint(0, 300), False]
+
+        track_ids = list(tracks)
+        payload = encoder.encode(track_ids, [tracks[track_id][:2] for track_id in track_ids], \
+            [tracks[track_id][2] for track_id in track_ids], ZONES, frame / 30)
+
+        if payload is not None:
+            decode(state, payload)
+
+        assert state['zones'] == ZONES
+        assert set(state['tracks']) == set(tracks)
+        for track_id, (pos_x, pos_y, alert) in tracks.items():
+            host_x, host_y, host_alert = state['tracks'][track_id]
+            assert abs(host_x - pos_x) < constants.HOST_UPDATE_QUANTUM
+            assert abs(host_y - pos_y) < constants.HOST_UPDATE_QUANTUM
+            assert host_alert == int(alert)
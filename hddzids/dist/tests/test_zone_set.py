@@ -0,0 +1,93 @@
+""" Danger Zone Set Tests """
+#!/usr/bin/env python3
+
+# Add license here
+
+# Add imports here
+import cv2
+import numpy as np
+from scripts.zone_set import ZoneSet
+#pylint: disable=wrong-import-position
+
+# Zones of different point counts, so the edge arrays are padded
+ZONES = [[100, 100, 300, 100, 300, 250, 100, 250], \
+    [400, 50, 600, 300, 350, 280], \
+    [50, 400, 150, 350, 250, 420, 230, 550, 120, 600, 60, 520]]
+
+# function reference_membership
+# Description: Function that returns the point-in-zone flags measured by OpenCV
+# Parameter: points, zones
+# Return value: membership ((N, zone count) bool array)
+def reference_membership(points, zones):
+    """ OpenCV membership """
+
+    contours = [np.asarray(zone, dtype=np.float32).reshape(-1, 1, 2) for zone in zones]
+
+    return np.array([[cv2.pointPolygonTest(contour, (float(x), float(y)), False) > 0 \
+        for contour in contours] for x, y in points], dtype=bool).reshape(-1, len(zones))
+
+
+# function test_membership_matches_opencv
+# Description: The padded crossing-number test matches OpenCV off the zone edges
+def test_membership_matches_opencv():
+    """ Membership against OpenCV """
+
+    rng = np.random.RandomState(1)
+    points = rng.uniform(0, 700, (2000, 2)) + 0.25
+
+    np.testing.assert_array_equal(ZoneSet(ZONES).get_membership(points), \
+        reference_membership(points, ZONES))
+
+
+# function test_bounding_box_limits
+# Description: Points on the bounding box but outside the polygon, and points outside the
+#              bounding box, are outside the zone
+def test_bounding_box_limits():
+    """ Bounding box prefilter """
+
+    membership = ZoneSet([[0, 0, 100, 0, 0, 100]]).get_membership( \
+        [(100, 100), (99.5, 99.5), (-1, 50), (50, 101), (10, 10)])
+
+    assert membership[:, 0].tolist() == [False, False, False, False, True]
+
+
+# function test_no_candidate
+# Description: Points far from all zones and empty inputs give empty membership
+def test_no_candidate():
+    """ No candidate pair """
+
+    zone_set = ZoneSet(ZONES)
+
+    assert len(zone_set) == 3
+    assert not zone_set.get_membership([(1000, 1000), (-5, -5)]).any()
+    assert zone_set.get_membership([]).shape == (0, 3)
+    assert zone_set.get_distances([]).shape == (0,)
+    assert ZoneSet([]).get_membership([(0, 0)]).shape == (1, 0)
+
+
+# function test_distances
+# Description: The distance is 0 inside a zone, the nearest edge distance near a zone
+#              and inf beyond the measuring limit
+def test_distances():
+    """ Approaching distance """
+
+    distances = ZoneSet([[0, 0, 100, 0, 100, 100, 0, 100]]).get_distances( \
+        [(50, 50), (50, 110), (130, 50), (103, 104), (50, 200)], max_distance=50)
+
+    np.testing.assert_allclose(distances, [0.0, 10.0, 30.0, 5.0, np.inf])
+
+
+# function test_distances_match_opencv
+# Description: The nearest edge distance matches OpenCV for the padded zones
+def test_distances_match_opencv():
+    """ Distances against OpenCV """
+
+    rng = np.random.RandomState(2)
+    points = rng.uniform(0, 700, (500, 2))
+    distances = ZoneSet(ZONES).get_distances(points, max_distance=1000)
+
+    contours = [np.asarray(zone, dtype=np.float32).reshape(-1, 1, 2) for zone in ZONES]
+    expected = [max(0.0, -max(cv2.pointPolygonTest(contour, (float(x), float(y)), True) \
+        for contour in contours)) for x, y in points]
+
+    np.testing.assert_allclose(distances, expected, atol=1e-3)